@@ -1,17 +1,287 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import io
 import struct
 import json
+import numpy as np
+from PIL import Image, ImageSequence
+from services.encoder import EncodedImage, encode_image
+from services.gif_builder import GifBuilder
+
+# --- IMAGE ENGINE CONFIG ---
+ENGINE_BACKEND = "numpy"   # "java" = old tools/ImageEngine HTTP server on localhost:8080
+JAVA_ENGINE_URL = "http://localhost:8080/process"
+MAX_INPUT_BYTES = 8 * 1024 * 1024
+MAX_GIF_FRAMES = 300
+BATCH_PIXELS = 8_000_000   # GIF frames are processed in stacks of about this many pixels
+MAX_EFFECTS = 20
+
+# ---------- NumPy port of tools/ImageEngine.java ----------
+# Every effect takes/returns uint8 RGBA arrays shaped (..., H, W, 4), so a
+# whole stack of GIF frames goes through one vectorized call.
+# Names and JSON parameters (levels / amount / strength / size) match the Java
+# switch; unknown types are skipped like the Java switch does.
+
+def opt_int(effect, key, default):
+    """org.json optInt: numbers are truncated, numeric strings parsed, anything else -> default."""
+    try:
+        return int(float(effect.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+def opt_double(effect, key, default):
+    try:
+        return float(effect.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+def _rgb(img):
+    return img[..., :3].astype(np.int32)
+
+def _with_rgb(img, rgb):
+    out = img.copy()
+    out[..., :3] = np.clip(rgb, 0, 255)
+    return out
+
+def fx_invert(img, effect):
+    return _with_rgb(img, 255 - _rgb(img))
+
+def fx_grayscale(img, effect):
+    avg = _rgb(img).sum(axis=-1, keepdims=True) // 3
+    return _with_rgb(img, np.repeat(avg, 3, axis=-1))
+
+SEPIA = np.array([[0.393, 0.769, 0.189],
+                  [0.349, 0.686, 0.168],
+                  [0.272, 0.534, 0.131]])
+
+def fx_sepia(img, effect):
+    return _with_rgb(img, (img[..., :3] @ SEPIA.T).astype(np.int32))
+
+def fx_solarize(img, effect):
+    rgb = _rgb(img)
+    return _with_rgb(img, np.where(rgb > 128, 255 - rgb, rgb))
+
+def fx_posterize(img, effect):
+    levels = min(256, max(2, opt_int(effect, "levels", 4)))  # >256 would make step 0
+    step = 256 // levels
+    return _with_rgb(img, _rgb(img) // step * step)
+
+def fx_brightness(img, effect):
+    return _with_rgb(img, _rgb(img) + opt_int(effect, "amount", 40))
+
+def fx_contrast(img, effect):
+    factor = opt_double(effect, "amount", 1.5)
+    return _with_rgb(img, np.trunc((_rgb(img) - 128) * factor + 128))
+
+def fx_noise(img, effect):
+    # one offset per pixel, same on all three channels
+    n = np.random.randint(-25, 25, size=img.shape[:-1] + (1,))
+    return _with_rgb(img, _rgb(img) + n)
+
+def fx_scanlines(img, effect):
+    rgb = _rgb(img)
+    rgb[..., ::2, :, :] //= 2
+    return _with_rgb(img, rgb)
+
+# ----- convolution (3x3, border pixels left untouched like ConvolveOp.EDGE_NO_OP) -----
+
+KERNELS = {
+    "blur": np.full((3, 3), 1 / 9),
+    "sharpen": np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]),
+    "edge": np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]]),
+    "emboss": np.array([[-2, -1, 0], [-1, 1, 1], [0, 1, 2]]),
+}
+
+def convolve(img, kernel):
+    """RGB only: alpha is kept (Java convolved alpha too, which blanked transparent PNGs)."""
+    h, w = img.shape[-3:-1]
+    if h < 3 or w < 3:
+        return img.copy()
+    # ConvolveOp convolves for real (kernel rotated 180°), emboss is lit from that side
+    kernel = np.asarray(kernel)[::-1, ::-1]
+    src = img[..., :3].astype(np.float32)
+    acc = np.zeros(src[..., 1:-1, 1:-1, :].shape, dtype=np.float32)
+    for ky in range(3):
+        for kx in range(3):
+            k = kernel[ky, kx]
+            if k:
+                acc += k * src[..., ky:h - 2 + ky, kx:w - 2 + kx, :]
+    out = img.copy()
+    out[..., 1:-1, 1:-1, :3] = np.clip(np.rint(acc), 0, 255)
+    return out
+
+def kernel_effect(name):
+    return lambda img, effect: convolve(img, KERNELS[name])
+
+def fx_neon(img, effect):
+    return convolve(fx_grayscale(img, effect), KERNELS["edge"])
+
+# ----- geometry -----
+
+def vhs(img, strength):
+    """Row y shifted right by int(sin(y * 0.1) * strength), wrapping around."""
+    h, w = img.shape[-3:-1]
+    shift = np.trunc(np.sin(np.arange(h) * 0.1) * strength).astype(np.int64)
+    cols = (np.arange(w)[None, :] - shift[:, None]) % w
+    rows = np.arange(h)[:, None]
+    return img[..., rows, cols, :]
+
+def fx_vhs(img, effect):
+    return vhs(img, opt_int(effect, "strength", 3))
+
+def fx_pixelate(img, effect):
+    size = max(1, opt_int(effect, "size", 10))
+    h, w = img.shape[-3:-1]
+    rows = (np.arange(h) // size * size)[:, None]
+    cols = (np.arange(w) // size * size)[None, :]
+    return img[..., rows, cols, :]
+
+def fx_swirl(img, effect):
+    h, w = img.shape[-3:-1]
+    cx, cy = w // 2, h // 2
+    dy, dx = np.mgrid[-cy:h - cy, -cx:w - cx]
+    dist = np.sqrt(dx * dx + dy * dy)
+    angle = np.arctan2(dy, dx) + dist * 0.0005
+    nx = np.trunc(cx + dist * np.cos(angle)).astype(np.int64)
+    ny = np.trunc(cy + dist * np.sin(angle)).astype(np.int64)
+    inside = (nx >= 0) & (ny >= 0) & (nx < w) & (ny < h)
+    out = img[..., np.clip(ny, 0, h - 1), np.clip(nx, 0, w - 1), :]
+    out[..., ~inside, :] = 0  # Java left those pixels transparent
+    return out
+
+def fx_stretch(img, effect):
+    """Scaled to 2x width and drawn back into the original size (a horizontal soften)."""
+    h, w = img.shape[-3:-1]
+    frames = img.reshape((-1, h, w, 4))
+    out = np.empty_like(frames)
+    for i, frame in enumerate(frames):
+        wide = Image.fromarray(frame).resize((w * 2, h), Image.LANCZOS)
+        out[i] = np.asarray(wide.resize((w, h), Image.BILINEAR))
+    return out.reshape(img.shape)
+
+# ----- compositing (AlphaComposite.SRC_OVER with an extra alpha) -----
+
+def src_over(dst, src_rgb, src_a):
+    """src_a in 0..1 (already multiplied by the composite alpha)."""
+    dst_a = dst[..., 3:].astype(np.float32) / 255
+    out_a = src_a + dst_a * (1 - src_a)
+    safe = np.where(out_a > 0, out_a, 1)
+    rgb = (src_rgb * src_a + dst[..., :3] * dst_a * (1 - src_a)) / safe
+    out = np.empty_like(dst)
+    out[..., :3] = np.clip(np.rint(rgb), 0, 255)
+    out[..., 3:] = np.clip(np.rint(out_a * 255), 0, 255)
+    return out
+
+def fx_ghost(img, effect):
+    out = img.copy()
+    src = img[..., :-10, :-10, :]
+    src_a = src[..., 3:].astype(np.float32) / 255 * 0.5
+    out[..., 10:, 10:, :] = src_over(img[..., 10:, 10:, :], src[..., :3].astype(np.float32), src_a)
+    return out
+
+def fx_glow(img, effect):
+    return src_over(img, np.float32(255), np.float32(0.3))
+
+EFFECTS = {
+    "invert": fx_invert,
+    "grayscale": fx_grayscale,
+    "sepia": fx_sepia,
+    "solarize": fx_solarize,
+    "posterize": fx_posterize,
+    "brightness": fx_brightness,
+    "contrast": fx_contrast,
+    "blur": kernel_effect("blur"),
+    "sharpen": kernel_effect("sharpen"),
+    "edge": kernel_effect("edge"),
+    "emboss": kernel_effect("emboss"),
+    "neon": fx_neon,
+    "scanlines": fx_scanlines,
+    "vhs": fx_vhs,
+    "noise": fx_noise,
+    "pixelate": fx_pixelate,
+    "stretch": fx_stretch,
+    "swirl": fx_swirl,
+    "heatwave": lambda img, effect: vhs(img, 8),
+    "ghost": fx_ghost,
+    "outline": kernel_effect("edge"),
+    "glow": fx_glow,
+    "warp": lambda img, effect: vhs(img, 10),
+}
+
+def apply_effects(frames, effects):
+    """frames: uint8 (..., H, W, 4). Runs the effect list in order, like ImageEngine.applyEffects."""
+    for effect in effects:
+        fn = EFFECTS.get(effect.get("type"))
+        if fn is not None:
+            frames = fn(frames, effect)
+    return frames
+
+def read_effects(config):
+    """Validates the JSON config -> list of effect dicts (raises ValueError for the user)."""
+    if not isinstance(config, dict) or not isinstance(config.get("effects"), list):
+        raise ValueError('Config needs an "effects" list, e.g. {"effects": [{"type": "vhs", "strength": 5}]}')
+    effects = [e for e in config["effects"] if isinstance(e, dict)]
+    if len(effects) > MAX_EFFECTS:
+        raise ValueError(f"Max {MAX_EFFECTS} effects")
+    return effects
+
+def render_engine(data, effects):
+    """Render-farm job: still image -> encoder policy, animated GIF -> GIF (frames batched through the effects)."""
+    src = Image.open(io.BytesIO(data))
+    n_frames = getattr(src, "n_frames", 1)
+
+    if n_frames == 1:
+        frame = np.asarray(src.convert("RGBA"))
+        out = Image.fromarray(apply_effects(frame, effects))
+        return encode_image(out), "result.png"
+
+    w, h = src.size
+    batch = max(1, BATCH_PIXELS // (w * h))
+    durations, stack = [], []
+    buf = io.BytesIO()
+    # effects can move every colour, so each frame gets its own palette
+    gif = GifBuilder(buf, src.size, palette="adaptive", loop=src.info.get("loop", 0))
+
+    def flush():
+        if stack:
+            for frame, duration in zip(apply_effects(np.stack(stack), effects), durations):
+                gif.add(frame, duration)
+            stack.clear()
+            durations.clear()
+
+    for i, frame in enumerate(ImageSequence.Iterator(src)):
+        if i >= MAX_GIF_FRAMES:
+            break
+        durations.append(frame.info.get("duration", 100))
+        stack.append(np.asarray(frame.convert("RGBA")))
+        if len(stack) >= batch:
+            flush()
+    flush()
+
+    gif.finish()
+    buf.seek(0)
+    return buf, "result.gif"
 
 class ImageBridge(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
 
+    async def render_java(self, config, image_bytes):
+        """Old path: length-prefixed JSON + image POSTed to the ImageEngine JVM."""
+        json_bytes = json.dumps(config).encode()
+
+        payload = struct.pack(">I", len(json_bytes)) + json_bytes + image_bytes
+
+        resp = await self.bot.http_pool.request("POST", JAVA_ENGINE_URL, data=payload)
+
+        if resp.status != 200:
+            raise RuntimeError("Processing failed.")
+        return io.BytesIO(resp.body), "result.png"
+
     @commands.command(name="renderjson")
     async def render(self, ctx, *, json_config: str):
+        """Usage: !renderjson {"effects": [{"type": "vhs", "strength": 5}, {"type": "glow"}]} (attach an image or GIF)"""
 
         if not ctx.message.attachments:
             return await ctx.send("Attach an image.")
@@ -20,26 +290,27 @@ class ImageBridge(commands.Cog):
             config = json.loads(json_config)
         except:
             return await ctx.send("Invalid JSON.")
+        try:
+            effects = read_effects(config)
+        except ValueError as e:
+            return await ctx.send(str(e))
 
         attachment = ctx.message.attachments[0]
+        if attachment.size > MAX_INPUT_BYTES:
+            return await ctx.send(f"Image too big (max {MAX_INPUT_BYTES // 1024 // 1024}MB).")
         image_bytes = await attachment.read()
 
-        json_bytes = json.dumps(config).encode()
-
-        payload = struct.pack(">I", len(json_bytes)) + json_bytes + image_bytes
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "http://localhost:8080/process",
-                data=payload
-            ) as resp:
-
-                if resp.status != 200:
-                    return await ctx.send("Processing failed.")
-
-                result = await resp.read()
+        try:
+            if ENGINE_BACKEND == "java":
+                buf, name = await self.render_java(config, image_bytes)
+            else:
+                buf, name = await self.bot.render_farm.submit("image", render_engine, image_bytes, effects)
+        except Exception as e:
+            return await ctx.send(f"Processing failed. ({e})")
 
-        await ctx.send(file=discord.File(io.BytesIO(result), "result.png"))
+        if isinstance(buf, EncodedImage):
+            return await ctx.send(file=self.bot.encoder.file(buf, name))
+        await ctx.send(file=discord.File(buf, name))
 
 async def setup(bot):
     await bot.add_cog(ImageBridge(bot))
\ No newline at end of file
@@ -2,48 +2,40 @@ import discord
 from discord.ext import commands
 from PIL import Image
 import io
-import asyncio
-from functools import partial
+from services.image_cache import as_image
+from services.gif_builder import GifBuilder
 
-class Squish(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
+def process_squish(data, frame_count):
+    # 1. Load the base image
+    img = as_image(data, "RGBA")
+    width, height = img.size
 
-    def process_squish(self, data, frame_count):
-        # 1. Load the base image
-        img = Image.open(io.BytesIO(data)).convert("RGBA")
-        width, height = img.size
-        
-        frames = []
+    # 2. Frames stream straight into the GIF (one palette from the source image,
+    # only the changed rows are written, nothing is kept per frame)
+    out = io.BytesIO()
+    with GifBuilder(out, img.size, seed=img) as gif:
         for i in range(frame_count):
             # Calculate the new height (shrinks then grows back)
             # This uses a simple multiplier based on the frame index
             scale = 1.0 - (i / frame_count)
             if scale <= 0: scale = 0.05 # Prevent 0 height errors
-            
+        
             new_height = int(height * scale)
-            
+        
             # Create a transparent canvas so the image "squishes" toward the bottom
             canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
             resized_img = img.resize((width, new_height), Image.LANCZOS)
-            
+        
             # Paste resized image at the bottom of the canvas
             canvas.paste(resized_img, (0, height - new_height))
-            frames.append(canvas)
+            gif.add(canvas, 40)  # 40ms per frame
+
+    out.seek(0)
+    return out
 
-        # 2. Save to a Byte stream as a GIF
-        out = io.BytesIO()
-        frames[0].save(
-            out,
-            format="GIF",
-            save_all=True,
-            append_images=frames[1:],
-            duration=40, # 40ms per frame
-            loop=0,
-            disposal=2 # Clears previous frame to prevent ghosting
-        )
-        out.seek(0)
-        return out
+class Squish(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
 
     @commands.command()
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -54,20 +46,16 @@ class Squish(commands.Cog):
 
         # Reusing your existing helper to get image data
         # (Assuming you have this in the same class or globally)
-        data = await self.bot.get_cog("Fun").load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url, "RGBA")
         
         if not data:
             return await ctx.send("❌ No image found!")
 
         msg = await ctx.send(f"⏳ Squishing into {frames} frames... this might take a second.")
 
-        # Run the heavy processing in a separate thread so the bot doesn't freeze
-        loop = asyncio.get_event_loop()
+        # Run the heavy processing on the render farm so the bot doesn't freeze
         try:
-            result = await loop.run_in_executor(
-                None, 
-                partial(self.process_squish, data, frames)
-            )
+            result = await self.bot.render_farm.submit("image", process_squish, data, frames)
             
             await ctx.send(file=discord.File(result, filename="squished.gif"))
             await msg.delete()
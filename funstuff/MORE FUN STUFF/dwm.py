@@ -1,7 +1,6 @@
-import discord
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont
-import io
+from services.encoder import encode_image
 
 class AeroWindow:
     def __init__(self, title="System", content="Hello", x=50, y=50):
@@ -46,10 +45,7 @@ class AeroWindow:
 
         canvas.paste(window_surf, (self.x, self.y), window_surf)
         
-        buffer = io.BytesIO()
-        canvas.save(buffer, format="PNG")
-        buffer.seek(0)
-        return buffer
+        return encode_image(canvas)
 
 class PositionCog(commands.Cog):
     def __init__(self, bot):
@@ -70,9 +66,10 @@ class PositionCog(commands.Cog):
         
         try:
             self.ui.update_position(x, y)
-            data = self.ui()
+            # AeroWindow is picklable, so the farm calls it in a worker process
+            data = await self.bot.render_farm.submit("image", self.ui)
             
-            file = discord.File(fp=data, filename="aero.png")
+            file = self.bot.encoder.file(data, "aero.png")
             await ctx.send(f"Window repositioned to `{x}, {y}`", file=file)
         except Exception as e:
             print(f"Error during image gen: {e}")
@@ -1,8 +1,8 @@
-import discord
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont
-import io
 import os
+import asyncio
+from services.encoder import encode_image
 
 class TextGenerator(commands.Cog):
     def __init__(self, bot):
@@ -43,12 +43,10 @@ class TextGenerator(commands.Cog):
                 # Draw the text in White
                 draw.text((10, 5), message, font=font, fill="white")
 
-                # 4. Save to buffer (Memory only to prevent disk crashes)
-                out_buffer = io.BytesIO()
-                img.save(out_buffer, format="PNG")
-                out_buffer.seek(0)
+                # 4. Encode in memory (off the event loop)
+                result = await asyncio.to_thread(encode_image, img)
 
-                await ctx.send(file=discord.File(out_buffer, filename="text.png"))
+                await ctx.send(file=self.bot.encoder.file(result, "text.png"))
 
             except Exception as e:
                 await ctx.send(f"⚠️ Error: {e}")
@@ -1,91 +1,272 @@
 import discord
 from discord.ext import commands
-import io, math, os
+import io
+from collections import namedtuple
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import Image
 from pygltflib import GLTF2
-import asyncio
+from services.gif_builder import GifBuilder
 
-class GLBLoader(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
+def get_glb_data(gltf, single_tex=False):
+    binary_blob = gltf.binary_blob()
+    vertices, indices, uvs = [], [], []
+    vertex_offset = 0 
+    tex_image = None
 
-    def get_glb_data(self, gltf, single_tex=False):
-        binary_blob = gltf.binary_blob()
-        vertices, indices, uvs = [], [], []
-        vertex_offset = 0 
-        tex_image = None
+    # 1. Texture Atlas Extraction
+    if single_tex and gltf.images:
+        try:
+            # We grab the first image (usually gltf_Texture.png in an atlas)
+            img_meta = gltf.images[0]
+            if img_meta.bufferView is not None:
+                bv = gltf.bufferViews[img_meta.bufferView]
+                img_bytes = binary_blob[bv.byteOffset : bv.byteOffset + bv.byteLength]
+                tex_image = Image.open(io.BytesIO(img_bytes)).convert("RGBA")
+        except Exception as e:
+            print(f"Atlas Load Error: {e}")
 
-        # 1. Texture Atlas Extraction
-        if single_tex and gltf.images:
-            try:
-                # We grab the first image (usually gltf_Texture.png in an atlas)
-                img_meta = gltf.images[0]
-                if img_meta.bufferView is not None:
-                    bv = gltf.bufferViews[img_meta.bufferView]
-                    img_bytes = binary_blob[bv.byteOffset : bv.byteOffset + bv.byteLength]
-                    tex_image = Image.open(io.BytesIO(img_bytes)).convert("RGBA")
-            except Exception as e:
-                print(f"Atlas Load Error: {e}")
-
-        for mesh in gltf.meshes:
-            for primitive in mesh.primitives:
-                # 2. Extract Vertices
-                pos_acc = gltf.accessors[primitive.attributes.POSITION]
-                pos_bv = gltf.bufferViews[pos_acc.bufferView]
-                v_start = (pos_bv.byteOffset or 0) + (pos_acc.byteOffset or 0)
+    for mesh in gltf.meshes:
+        for primitive in mesh.primitives:
+            # 2. Extract Vertices
+            pos_acc = gltf.accessors[primitive.attributes.POSITION]
+            pos_bv = gltf.bufferViews[pos_acc.bufferView]
+            v_start = (pos_bv.byteOffset or 0) + (pos_acc.byteOffset or 0)
+            
+            points = np.frombuffer(
+                binary_blob[v_start : v_start + pos_acc.count * 12], 
+                dtype=np.float32
+            ).reshape(-1, 3).copy()
+            vertices.extend(points)
+
+            # 3. Extract UVs (The texture positions)
+            if single_tex and hasattr(primitive.attributes, "TEXCOORD_0"):
+                uv_acc = gltf.accessors[primitive.attributes.TEXCOORD_0]
+                uv_bv = gltf.bufferViews[uv_acc.bufferView]
+                u_start = (uv_bv.byteOffset or 0) + (uv_acc.byteOffset or 0)
                 
-                points = np.frombuffer(
-                    binary_blob[v_start : v_start + pos_acc.count * 12], 
+                uv_data = np.frombuffer(
+                    binary_blob[u_start : u_start + uv_acc.count * 8], 
                     dtype=np.float32
-                ).reshape(-1, 3).copy()
-                vertices.extend(points)
-
-                # 3. Extract UVs (The texture positions)
-                if single_tex and hasattr(primitive.attributes, "TEXCOORD_0"):
-                    uv_acc = gltf.accessors[primitive.attributes.TEXCOORD_0]
-                    uv_bv = gltf.bufferViews[uv_acc.bufferView]
-                    u_start = (uv_bv.byteOffset or 0) + (uv_acc.byteOffset or 0)
-                    
-                    uv_data = np.frombuffer(
-                        binary_blob[u_start : u_start + uv_acc.count * 8], 
-                        dtype=np.float32
-                    ).reshape(-1, 2).copy()
-                    
-                    # Flip V for Pillow (Standard for GLB -> PIL)
-                    uv_data[:, 1] = 1.0 - uv_data[:, 1]
-                    uvs.extend(uv_data)
-                else:
-                    # Keep lists synced even if a part has no UVs
-                    uvs.extend(np.zeros((len(points), 2)))
-
-                # 4. Extract Indices with Global Offset
-                if primitive.indices is not None:
-                    idx_acc = gltf.accessors[primitive.indices]
-                    idx_bv = gltf.bufferViews[idx_acc.bufferView]
-                    i_start = (idx_bv.byteOffset or 0) + (idx_acc.byteOffset or 0)
-                    
-                    id_dtype = np.uint16 if idx_acc.componentType == 5123 else np.uint32
-                    idx = np.frombuffer(
-                        binary_blob[i_start : i_start + idx_acc.count * np.dtype(id_dtype).itemsize], 
-                        dtype=id_dtype
-                    ).copy()
-                    
-                    # Offset ensures indices point to the correct Vertex/UV pair
-                    idx = (idx.astype(np.uint32) + vertex_offset).reshape(-1, 3)
-                    indices.extend(idx)
-
-                vertex_offset += len(points)
-
-        return np.array(vertices), indices, np.array(uvs), tex_image
+                ).reshape(-1, 2).copy()
+                
+                # Flip V for Pillow (Standard for GLB -> PIL)
+                uv_data[:, 1] = 1.0 - uv_data[:, 1]
+                uvs.extend(uv_data)
+            else:
+                # Keep lists synced even if a part has no UVs
+                uvs.extend(np.zeros((len(points), 2)))
+
+            # 4. Extract Indices with Global Offset
+            if primitive.indices is not None:
+                idx_acc = gltf.accessors[primitive.indices]
+                idx_bv = gltf.bufferViews[idx_acc.bufferView]
+                i_start = (idx_bv.byteOffset or 0) + (idx_acc.byteOffset or 0)
+                
+                id_dtype = np.uint16 if idx_acc.componentType == 5123 else np.uint32
+                idx = np.frombuffer(
+                    binary_blob[i_start : i_start + idx_acc.count * np.dtype(id_dtype).itemsize], 
+                    dtype=id_dtype
+                ).copy()
+                
+                # Offset ensures indices point to the correct Vertex/UV pair
+                idx = (idx.astype(np.uint32) + vertex_offset).reshape(-1, 3)
+                indices.extend(idx)
+
+            vertex_offset += len(points)
+
+    return np.array(vertices), indices, np.array(uvs), tex_image
+
+# --- RENDER CONFIG ---
+RENDER_SIZE = 400          # output is RENDER_SIZE x RENDER_SIZE
+RENDER_FRAMES = 8          # frames per full turn
+MAX_RENDER_SIZE = 800
+MAX_RENDER_FRAMES = 36
+FRAME_MS = 100
+CAMERA_DISTANCE = 2.5      # model is normalized to [-1, 1]
+BACKGROUND = (12, 12, 12)
+UNTEXTURED = (0, 255, 0)
+ALPHA_TEST = 128           # texels below this alpha are cut out (leaves, fences...)
+CHUNK_FRAGMENTS = 1_000_000  # candidate pixels tested per NumPy batch
+
+PreparedMesh = namedtuple("PreparedMesh", "vertices faces uvs texture")
+
+
+def prepare_mesh(vertices, indices, uvs, tex_img):
+    """Done once per model: normalize, drop broken faces, pack everything as float32 arrays."""
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if not len(vertices) or not len(indices):
+        raise ValueError("No triangles found in this model")
+    vertices -= vertices.mean(axis=0)
+    vertices /= (np.max(np.abs(vertices)) or 1.0)
+
+    faces = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    ok = (faces < len(vertices)).all(axis=1)
+    ok &= (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[ok]
+
+    texture = None
+    if tex_img is not None and len(uvs):
+        texture = np.asarray(tex_img.convert("RGBA"))
+        face_uvs = np.asarray(uvs, dtype=np.float32)[faces]  # (T, 3, 2)
+    else:
+        face_uvs = None
+    return PreparedMesh(vertices, faces, face_uvs, texture)
+
+
+def spin_vertices(vertices, frames):
+    """All frames in one batch: (frames, V, 3) camera-space points, camera looking at the front (+Z)."""
+    angles = np.radians(np.arange(frames) * (360.0 / frames))
+    c, s = np.cos(angles), np.sin(angles)
+    rot = np.zeros((frames, 3, 3), np.float32)
+    rot[:, 0, 0], rot[:, 0, 2] = c, s
+    rot[:, 1, 1] = 1
+    rot[:, 2, 0], rot[:, 2, 2] = -s, c
+    cam = vertices @ rot.transpose(0, 2, 1)
+    cam[..., 2] = CAMERA_DISTANCE - cam[..., 2]  # glTF is +Z towards the viewer
+    return cam
+
+
+def _setup_triangles(cam, faces, size):
+    """Screen-space edge equations for every triangle, relative to its bounding box corner:
+    barycentric w_i(col, row) = A_i*(col + 0.5) + B_i*(row + 0.5) + C_i (small numbers -> float32 is enough)."""
+    tri = cam[faces].astype(np.float64)               # (T, 3, 3)
+    z = tri[..., 2]
+    f = size / np.maximum(z, 1e-6)
+    sx = tri[..., 0] * f + size / 2
+    sy = size / 2 - tri[..., 1] * f                   # image Y points down
+
+    x0, x1, x2 = sx[:, 0], sx[:, 1], sx[:, 2]
+    y0, y1, y2 = sy[:, 0], sy[:, 1], sy[:, 2]
+    area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+
+    # pixel centres (px + 0.5) inside the bounding box, clipped to the canvas
+    bx0 = np.clip(np.ceil(sx.min(axis=1) - 0.5), 0, size).astype(np.int64)
+    bx1 = np.clip(np.floor(sx.max(axis=1) - 0.5), -1, size - 1).astype(np.int64)
+    by0 = np.clip(np.ceil(sy.min(axis=1) - 0.5), 0, size).astype(np.int64)
+    by1 = np.clip(np.floor(sy.max(axis=1) - 0.5), -1, size - 1).astype(np.int64)
+
+    keep = (np.abs(area) > 1e-9) & (z.min(axis=1) > 1e-3) & (bx1 >= bx0) & (by1 >= by0)
+    idx = np.flatnonzero(keep)
+    inv = 1.0 / area[idx]
+    xs = sx[idx] - bx0[idx, None]
+    ys = sy[idx] - by0[idx, None]
+    planes = np.empty((len(idx), 3, 3), np.float32)   # [A, B, C] x 3 edges
+    planes[:, 0] = np.stack([ys[:, 1] - ys[:, 2], ys[:, 2] - ys[:, 0], ys[:, 0] - ys[:, 1]], axis=1)
+    planes[:, 1] = np.stack([xs[:, 2] - xs[:, 1], xs[:, 0] - xs[:, 2], xs[:, 1] - xs[:, 0]], axis=1)
+    planes[:, 2] = np.stack([xs[:, 1] * ys[:, 2] - xs[:, 2] * ys[:, 1],
+                             xs[:, 2] * ys[:, 0] - xs[:, 0] * ys[:, 2],
+                             xs[:, 0] * ys[:, 1] - xs[:, 1] * ys[:, 0]], axis=1)
+    planes *= inv[:, None, None]
+    box = (bx0[idx], by0[idx], bx1[idx] - bx0[idx] + 1, by1[idx] - by0[idx] + 1)
+    return idx, box, planes, (1.0 / z[idx]).astype(np.float32)
+
+
+def _sample(texture, uv):
+    """Nearest texel with wrap-around (glTF REPEAT)."""
+    h, w = texture.shape[:2]
+    tx = np.minimum(((uv[:, 0] % 1.0) * w).astype(np.int64), w - 1)
+    ty = np.minimum(((uv[:, 1] % 1.0) * h).astype(np.int64), h - 1)
+    return texture[ty, tx]
+
+
+def _perspective_uv(weights, inv_z, face_uvs):
+    """Screen barycentrics -> perspective-correct UV."""
+    w = weights * inv_z
+    w /= w.sum(axis=1, keepdims=True)
+    return (w[..., None] * face_uvs).sum(axis=1)
+
+
+def rasterize(cam, mesh, size):
+    """Z-buffer one frame. Returns an HxWx3 uint8 array."""
+    tri_ids, (bx, by, bw, bh), planes, inv_z = _setup_triangles(cam, mesh.faces, size)
+    depth = np.zeros(size * size, np.float32)      # stores 1/z, 0 = nothing drawn
+    owner = np.full(size * size, -1, np.int64)     # index into tri_ids
+    bary = np.zeros((size * size, 3), np.float32)
+
+    cutout = mesh.texture is not None and mesh.texture[..., 3].min() < ALPHA_TEST
+    area = bw * bh
+    ends = np.cumsum(area)
+    start = 0
+    while start < len(area):
+        # as many triangles as fit in one batch of candidate pixels (always at least one)
+        base = ends[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(ends, base + CHUNK_FRAGMENTS, side="right")))
+        counts = area[start:stop]
+        t = np.repeat(np.arange(start, stop), counts)
+        local = np.arange(len(t)) - np.repeat(ends[start:stop] - counts - base, counts)
+        row, col = np.divmod(local, bw[t])
+        px, py = bx[t] + col, by[t] + row
+
+        p = np.take(planes, t, axis=0)
+        cx = (col + 0.5).astype(np.float32)[:, None]
+        cy = (row + 0.5).astype(np.float32)[:, None]
+        w = p[:, 0] * cx + p[:, 1] * cy + p[:, 2]
+        inside = (w >= -1e-5).all(axis=1)
+        t, px, py, w = t[inside], px[inside], py[inside], w[inside]
+        iz = (w * inv_z[t]).sum(axis=1)
+
+        if cutout:
+            uv = _perspective_uv(w, inv_z[t], mesh.uvs[tri_ids[t]])
+            solid = _sample(mesh.texture, uv)[:, 3] >= ALPHA_TEST
+            t, px, py, w, iz = t[solid], px[solid], py[solid], w[solid], iz[solid]
+
+        # z-test: keep the nearest 1/z per pixel, the fragments that hit it win
+        pid = py * size + px
+        np.maximum.at(depth, pid, iz)
+        win = iz == depth[pid]
+        pid = pid[win]
+        owner[pid] = t[win]
+        bary[pid] = w[win]
+        start = stop
+
+    # deferred shading: the texture is only looked at once per visible pixel
+    frame = np.empty((size * size, 3), np.uint8)
+    frame[:] = BACKGROUND
+    hit = np.flatnonzero(owner >= 0)
+    t = owner[hit]
+    if mesh.texture is not None:
+        uv = _perspective_uv(bary[hit], inv_z[t], mesh.uvs[tri_ids[t]])
+        frame[hit] = _sample(mesh.texture, uv)[:, :3]
+    else:
+        frame[hit] = UNTEXTURED
+    return frame.reshape(size, size, 3)
+
+
+def render_process(glb_bytes, single_tex, size=RENDER_SIZE, frames=RENDER_FRAMES):
+    # Parse inside the worker so the (big) GLTF object never crosses processes
+    gltf = GLTF2.load_from_bytes(glb_bytes)
+    vertices, indices, uvs, tex_img = get_glb_data(gltf, single_tex)
+    mesh = prepare_mesh(vertices, indices, uvs, tex_img if single_tex else None)
+
+    out = io.BytesIO()
+    # one palette for the whole spin (first frame + texture), frames stream in as rendered
+    gif = GifBuilder(out, (size, size), seed=tex_img if mesh.texture is not None else None)
+    for cam in spin_vertices(mesh.vertices, frames):
+        gif.add(rasterize(cam, mesh, size), FRAME_MS)
+
+    gif.finish()
+    out.seek(0)
+    return out
+
+class GLBLoader(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
 
     @commands.command(name="loadglb")
     @commands.cooldown(1, 10, commands.BucketType.user)
     async def loadglb(self, ctx, *args):
-        """Usage: !loadglb singletexture=True"""
+        """Usage: !loadglb singletexture=True size=400 frames=8"""
         arg_str = " ".join(args).lower()
         single_tex = "singletexture=true" in arg_str
-        
+        size, frames = RENDER_SIZE, RENDER_FRAMES
+        for arg in args:
+            key, _, value = arg.lower().partition("=")
+            if key in ("size", "frames") and value.isdigit():
+                if key == "size":
+                    size = max(64, min(int(value), MAX_RENDER_SIZE))
+                else:
+                    frames = max(1, min(int(value), MAX_RENDER_FRAMES))
+
         if not ctx.message.attachments:
             return await ctx.send("📦 Attach your `.glb` model!")
 
@@ -95,12 +276,8 @@ class GLBLoader(commands.Cog):
                 attachment = ctx.message.attachments[0]
                 glb_bytes = await attachment.read()
                 
-                # Load GLB
-                gltf = GLTF2.load_from_bytes(glb_bytes)
-                
-                loop = asyncio.get_event_loop()
-                # Run the math-heavy render in a thread
-                result = await loop.run_in_executor(None, self.render_process, gltf, single_tex)
+                # Parse + run the math-heavy render on the render farm
+                result = await self.bot.render_farm.submit("geometry", render_process, glb_bytes, single_tex, size, frames)
                 
                 await status.delete()
                 await ctx.send(file=discord.File(result, filename="render.gif"))
@@ -108,55 +285,5 @@ class GLBLoader(commands.Cog):
             except Exception as e:
                 await ctx.send(f"⚠️ GLB Error: {e}")
 
-    def render_process(self, gltf, single_tex):
-        vertices, indices, uvs, tex_img = self.get_glb_data(gltf, single_tex)
-
-        # Normalize 3D points
-        vertices -= np.mean(vertices, axis=0)
-        vertices /= (np.max(np.abs(vertices)) or 1.0)
-
-        frames = []
-        size = (400, 400)
-        
-        # Projection Math
-        def project(v, angle):
-            rad = math.radians(angle)
-            c, s = math.cos(rad), math.sin(rad)
-            rot = np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
-            rotated = v @ rot.T
-            rotated[:, 2] += 2.5 
-            f = 400 / rotated[:, 2]
-            return np.column_stack(((rotated[:, 0] * f) + 200, (rotated[:, 1] * f) + 200)), rotated[:, 2]
-
-        for angle in range(0, 360, 45):
-            canvas = Image.new("RGBA", size, (12, 12, 12, 255))
-            draw = ImageDraw.Draw(canvas)
-            points, depths = project(vertices, angle)
-
-            # Sort faces by depth (back-to-front)
-            face_depths = [np.mean([depths[i] for i in face]) for face in indices]
-            sorted_idx = sorted(zip(indices, face_depths), key=lambda x: x[1], reverse=True)
-
-            for face, d in sorted_idx:
-                poly = [tuple(points[i]) for i in face]
-                color = (0, 255, 0, 100) # Default if no texture
-
-                if single_tex and tex_img and uvs.size > 0:
-                    # Pull UVs for the vertices in this specific face
-                    f_uvs = uvs[face]
-                    u, v = np.mean(f_uvs[:, 0]), np.mean(f_uvs[:, 1])
-                    tx = int((u % 1.0) * (tex_img.width - 1))
-                    ty = int((v % 1.0) * (tex_img.height - 1))
-                    color = tex_img.getpixel((tx, ty))
-
-                draw.polygon(poly, fill=color)
-            
-            frames.append(canvas)
-
-        out = io.BytesIO()
-        frames[0].save(out, format="GIF", save_all=True, append_images=frames[1:], duration=100, loop=0)
-        out.seek(0)
-        return out
-
 async def setup(bot):
     await bot.add_cog(GLBLoader(bot))
\ No newline at end of file
@@ -1,11 +1,476 @@
 import discord
 from discord.ext import commands, tasks
+import io
 import os
+import json
+import time
+import zlib
+import hashlib
+import heapq
+import asyncio
 import zipfile
 import datetime
-import platform
-import ctypes
 import shutil
+import multiprocessing
+from collections import OrderedDict
+
+# --- ZIP ENGINE CONFIG ---
+BACKUP_WORKERS = 2            # backups compressing at the same time
+ZIP_CHUNK = 1024 * 1024       # files are streamed into the zip in 1MB chunks
+PROGRESS_SECONDS = 3          # min gap between progress edits in the thread
+
+# Already-compressed media: deflate only burns CPU, just store it
+STORED_EXTS = {
+    ".zip", ".7z", ".rar", ".gz", ".bz2", ".xz",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp3", ".ogg", ".opus", ".m4a", ".flac", ".aac",
+    ".mp4", ".webm", ".mkv", ".mov", ".avi",
+}
+TEXT_EXTS = {".txt", ".json", ".csv", ".log", ".md", ".py", ".lua", ".luau", ".xml", ".html", ".yml", ".yaml"}
+
+def compression_for(filename):
+    """(method, level) for one file, picked by extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in STORED_EXTS:
+        return zipfile.ZIP_STORED, None
+    if ext in TEXT_EXTS:
+        return zipfile.ZIP_DEFLATED, 9
+    return zipfile.ZIP_DEFLATED, 6
+
+def build_zip(user_path, zip_path, conn):
+    """Worker process: zips user_path into zip_path, reporting progress over conn."""
+    try:
+        files = []
+        for root, _, names in os.walk(user_path):
+            for f in names:
+                full = os.path.join(root, f)
+                files.append((full, os.path.relpath(full, user_path), os.path.getsize(full)))
+        total = sum(size for _, _, size in files) or 1
+
+        done = 0
+        last_report = 0.0
+        tmp_path = zip_path + ".part"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for i, (full, arcname, _) in enumerate(files, 1):
+                method, level = compression_for(full)
+                zinfo = zipfile.ZipInfo.from_file(full, arcname)
+                zinfo.compress_type = method
+                zinfo._compresslevel = level  # public as compress_level only from 3.13
+
+                with open(full, "rb") as src, zipf.open(zinfo, "w", force_zip64=True) as dst:
+                    while chunk := src.read(ZIP_CHUNK):
+                        dst.write(chunk)
+                        done += len(chunk)
+                        now = time.monotonic()
+                        if now - last_report >= PROGRESS_SECONDS:
+                            conn.send(("progress", done, total, i, len(files)))
+                            last_report = now
+
+        os.replace(tmp_path, zip_path)  # a crashed run never counts as this month's backup
+        conn.send(("done", os.path.getsize(zip_path), len(files)))
+    except Exception as e:
+        try:
+            os.remove(zip_path + ".part")
+        except OSError:
+            pass
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+# ---------- incremental snapshots (content-addressed chunk store) ----------
+
+SNAPSHOT_CHUNK = 4 * 1024 * 1024   # fixed-size chunks, sha256 of the raw bytes
+MAX_SNAPSHOTS = 10                 # per user, oldest manifests are pruned
+SNAPSHOT_MIN_GAP = 3600            # seconds between snapshots of the same user
+CHUNK_GC_GRACE = 6 * 3600          # unreferenced chunks younger than this are kept (in-flight snapshots)
+
+def chunk_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], digest)
+
+def list_snapshots(snap_dir):
+    """Snapshot ids (manifest names) oldest first."""
+    if not os.path.isdir(snap_dir):
+        return []
+    return sorted(f[:-5] for f in os.listdir(snap_dir) if f.endswith(".json"))
+
+def load_manifest(snap_dir, snap_id):
+    with open(os.path.join(snap_dir, f"{snap_id}.json"), "r") as f:
+        return json.load(f)
+
+def build_snapshot(user_path, store_dir, snap_dir, conn):
+    """Worker process: hashes changed files into the chunk store and writes a manifest.
+
+    Files whose size + mtime match the previous snapshot reuse its chunk list unread.
+    """
+    try:
+        previous = {}
+        existing = list_snapshots(snap_dir)
+        if existing:
+            previous = {e["path"]: e for e in load_manifest(snap_dir, existing[-1])["files"]}
+
+        files = []
+        for root, _, names in os.walk(user_path):
+            for f in names:
+                full = os.path.join(root, f)
+                files.append((full, os.path.relpath(full, user_path).replace(os.sep, "/"), os.stat(full)))
+        total = sum(st.st_size for _, _, st in files) or 1
+
+        entries = []
+        done = new_bytes = reused = 0
+        last_report = 0.0
+        for i, (full, rel, st) in enumerate(files, 1):
+            old = previous.get(rel)
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                entries.append(old)
+                reused += st.st_size
+                done += st.st_size
+                continue
+
+            method, level = compression_for(full)
+            level = 0 if method == zipfile.ZIP_STORED else level
+            chunks = []
+            with open(full, "rb") as src:
+                while chunk := src.read(SNAPSHOT_CHUNK):
+                    digest = hashlib.sha256(chunk).hexdigest()
+                    path = chunk_path(store_dir, digest)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        data = zlib.compress(chunk, level)
+                        with open(path + ".part", "wb") as out:
+                            out.write(data)
+                        os.replace(path + ".part", path)
+                        new_bytes += len(data)
+                    else:
+                        os.utime(path)  # fresh again for the GC grace period
+                    chunks.append(digest)
+                    done += len(chunk)
+                    now = time.monotonic()
+                    if now - last_report >= PROGRESS_SECONDS:
+                        conn.send(("progress", done, total, i, len(files)))
+                        last_report = now
+            entries.append({"path": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunks": chunks})
+
+        os.makedirs(snap_dir, exist_ok=True)
+        snap_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        manifest_path = os.path.join(snap_dir, f"{snap_id}.json")
+        with open(manifest_path + ".part", "w") as f:
+            json.dump({"created": time.time(), "files": entries}, f)
+        os.replace(manifest_path + ".part", manifest_path)
+
+        for old_id in list_snapshots(snap_dir)[:-MAX_SNAPSHOTS]:
+            os.remove(os.path.join(snap_dir, f"{old_id}.json"))  # chunks go in the next GC
+
+        conn.send(("done", snap_id, len(entries), new_bytes, reused))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+def assemble_snapshot(snap_dir, snap_id, store_dir, zip_path, conn):
+    """Worker process: builds the zip for ONE snapshot from its chunks (on request only)."""
+    try:
+        manifest = load_manifest(snap_dir, snap_id)
+        total = sum(e["size"] for e in manifest["files"]) or 1
+        done = 0
+        last_report = 0.0
+        tmp_path = zip_path + ".part"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for i, entry in enumerate(manifest["files"], 1):
+                method, level = compression_for(entry["path"])
+                mtime = time.localtime(max(entry["mtime_ns"] / 1e9, 315532800))  # zip dates start at 1980
+                zinfo = zipfile.ZipInfo(entry["path"], date_time=mtime[:6])
+                zinfo.compress_type = method
+                zinfo._compresslevel = level  # public as compress_level only from 3.13
+                zinfo.file_size = entry["size"]
+
+                with zipf.open(zinfo, "w", force_zip64=True) as dst:
+                    for digest in entry["chunks"]:
+                        with open(chunk_path(store_dir, digest), "rb") as src:
+                            chunk = zlib.decompress(src.read())
+                        dst.write(chunk)
+                        done += len(chunk)
+                        now = time.monotonic()
+                        if now - last_report >= PROGRESS_SECONDS:
+                            conn.send(("progress", done, total, i, len(manifest["files"])))
+                            last_report = now
+
+        os.replace(tmp_path, zip_path)
+        conn.send(("done", os.path.getsize(zip_path), len(manifest["files"])))
+    except Exception as e:
+        try:
+            os.remove(zip_path + ".part")
+        except OSError:
+            pass
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+def snapshot_zip_estimate(snap_dir, snap_id, store_dir):
+    """About the size of the snapshot's zip, without building it.
+
+    Chunks are stored with the compression the zip would use for that file,
+    so their on-disk sizes (counted once per use) add up to roughly the zip.
+    """
+    sizes = {}
+    total = 0
+    for entry in load_manifest(snap_dir, snap_id)["files"]:
+        for digest in entry["chunks"]:
+            if digest not in sizes:
+                try:
+                    sizes[digest] = os.path.getsize(chunk_path(store_dir, digest))
+                except OSError:
+                    sizes[digest] = 0  # missing chunk -> the assembly reports it
+            total += sizes[digest]
+    return total
+
+def gc_chunks(store_dir, snapshots_root, grace=CHUNK_GC_GRACE):
+    """Mark and sweep: deletes chunks no manifest references anymore. Returns bytes freed."""
+    referenced = set()
+    for root, _, names in os.walk(snapshots_root):
+        for f in names:
+            if f.endswith(".json"):
+                with open(os.path.join(root, f), "r") as mf:
+                    for entry in json.load(mf)["files"]:
+                        referenced.update(entry["chunks"])
+
+    freed = 0
+    cutoff = time.time() - grace
+    for root, _, names in os.walk(store_dir):
+        for f in names:
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+                if f not in referenced and st.st_mtime < cutoff:
+                    os.remove(path)
+                    freed += st.st_size
+            except OSError:
+                pass
+    return freed
+
+def scan_usage(data_dir):
+    """Full walk: user id -> bytes stored (only used by the background reconcile)."""
+    usage = {}
+    for entry in os.scandir(data_dir):
+        if not entry.is_dir():
+            continue
+        total = 0
+        for root, _, files in os.walk(entry.path):
+            for f in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, f))
+                except OSError:
+                    pass  # deleted mid-scan
+        usage[entry.name] = total
+    return usage
+
+class StorageLedger:
+    """Bytes stored per user, kept in memory and persisted to a small JSON file.
+
+    Uploads/deletes adjust it directly, so quota checks never walk the tree.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.usage_by_user = {}
+        self.loaded = False
+        try:
+            with open(db_path, "r") as f:
+                self.usage_by_user = json.load(f)
+            self.loaded = True
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass  # the first reconcile fills it
+
+    def usage(self, user_id):
+        return self.usage_by_user.get(str(user_id), 0)
+
+    def add(self, user_id, delta):
+        key = str(user_id)
+        self.usage_by_user[key] = max(0, self.usage_by_user.get(key, 0) + delta)
+
+    def replace(self, usage):
+        self.usage_by_user = usage
+        self.loaded = True
+
+    def _write(self, snapshot):
+        tmp = self.db_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.db_path)
+
+    async def save(self):
+        await asyncio.to_thread(self._write, dict(self.usage_by_user))
+
+# ---------- storage tree model ----------
+
+TREE_CACHE_USERS = 256    # cached tree models (LRU)
+TREE_PAGE_CHARS = 3900    # per embed page (description limit is 4096)
+
+def scan_tree(path):
+    """One scandir pass -> sorted [(name, children or None for files)]."""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                entries.append((entry.name, scan_tree(entry.path)))
+            else:
+                entries.append((entry.name, None))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+def render_map_lines(entries, prefix="", out=None):
+    """backup_see style: ┣/┗ connectors, files and folders mixed by name."""
+    out = [] if out is None else out
+    for i, (name, children) in enumerate(entries):
+        is_last = i == len(entries) - 1
+        out.append(f"{prefix}{'┗ ' if is_last else '┣ '}{name}")
+        if children is not None:
+            render_map_lines(children, prefix + ("  " if is_last else "┃ "), out)
+    return out
+
+def render_data_lines(name, entries, depth=0, out=None):
+    """tree_data style: folder line, its files, then its subfolders."""
+    out = [] if out is None else out
+    indent = " " * 4 * depth
+    out.append(f"{indent}┣ {name}/")
+    out.extend(f"{indent}┃ ┗ {n}" for n, children in entries if children is None)
+    for n, children in entries:
+        if children is not None:
+            render_data_lines(n, children, depth + 1, out)
+    return out
+
+def paginate(lines, limit=TREE_PAGE_CHARS):
+    """Splits lines into page strings of at most `limit` chars (a line never straddles pages)."""
+    pages, current, size = [], [], 0
+    for line in lines:
+        line = line[:limit]
+        if current and size + len(line) + 1 > limit:
+            pages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages or [""]
+
+class TreePager(discord.ui.View):
+    """◀ / ▶ buttons over pre-rendered tree pages (only the command author can flip)."""
+
+    def __init__(self, author_id, title, pages):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.title = title
+        self.pages = pages
+        self.index = 0
+        self._sync_buttons()
+
+    def embed(self):
+        embed = discord.Embed(title=self.title, description=f"```\n{self.pages[self.index]}\n```", color=0x2b2d31)
+        embed.set_footer(text=f"Page {self.index + 1}/{len(self.pages)}")
+        return embed
+
+    def _sync_buttons(self):
+        self.prev_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+
+    async def _flip(self, interaction, step):
+        self.index = max(0, min(len(self.pages) - 1, self.index + step))
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction, button):
+        await self._flip(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._flip(interaction, 1)
+
+# ---------- zip expiry scheduler ----------
+
+ZIP_TTL = 3600  # zips not looked at for 1 hour are deleted
+
+class ExpiryScheduler:
+    """Min-heap of (expires_at, path); sleeps until exactly the next expiry.
+
+    Touching a path pushes a new heap entry; the stale one is skipped when popped
+    (self.deadlines holds the real deadline per path).
+    """
+
+    def __init__(self, ttl=ZIP_TTL):
+        self.ttl = ttl
+        self.deadlines = {}  # path -> expires_at
+        self._heap = []
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def load(self, directory, suffix=".zip"):
+        """One listing at startup (mtime, not atime: os.utime on touch keeps it fresh)."""
+        for f in os.listdir(directory):
+            path = os.path.join(directory, f)
+            if f.endswith(".part"):
+                try:
+                    os.remove(path)  # leftover of a crashed zip job
+                except OSError:
+                    pass
+            elif f.endswith(suffix) and os.path.isfile(path):
+                self.schedule(path, os.path.getmtime(path) + self.ttl)
+
+    def schedule(self, path, expires_at):
+        self.deadlines[path] = expires_at
+        heapq.heappush(self._heap, (expires_at, path))
+        self._changed.set()
+
+    def touch(self, path):
+        self.schedule(path, time.time() + self.ttl)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._changed.clear()
+            if not self._heap:
+                await self._changed.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    # a touch/new zip may move the earliest deadline -> re-check
+                    await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            due = []
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, path = heapq.heappop(self._heap)
+                if self.deadlines.get(path) == expires_at:  # not touched since
+                    del self.deadlines[path]
+                    due.append(path)
+            if due:
+                await asyncio.to_thread(_remove_quiet, due)
+
+def _remove_quiet(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _bar(done, total, width=20):
+    filled = int(width * done / total)
+    return "█" * filled + "░" * (width - filled)
 
 class BackupManager(commands.Cog):
     def __init__(self, bot):
@@ -14,33 +479,41 @@ class BackupManager(commands.Cog):
         self.data_dir = "user_data"
         self.limit_2gb = 2 * 1024 * 1024 * 1024 # Unpacked limit
         self.max_upload = 10 * 1024 * 1024      # Discord 10MB limit
+        self._zip_slots = asyncio.Semaphore(BACKUP_WORKERS)
+        self._zip_procs = set()
+        self.ledger = StorageLedger(os.path.join(self.backup_dir, "storage_usage.json"))
+        self.chunk_dir = os.path.join(self.backup_dir, "chunks")
+        self.snapshots_dir = os.path.join(self.backup_dir, "snapshots")
+        self._trees = OrderedDict()  # user id -> {"model": entries, style: lines}
+        self.expiry = ExpiryScheduler()
         
         # Ensure folders exist
         for d in [self.backup_dir, self.data_dir]:
             if not os.path.exists(d): 
                 os.makedirs(d)
         
-        self.auto_cleanup.start()
+        self.expiry.load(self.backup_dir)
+        self.expiry.start()
+        self.reconcile_usage.start()
+        self.chunk_gc.start()
 
     def cog_unload(self):
-        self.auto_cleanup.cancel()
+        self.expiry.stop()
+        self.reconcile_usage.cancel()
+        self.chunk_gc.cancel()
+        for proc in list(self._zip_procs):
+            proc.kill()
 
     def get_free_space(self):
-        """Hardware check for HP-Note storage"""
-        if platform.system() == 'Windows':
-            free_bytes = ctypes.c_ulonglong(0)
-            ctypes.windll.kernel32.GetDiskFreeSpaceExW(ctypes.c_wchar_p("C:\\"), None, None, ctypes.pointer(free_bytes))
-            return free_bytes.value
-        return os.statvfs('/').f_bavail * os.statvfs('/').f_frsize
-
-    def get_folder_size(self, path):
-        """Calculates total size of a directory"""
-        total = 0
-        if not os.path.exists(path): return 0
-        for root, _, files in os.walk(path):
-            for f in files:
-                total += os.path.getsize(os.path.join(root, f))
-        return total
+        """Hardware check for HP-Note storage (from the resource monitor's last sample)"""
+        return self.bot.resources.snapshot.disk_free
+
+    async def get_user_usage(self, user_id):
+        """Bytes in a user's data folder, O(1) from the ledger
+        (no ledger file yet / unreadable -> one walk first, an empty ledger would pass every quota)"""
+        if not self.ledger.loaded:
+            await self.reconcile_usage()
+        return self.ledger.usage(user_id)
 
     def clean_temp(self):
         """Wipes %temp% files to free up space"""
@@ -53,18 +526,42 @@ class BackupManager(commands.Cog):
                     elif os.path.isdir(path): shutil.rmtree(path)
                 except: continue
 
-    @tasks.loop(minutes=10)
-    async def auto_cleanup(self):
-        """Deletes zips not looked at for 1 hour"""
-        now = datetime.datetime.now()
-        for f in os.listdir(self.backup_dir):
-            path = os.path.join(self.backup_dir, f)
-            if (now - datetime.datetime.fromtimestamp(os.path.getatime(path))).seconds > 3600:
-                os.remove(path)
+    @tasks.loop(minutes=30)
+    async def reconcile_usage(self):
+        """Re-walks user_data in a thread to correct any drift in the ledger
+        (an upload racing the walk is simply corrected by the next pass)"""
+        try:
+            usage = await asyncio.to_thread(scan_usage, self.data_dir)
+            for uid in set(usage) | set(self.ledger.usage_by_user):
+                if usage.get(uid) != self.ledger.usage_by_user.get(uid):
+                    self.invalidate_tree(uid)  # changed behind our back
+            self.ledger.replace(usage)
+            await self.ledger.save()
+        except Exception as e:
+            print(f"⚠️ Storage reconcile error: {e}")
+
+    @tasks.loop(hours=6)
+    async def chunk_gc(self):
+        """Frees chunks only pruned snapshots were using"""
+        try:
+            freed = await asyncio.to_thread(gc_chunks, self.chunk_dir, self.snapshots_dir)
+            if freed:
+                print(f"🧹 Backup chunk GC freed {freed / (1024*1024):.1f}MB")
+        except Exception as e:
+            print(f"⚠️ Chunk GC error: {e}")
+
+    def touch_zip(self, zip_path):
+        """Resets a zip's 1-hour expiry (on disk too, so it survives a restart)"""
+        if os.path.exists(zip_path):
+            os.utime(zip_path, None)
+            self.expiry.touch(zip_path)
 
     @commands.hybrid_command(name="backup_make")
-    async def backup_make(self, ctx):
-        """Limit: 1 per month. Checks for 2GB limit and creates a private chat."""
+    async def backup_make(self, ctx, mode: str = "full"):
+        """full = zip (1 per month) | incremental = snapshot of what changed (1 per hour)."""
+        if mode.lower() in ("incremental", "inc", "snapshot"):
+            return await self.backup_incremental(ctx)
+
         user_path = os.path.join(self.data_dir, str(ctx.author.id))
         zip_name = f"backup_{ctx.author.id}.zip"
         zip_path = os.path.join(self.backup_dir, zip_name)
@@ -76,7 +573,7 @@ class BackupManager(commands.Cog):
                 return await ctx.send("❌ **Limit Reached:** 1 backup per month.")
 
         # 2. Check 2GB Limit & Disk Space
-        unpacked_size = self.get_folder_size(user_path)
+        unpacked_size = await self.get_user_usage(ctx.author.id)
         if unpacked_size > self.limit_2gb or self.get_free_space() < self.limit_2gb:
             return await ctx.send("⚠️ **Error:** 2GBs Limited! Cannot process backup.")
 
@@ -84,14 +581,126 @@ class BackupManager(commands.Cog):
         thread = await ctx.channel.create_thread(name=f"Backup-{ctx.author.name}", type=discord.ChannelType.private_thread)
         await ctx.send(f"📂 Backup started in {thread.mention}")
 
-        # 4. Zip Process
-        await thread.send("🗜️ **Compressing...**")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(user_path):
-                for f in files:
-                    zipf.write(os.path.join(root, f), os.path.relpath(os.path.join(root, f), user_path))
-        
-        await thread.send("✅ Done! Use `/backup_save` here to download.")
+        # 4. Zip Process (separate process, the bot keeps its heartbeat)
+        status = await thread.send("🗜️ **Compressing...**")
+        if self._zip_slots.locked():
+            await status.edit(content="⏳ **Waiting for a free backup worker...**")
+
+        async with self._zip_slots:
+            result = await self.run_job(build_zip, (user_path, zip_path), status, "Compressing")
+
+        if result[0] == "done":
+            _, zip_size, file_count = result
+            self.expiry.touch(zip_path)
+            await status.edit(content=f"🗜️ **Compressed** {file_count} files → {zip_size / (1024*1024):.1f}MB")
+            await thread.send("✅ Done! Use `/backup_save` here to download.")
+        else:
+            await thread.send(f"⚠️ **Backup failed:** {result[1]}")
+
+    async def backup_incremental(self, ctx):
+        user_path = os.path.join(self.data_dir, str(ctx.author.id))
+        snap_dir = os.path.join(self.snapshots_dir, str(ctx.author.id))
+        if not os.path.isdir(user_path):
+            return await ctx.send("📂 Your storage is currently empty.")
+
+        existing = list_snapshots(snap_dir)
+        if existing:
+            last = os.path.getmtime(os.path.join(snap_dir, f"{existing[-1]}.json"))
+            if time.time() - last < SNAPSHOT_MIN_GAP:
+                return await ctx.send("❌ **Limit Reached:** 1 snapshot per hour.")
+
+        # Same 2GB Limit & Disk Space rules as a full backup (the chunk store lives on this disk too)
+        unpacked_size = await self.get_user_usage(ctx.author.id)
+        if unpacked_size > self.limit_2gb or self.get_free_space() < self.limit_2gb:
+            return await ctx.send("⚠️ **Error:** 2GBs Limited! Cannot process backup.")
+
+        thread = await ctx.channel.create_thread(name=f"Backup-{ctx.author.name}", type=discord.ChannelType.private_thread)
+        await ctx.send(f"📂 Incremental backup started in {thread.mention}")
+
+        status = await thread.send("🧩 **Scanning for changes...**")
+        if self._zip_slots.locked():
+            await status.edit(content="⏳ **Waiting for a free backup worker...**")
+
+        async with self._zip_slots:
+            result = await self.run_job(build_snapshot, (user_path, self.chunk_dir, snap_dir), status, "Snapshotting")
+
+        if result[0] == "done":
+            _, snap_id, file_count, new_bytes, reused = result
+            await status.edit(content=f"🧩 **Snapshot `{snap_id}`:** {file_count} files | "
+                                      f"{new_bytes / (1024*1024):.1f}MB new | {reused / (1024*1024):.1f}MB unchanged")
+            await thread.send(f"✅ Done! Use `/backup_get {snap_id}` to build its zip.")
+        else:
+            await thread.send(f"⚠️ **Backup failed:** {result[1]}")
+
+    @commands.hybrid_command(name="backup_snapshots")
+    async def backup_snapshots(self, ctx):
+        """Lists your incremental snapshots."""
+        snap_ids = list_snapshots(os.path.join(self.snapshots_dir, str(ctx.author.id)))
+        if not snap_ids:
+            return await ctx.send("🧩 No snapshots yet. Use `/backup_make incremental`.")
+        lines = "\n".join(f"┣ {s}" for s in reversed(snap_ids))
+        await ctx.send(f"🧩 **Your Snapshots** (newest first):\n```\n{lines}\n```")
+
+    @commands.hybrid_command(name="backup_get")
+    async def backup_get(self, ctx, snapshot: str):
+        """Builds the zip of one snapshot from the chunk store."""
+        snap_dir = os.path.join(self.snapshots_dir, str(ctx.author.id))
+        if snapshot not in list_snapshots(snap_dir):
+            return await ctx.send(f"❌ Snapshot `{snapshot}` not found. See `/backup_snapshots`.")
+
+        zip_path = os.path.join(self.backup_dir, f"backup_{ctx.author.id}_{snapshot}.zip")
+        if not os.path.exists(zip_path):
+            # Refuse before spending minutes on a zip Discord won't take anyway
+            estimate = await asyncio.to_thread(snapshot_zip_estimate, snap_dir, snapshot, self.chunk_dir)
+            if estimate > self.max_upload:
+                return await ctx.send(f"📦 `{snapshot}` would be about {estimate/(1024*1024):.1f}MB, which exceeds the 10MB limit.")
+            status = await ctx.send("🗜️ **Assembling...**")
+            async with self._zip_slots:
+                result = await self.run_job(assemble_snapshot, (snap_dir, snapshot, self.chunk_dir, zip_path), status, "Assembling")
+            if result[0] != "done":
+                return await ctx.send(f"⚠️ **Assembly failed:** {result[1]}")
+            self.expiry.touch(zip_path)
+        else:
+            self.touch_zip(zip_path)
+
+        zip_size = os.path.getsize(zip_path)
+        if zip_size > self.max_upload:
+            return await ctx.send(f"📦 `{snapshot}` is {zip_size/(1024*1024):.1f}MB, which exceeds the 10MB limit.")
+        await ctx.send(f"📦 Snapshot `{snapshot}`", file=discord.File(zip_path))
+
+    async def run_job(self, target, args, status, verb):
+        """Runs target(*args, conn) in a spawn process and mirrors its progress into `status`."""
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=target, args=(*args, child_conn), daemon=True)
+        proc.start()
+        child_conn.close()
+        self._zip_procs.add(proc)
+
+        try:
+            while True:
+                ready = await asyncio.to_thread(parent_conn.poll, 1.0)
+                if not ready:
+                    if not proc.is_alive() and not parent_conn.poll():
+                        return ("error", f"worker exited with code {proc.exitcode}")
+                    continue
+                try:
+                    msg = parent_conn.recv()
+                except EOFError:
+                    return ("error", "worker closed the pipe")
+                if msg[0] != "progress":
+                    return msg
+                _, done, total, i, count = msg
+                try:
+                    await status.edit(content=f"🗜️ **{verb}...** `{_bar(done, total)}` {done * 100 // total}% ({i}/{count} files)")
+                except discord.HTTPException:
+                    pass  # progress is best effort
+        finally:
+            parent_conn.close()
+            self._zip_procs.discard(proc)
+            await asyncio.to_thread(proc.join, 5)
+            if proc.is_alive():
+                proc.kill()
 
     @commands.hybrid_command(name="backup_upload")
     async def backup_upload(self, ctx, attachment: discord.Attachment):
@@ -103,13 +712,18 @@ class BackupManager(commands.Cog):
         if attachment.size > self.max_upload:
             return await ctx.send("❌ Discord limit is 10MB!")
 
-        if self.get_folder_size(user_path) + attachment.size > self.limit_2gb:
+        save_path = os.path.join(user_path, attachment.filename)
+        old_size = os.path.getsize(save_path) if os.path.isfile(save_path) else 0  # overwrite
+        if await self.get_user_usage(ctx.author.id) - old_size + attachment.size > self.limit_2gb:
             return await ctx.send("⚠️ **Error:** 2GBs Limited!")
 
         if self.get_free_space() < self.limit_2gb:
             return await ctx.send("❌ PC Storage too low (< 2GB)!")
 
-        await attachment.save(os.path.join(user_path, attachment.filename))
+        await attachment.save(save_path)
+        self.ledger.add(ctx.author.id, attachment.size - old_size)
+        self.invalidate_tree(ctx.author.id)
+        await self.ledger.save()
         await ctx.send(f"📥 Saved `{attachment.filename}`")
 
     @commands.hybrid_command(name="tree_data")
@@ -120,15 +734,43 @@ class BackupManager(commands.Cog):
 
         # Reset 1-hour timer for zip if user looks at files
         zip_path = os.path.join(self.backup_dir, f"backup_{ctx.author.id}.zip")
-        if os.path.exists(zip_path): os.utime(zip_path, None)
+        self.touch_zip(zip_path)
 
-        tree = "📁 **Your Storage**\n"
-        for r, d, fs in os.walk(user_path):
-            indent = " " * 4 * (r.replace(user_path, "").count(os.sep))
-            tree += f"{indent}┣ {os.path.basename(r)}/\n"
-            for f in fs: tree += f"{indent}┃ ┗ {f}\n"
+        lines = await self.get_tree_lines(ctx.author.id, "data")
+        await self.send_tree(ctx, "📁 Your Storage", lines)
 
-        await ctx.send(f"```\n{tree[:1900]}\n```")
+    def invalidate_tree(self, user_id):
+        self._trees.pop(str(user_id), None)
+
+    async def get_tree_lines(self, user_id, style):
+        """Cached rendering of a user's tree; the directory is only scanned after a change."""
+        key = str(user_id)
+        cached = self._trees.get(key)
+        if cached is None:
+            user_path = os.path.join(self.data_dir, key)
+            cached = {"model": await asyncio.to_thread(scan_tree, user_path)}
+            self._trees[key] = cached
+            while len(self._trees) > TREE_CACHE_USERS:
+                self._trees.popitem(last=False)
+        self._trees.move_to_end(key)
+
+        if style not in cached:
+            if style == "data":
+                cached[style] = render_data_lines(key, cached["model"])
+            else:
+                cached[style] = render_map_lines(cached["model"])
+        return cached[style]
+
+    async def send_tree(self, ctx, title, lines):
+        """Short trees inline; long ones as paged embeds + the full map from memory."""
+        text = "\n".join(lines)
+        if len(text) <= 1950:
+            return await ctx.send(f"**{title}:**\n```\n{text}\n```")
+
+        pager = TreePager(ctx.author.id, title, paginate(lines))
+        full_map = discord.File(io.BytesIO(text.encode("utf-8")), "storage_map.txt")
+        await ctx.send("📄 The file list is too long for Discord, here is the full map:",
+                       embed=pager.embed(), view=pager, file=full_map)
     @commands.hybrid_command(name="backup_see")
     async def backup_see(self, ctx):
         """Generates a full tree view of everything currently in your storage."""
@@ -139,36 +781,10 @@ class BackupManager(commands.Cog):
 
         # Update access time on the zip if it exists to keep it alive
         zip_path = os.path.join(self.backup_dir, f"backup_{ctx.author.id}.zip")
-        if os.path.exists(zip_path): 
-            os.utime(zip_path, None)
+        self.touch_zip(zip_path)
 
-        def build_tree(path, prefix=""):
-            items = sorted(os.listdir(path))
-            tree_str = ""
-            for i, item in enumerate(items):
-                is_last = i == len(items) - 1
-                connector = "┗ " if is_last else "┣ "
-                full_path = os.path.join(path, item)
-                
-                tree_str += f"{prefix}{connector}{item}\n"
-                
-                if os.path.isdir(full_path):
-                    extension = "  " if is_last else "┃ "
-                    tree_str += build_tree(full_path, prefix + extension)
-            return tree_str
-
-        full_tree = build_tree(user_path)
-        
-        # Split message if it's longer than 2000 characters
-        if len(full_tree) > 1950:
-            # If the tree is massive, send as a text file
-            with open("temp_tree.txt", "w", encoding="utf-8") as f:
-                f.write(full_tree)
-            await ctx.send("📄 The file list is too long for Discord, here is the full map:", 
-                           file=discord.File("temp_tree.txt", "storage_map.txt"))
-            os.remove("temp_tree.txt")
-        else:
-            await ctx.send(f"📂 **Full Storage Map:**\n```\n{full_tree}\n```")
+        lines = await self.get_tree_lines(ctx.author.id, "map")
+        await self.send_tree(ctx, "📂 Full Storage Map", lines)
 
     @commands.hybrid_command(name="backup_download")
     async def backup_download(self, ctx, filename: str):
@@ -197,7 +813,11 @@ class BackupManager(commands.Cog):
         """Delete specific file to free up space."""
         path = os.path.join(self.data_dir, str(ctx.author.id), filename)
         if os.path.exists(path):
+            size = os.path.getsize(path)
             os.remove(path)
+            self.ledger.add(ctx.author.id, -size)
+            self.invalidate_tree(ctx.author.id)
+            await self.ledger.save()
             await ctx.send(f"🗑️ Deleted `{filename}`")
         else:
             await ctx.send("❌ Not found.")
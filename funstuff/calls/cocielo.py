@@ -1,9 +1,10 @@
 import aiohttp
 import asyncio
 
-async def generate_cocielo_video(images: list[str], output="cocielo_chaves.mp4"):
+async def generate_cocielo_video(images: list[str], output="cocielo_chaves.mp4", http_pool=None):
     """
     images: list of image URLs (max 5)
+    http_pool: bot.http_pool (falls back to a one-off session when called standalone)
     """
     payload = {
         "images": [
@@ -19,17 +20,20 @@ async def generate_cocielo_video(images: list[str], output="cocielo_chaves.mp4")
         "User-Agent": "Loritta-Python-Test/1.0"
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "https://gabriela.loritta.website/api/v1/videos/cocielo-chaves",
-            json=payload,
-            headers=headers
-        ) as resp:
+    url = "https://gabriela.loritta.website/api/v1/videos/cocielo-chaves"
+    if http_pool is not None:
+        resp = await http_pool.request("POST", url, json=payload, headers=headers, timeout=180)
+        if resp.status < 200 or resp.status >= 300:
+            raise RuntimeError(f"API failed with status {resp.status}")
+        video_bytes = resp.body
+    else:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=payload, headers=headers) as resp:
 
-            if resp.status < 200 or resp.status >= 300:
-                raise RuntimeError(f"API failed with status {resp.status}")
+                if resp.status < 200 or resp.status >= 300:
+                    raise RuntimeError(f"API failed with status {resp.status}")
 
-            video_bytes = await resp.read()
+                video_bytes = await resp.read()
 
     with open(output, "wb") as f:
         f.write(video_bytes)
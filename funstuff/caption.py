@@ -1,7 +1,55 @@
-import discord
 from discord.ext import commands
-import io
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from PIL import ImageDraw, ImageFont, ImageOps
+from services.image_cache import as_image
+from services.encoder import encode_image
+
+def render_caption(img_bytes, text, font_path):
+    # drawn on in place -> private copy of a cached handle
+    img = as_image(img_bytes, "RGBA", writable=True)
+
+    # 2. HP-Note Guard: Resize if too big (max 800px)
+    if max(img.size) > 800:
+        img.thumbnail((800, 800))
+
+    draw = ImageDraw.Draw(img)
+    w, h = img.size
+
+    # 3. Font Scaling (approx 1/10th of image height)
+    font_size = int(h / 10)
+    try:
+        font = ImageFont.truetype(font_path, font_size)
+    except:
+        font = ImageFont.load_default()
+
+    # 4. Text Wrapping & Centering
+    # We split text by '|' if the user wants top and bottom
+    parts = text.split("|")
+    
+    def draw_text_with_outline(content, y_pos):
+        # Calculate text size using textbbox (Pillow 9.2.0+)
+        bbox = draw.textbbox((0, 0), content, font=font)
+        tw = bbox[2] - bbox[0]
+        tx = (w - tw) / 2
+        
+        # Draw Black Outline (Stroke)
+        stroke = 2
+        for ox in range(-stroke, stroke + 1):
+            for oy in range(-stroke, stroke + 1):
+                draw.text((tx + ox, y_pos + oy), content, font=font, fill="black")
+        
+        # Draw White Text
+        draw.text((tx, y_pos), content, font=font, fill="white")
+
+    # If user used "Top | Bottom", split them
+    if len(parts) > 1:
+        draw_text_with_outline(parts[0].strip().upper(), 10) # Top
+        draw_text_with_outline(parts[1].strip().upper(), h - font_size - 20) # Bottom
+    else:
+        # Default to bottom
+        draw_text_with_outline(text.upper(), h - font_size - 20)
+
+    # 5. Encode (the cog sends it)
+    return encode_image(img.convert("RGB"))
 
 class ImageTools(commands.Cog):
     def __init__(self, bot):
@@ -11,67 +59,21 @@ class ImageTools(commands.Cog):
     @commands.command(name="caption")
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def caption(self, ctx, *, text: str = None):
-        """Usage: !caption <text> (attach an image)"""
-        if not ctx.message.attachments:
-            return await ctx.send("🖼️ Please attach an image to caption!")
-        
+        """Usage: !caption <text> (attach an image, or uses the last image in the channel)"""
         if not text:
             return await ctx.send("✍️ Please provide the text for the caption.")
 
         async with ctx.typing():
             try:
-                # 1. Load Image
-                attachment = ctx.message.attachments[0]
-                img_bytes = await attachment.read()
-                img = Image.open(io.BytesIO(img_bytes)).convert("RGBA")
-
-                # 2. HP-Note Guard: Resize if too big (max 800px)
-                if max(img.size) > 800:
-                    img.thumbnail((800, 800))
-
-                draw = ImageDraw.Draw(img)
-                w, h = img.size
-
-                # 3. Font Scaling (approx 1/10th of image height)
-                font_size = int(h / 10)
-                try:
-                    font = ImageFont.truetype(self.font_path, font_size)
-                except:
-                    font = ImageFont.load_default()
-
-                # 4. Text Wrapping & Centering
-                # We split text by '|' if the user wants top and bottom
-                parts = text.split("|")
-                
-                def draw_text_with_outline(content, y_pos):
-                    # Calculate text size using textbbox (Pillow 9.2.0+)
-                    bbox = draw.textbbox((0, 0), content, font=font)
-                    tw = bbox[2] - bbox[0]
-                    tx = (w - tw) / 2
-                    
-                    # Draw Black Outline (Stroke)
-                    stroke = 2
-                    for ox in range(-stroke, stroke + 1):
-                        for oy in range(-stroke, stroke + 1):
-                            draw.text((tx + ox, y_pos + oy), content, font=font, fill="black")
-                    
-                    # Draw White Text
-                    draw.text((tx, y_pos), content, font=font, fill="white")
-
-                # If user used "Top | Bottom", split them
-                if len(parts) > 1:
-                    draw_text_with_outline(parts[0].strip().upper(), 10) # Top
-                    draw_text_with_outline(parts[1].strip().upper(), h - font_size - 20) # Bottom
-                else:
-                    # Default to bottom
-                    draw_text_with_outline(text.upper(), h - font_size - 20)
+                # 1. Load Image (shared decoded-image cache, bot.image_cache)
+                img_bytes = await self.bot.image_cache.load_image(ctx, None, "RGBA")
+                if img_bytes is None:
+                    return await ctx.send("🖼️ Please attach an image to caption! (max 5MB)")
 
-                # 5. Save and Send
-                out = io.BytesIO()
-                img.convert("RGB").save(out, format="JPEG", quality=85)
-                out.seek(0)
+                # 2-5. Draw on the render farm (off the event loop)
+                out = await self.bot.render_farm.submit("image", render_caption, img_bytes, text, self.font_path)
 
-                await ctx.send(file=discord.File(out, filename="caption.jpg"))
+                await ctx.send(file=self.bot.encoder.file(out, "caption.jpg"))
 
             except Exception as e:
                 await ctx.send(f"⚠️ Caption Error: {e}")
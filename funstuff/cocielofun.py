@@ -1,55 +1,509 @@
 import asyncio
 import base64
+import hashlib
 import io
 import time
 import weakref
+from collections import OrderedDict, deque
 from typing import List
 import json
 
 import aiohttp
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import subprocess
 import tempfile
 import os
+import shutil
 
 # Replace with your actual emoji IDs or keep unicode
 EMOJI_CRY = "😢"   # or "<:lori_chorando:ID>"
 EMOJI_RAGE = "😣"
 
+# --- COCIELO API ---
+COCIELO_API = "https://gabriela.loritta.website/api/v1/videos/cocielo-chaves"
+COCIELO_BACKEND = "aiohttp"   # "java" = old tools/CocieloChaves CLI (one JVM per request)
+CONNECT_TIMEOUT = 20          # same limits the Java client used
+REQUEST_TIMEOUT = 180         # for the whole render, retries included
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = (429, 503)   # refused before rendering started -> safe to POST again
+BACKOFF_BASE = 1.5            # seconds, doubled after each failed attempt
+MAX_VIDEO_BYTES = 50 * 1024 * 1024
+SPOOL_IN_RAM = 8 * 1024 * 1024  # bigger videos spill to a temp file while streaming
+CHUNK_SIZE = 64 * 1024
+
+# --- AVATAR CACHE ---
+AVATAR_CACHE_BYTES = 32 * 1024 * 1024   # memory LRU and disk dir each stay under this
+AVATAR_CACHE_DIR = os.path.join("cache", "avatars")  # None = memory only
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class AvatarCache:
+    """Bounded LRU of avatar PNG bytes keyed by (user id, avatar hash).
+
+    A new avatar means a new hash, so entries never go stale. With a cache dir
+    they also survive restarts (checked before the CDN on a memory miss); the
+    dir has the same byte budget, oldest mtime goes first.
+    """
+
+    def __init__(self, max_bytes=AVATAR_CACHE_BYTES, cache_dir=AVATAR_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._disk = OrderedDict()  # path -> size, least recently used first
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".png"):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.path, st.st_size))
+        for _, path, size in sorted(entries):
+            self._disk[path] = size
+            self._disk_bytes += size
+        _remove_files(self._over_budget())
+
+    def _over_budget(self):
+        """Drops the oldest disk entries from the index; returns the paths to delete."""
+        doomed = []
+        while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+            path, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            doomed.append(path)
+        return doomed
+
+    def _disk_path(self, key):
+        user_id, avatar_hash = key
+        return os.path.join(self.cache_dir, f"{user_id}_{avatar_hash}.png")
+
+    def _remember(self, key, data):
+        if key in self._items:
+            self._bytes -= len(self._items.pop(key))
+        self._items[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self._bytes -= len(old)
+
+    async def get(self, key):
+        data = self._items.get(key)
+        if data is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            def read():
+                if not os.path.exists(path):
+                    return None
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)  # mtime = last use, so the order survives restarts
+                return data
+            try:
+                data = await asyncio.to_thread(read)
+            except OSError:
+                data = None
+            if data is not None:
+                if path in self._disk:
+                    self._disk.move_to_end(path)
+                self._remember(key, data)
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        return None
+
+    async def put(self, key, data):
+        self._remember(key, data)
+        if self.cache_dir:
+            path = self._disk_path(key)
+            def write():
+                with open(path, "wb") as f:
+                    f.write(data)
+            try:
+                await asyncio.to_thread(write)
+            except OSError as e:
+                print("Falha ao salvar avatar no cache:", e)
+                return
+            self._disk_bytes += len(data) - self._disk.pop(path, 0)
+            self._disk[path] = len(data)
+            doomed = self._over_budget()
+            if doomed:
+                await asyncio.to_thread(_remove_files, doomed)
+
+
+class CocieloAPIError(Exception):
+    def __init__(self, message, client_error=False, retryable=False):
+        super().__init__(message)
+        self.client_error = client_error  # 4xx -> our payload is bad, retrying won't help
+        self.retryable = retryable        # the server never started on it
+
+
+class CocieloClient:
+    """Native async client for the Cocielo video API (replaces the per-request JVM)."""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+
+    async def render(self, payload: dict):
+        """POSTs the payload and returns the MP4 as a rewound file object.
+
+        The POST isn't idempotent (every call renders a video), so only failures
+        where the server never started are retried: connect errors, 429 and 503.
+        Everything, retries and backoff included, fits in REQUEST_TIMEOUT.
+        """
+        body = json.dumps(payload).encode()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REQUEST_TIMEOUT
+        last_error = None
+
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                return await self._post(body, remaining)
+            except CocieloAPIError as e:
+                if not e.retryable:
+                    raise
+                last_error = e
+            except aiohttp.ClientConnectorError as e:
+                last_error = e
+            except aiohttp.ClientError as e:
+                # reached the server, it may be rendering already -> don't send it again
+                raise CocieloAPIError(f"Connection failed: {e!r}") from e
+            print(f"⚠️ Cocielo API attempt {attempt + 1}/{MAX_ATTEMPTS} failed: {last_error!r}")
+
+        raise CocieloAPIError(f"API failed after {attempt + 1} attempts: {last_error}")
+
+    async def _post(self, body: bytes, total_timeout: float):
+        headers = {"Content-Type": "application/json"}
+        timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=min(CONNECT_TIMEOUT, total_timeout))
+        async with self.session.post(COCIELO_API, data=body, headers=headers, timeout=timeout) as resp:
+            if resp.status in RETRY_STATUSES:
+                raise CocieloAPIError(f"Server busy: {resp.status} {await resp.text(errors='ignore')}", retryable=True)
+            if resp.status >= 500:
+                raise CocieloAPIError(f"Server error: {resp.status} {await resp.text(errors='ignore')}")
+            if 400 <= resp.status < 500:
+                raise CocieloAPIError(f"Client error: {resp.status} {await resp.text(errors='ignore')}", client_error=True)
+            if resp.status != 200:
+                raise CocieloAPIError(f"Unexpected status: {resp.status}")
+
+            # Stream the body straight into the upload buffer (no second full copy)
+            video = tempfile.SpooledTemporaryFile(max_size=SPOOL_IN_RAM)
+            try:
+                size = 0
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_VIDEO_BYTES:
+                        raise CocieloAPIError(f"Video larger than {MAX_VIDEO_BYTES // 1024 // 1024}MB", client_error=True)
+                    video.write(chunk)
+            except BaseException:
+                video.close()
+                raise
+            video.seek(0)
+            return video
+
+
+async def render_with_java(payload: dict):
+    """Old path: tools/CocieloChaves.java (compiled on first use), MP4 over stdout."""
+    # write payload to a temporary JSON file and call Java CLI
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w", encoding="utf-8")
+    try:
+        json.dump(payload, tmp)
+        tmp_path = tmp.name
+    finally:
+        tmp.close()
+
+    try:
+        # compile Java CLI if needed
+        java_src = os.path.join(os.getcwd(), "tools", "CocieloChaves.java")
+        class_file = os.path.join(os.getcwd(), "tools", "CocieloChaves.class")
+        if not os.path.exists(class_file):
+            print("Compilando Java CLI...")
+            p = await asyncio.create_subprocess_exec("javac", java_src, cwd=os.getcwd(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            out, err = await p.communicate()
+            if p.returncode != 0:
+                print("javac failed:", err.decode(errors="ignore"))
+                raise CocieloAPIError("Erro ao compilar a ferramenta Java. Certifique-se de que o JDK está instalado.")
+
+        # run Java CLI and capture stdout (binary video)
+        proc = await asyncio.create_subprocess_exec("java", "-cp", os.path.join(os.getcwd(), "tools"), "CocieloChaves", tmp_path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await proc.communicate()
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+
+    if proc.returncode == 2:
+        raise CocieloAPIError(f"Client error from API: {stderr.decode(errors='ignore')}", client_error=True)
+    elif proc.returncode != 0:
+        raise CocieloAPIError(f"Error from Java tool (code {proc.returncode}): {stderr.decode(errors='ignore')}")
+    return io.BytesIO(stdout)
+
+# --- RESULT CACHE ---
+VIDEO_CACHE_DIR = os.path.join("cache", "cocielo")
+VIDEO_CACHE_BYTES = 512 * 1024 * 1024
+VIDEO_CACHE_TTL = 24 * 3600
+
+
+def payload_key(images_payload):
+    """sha256 over the ordered per-image hashes (same 5 images, same order -> same video)."""
+    parts = [hashlib.sha256(f"{img['type']}:{img['content']}".encode()).hexdigest() for img in images_payload]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+class VideoCache:
+    """Disk store of rendered MP4s with a byte limit (LRU) and a TTL."""
+
+    def __init__(self, cache_dir=VIDEO_CACHE_DIR, max_bytes=VIDEO_CACHE_BYTES, ttl=VIDEO_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._index = OrderedDict()  # key -> (size, created_at), least recently used first
+        self._bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".mp4"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for created, key, size in sorted(entries):
+            self._index[key] = (size, created)
+            self._bytes += size
+
+    def _forget(self, key):
+        size, _ = self._index.pop(key)
+        self._bytes -= size
+        return self._path(key)
+
+    def get(self, key):
+        """Open file of a fresh cached video, or None.
+
+        Opened right here: a put() evicting it while the caller is still sending
+        can then only unlink the name, not the file the caller is reading.
+        """
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl:
+            path = self._forget(key)
+            asyncio.get_running_loop().run_in_executor(None, _unlink_quiet, path)
+            return None
+        try:
+            video = open(self._path(key), "rb")
+        except OSError:
+            self._forget(key)  # deleted behind our back
+            return None
+        self._index.move_to_end(key)
+        return video
+
+    async def put(self, key, video):
+        """Copies a (rewound) video file object into the store, then rewinds it again."""
+        path = self._path(key)
+
+        def write():
+            tmp = path + ".part"
+            with open(tmp, "wb") as f:
+                shutil.copyfileobj(video, f)
+            os.replace(tmp, path)  # readers never see half a file
+            video.seek(0)
+            return os.path.getsize(path)
+
+        try:
+            size = await asyncio.to_thread(write)
+        except OSError as e:
+            print("Falha ao salvar vídeo no cache:", e)
+            video.seek(0)
+            return
+        if key in self._index:
+            self._forget(key)
+        self._index[key] = (size, time.time())
+        self._bytes += size
+
+        # expired entries go first, a key nobody asks for again would otherwise sit here until LRU pressure
+        now = time.time()
+        victims = [self._forget(k) for k, (_, created) in list(self._index.items()) if now - created > self.ttl]
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            victims.append(self._forget(next(iter(self._index))))
+        if victims:
+            await asyncio.to_thread(lambda: [_unlink_quiet(p) for p in victims])
+
+
+def _unlink_quiet(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# --- GUILD JOB QUEUE ---
+MAX_CONCURRENT_RENDERS = 2   # API calls in flight across all guilds
+MAX_QUEUED_PER_GUILD = 3
+GUILD_IDLE_SECONDS = 60      # idle guild entries are dropped by the sweeper
+
+
+class QueueFull(Exception):
+    pass
+
+
+class GuildEntry:
+    __slots__ = ("jobs", "running", "last_active")
+
+    def __init__(self):
+        self.jobs = deque()   # (job_fn, future)
+        self.running = False  # one render per guild at a time (like the old lock)
+        self.last_active = time.time()
+
+
+class GuildJobQueue:
+    """Per-guild FIFO queues served round-robin under a global concurrency cap."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_RENDERS, per_guild=MAX_QUEUED_PER_GUILD,
+                 idle_seconds=GUILD_IDLE_SECONDS):
+        self.per_guild = per_guild
+        self.idle_seconds = idle_seconds
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._guilds = {}      # guild_id -> GuildEntry
+        self._ring = deque()   # guild ids with waiting jobs, in round-robin order
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self._running = set()  # strong refs: the loop only keeps weak ones to tasks
+        self.sweeper.change_interval(seconds=idle_seconds)
+
+    def start(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        if not self.sweeper.is_running():
+            self.sweeper.start()
+
+    def stop(self):
+        self.sweeper.cancel()
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in self._running:
+            task.cancel()
+        for entry in self._guilds.values():
+            for _, fut in entry.jobs:
+                fut.cancel()
+
+    def submit(self, guild_id, job_fn):
+        """Queues job_fn() for this guild -> (jobs ahead of it in this guild, future)."""
+        entry = self._guilds.get(guild_id)
+        if entry is None:
+            entry = self._guilds[guild_id] = GuildEntry()
+        if len(entry.jobs) >= self.per_guild:
+            raise QueueFull()
+
+        ahead = len(entry.jobs) + (1 if entry.running else 0)
+        fut = asyncio.get_running_loop().create_future()
+        entry.jobs.append((job_fn, fut))
+        entry.last_active = time.time()
+        if guild_id not in self._ring:
+            self._ring.append(guild_id)
+        self._wakeup.set()
+        return ahead, fut
+
+    def _next_job(self):
+        """Next guild in the ring that isn't already rendering."""
+        for _ in range(len(self._ring)):
+            guild_id = self._ring.popleft()
+            entry = self._guilds.get(guild_id)
+            if entry is None:
+                continue
+            while entry.jobs and entry.jobs[0][1].done():
+                entry.jobs.popleft()  # cancelled while waiting
+            if not entry.jobs:
+                continue
+            if entry.running:
+                self._ring.append(guild_id)
+                continue
+            job_fn, fut = entry.jobs.popleft()
+            if entry.jobs:
+                self._ring.append(guild_id)  # back of the line for its next job
+            return guild_id, entry, job_fn, fut
+        return None
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            job = self._next_job()
+            while job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                job = self._next_job()
+            task = asyncio.create_task(self._run(*job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, guild_id, entry, job_fn, fut):
+        entry.running = True
+        try:
+            result = await job_fn()
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(result)
+        finally:
+            entry.running = False
+            entry.last_active = time.time()
+            if entry.jobs and guild_id not in self._ring:
+                self._ring.append(guild_id)
+            self._slots.release()
+            self._wakeup.set()
+
+    @tasks.loop(seconds=GUILD_IDLE_SECONDS)
+    async def sweeper(self):
+        now = time.time()
+        idle = [gid for gid, e in self._guilds.items()
+                if not e.running and not e.jobs and now - e.last_active > self.idle_seconds]
+        for gid in idle:
+            del self._guilds[gid]
+
+
 class CocieloChavesCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._http: aiohttp.ClientSession = None
-        # map guild_id -> (asyncio.Lock, last_access_timestamp)
-        self._guild_locks = {}
+        self.jobs = GuildJobQueue()
+        self.avatars = AvatarCache()
+        self.videos = VideoCache()
 
     async def cog_load(self):
-        self._http = aiohttp.ClientSession()
+        # shared bot-wide pool (keep-alive to the API + Discord CDN across renders)
+        self.api = CocieloClient(self.bot.http_pool.session)
+        self.jobs.start()
 
     async def cog_unload(self):
-        await self._http.close()
-
-    def get_lock(self, guild_id: int) -> asyncio.Lock:
-        """Return a per-guild lock with 60s expire-after-access semantics."""
-        now = time.time()
-        entry = self._guild_locks.get(guild_id)
-        if entry is None:
-            lock = asyncio.Lock()
-            self._guild_locks[guild_id] = (lock, now)
-            return lock
-
-        lock, last = entry
-        # expire after 60 seconds of inactivity
-        if now - last > 60:
-            lock = asyncio.Lock()
-            self._guild_locks[guild_id] = (lock, now)
-            return lock
-
-        # update last access
-        self._guild_locks[guild_id] = (lock, now)
-        return lock
+        self.jobs.stop()
 
     async def get_avatar_base64(self, user: discord.User) -> str:
         """Fetch user avatar directly from Discord CDN and return base64 data URI."""
@@ -62,15 +516,26 @@ class CocieloChavesCog(commands.Cog):
             # Avatar padrão do Discord (0-5)
             default_index = int(user.discriminator) % 5 if user.discriminator != "0" else (user.id >> 22) % 6
             avatar_url = f"https://cdn.discordapp.com/embed/avatars/{default_index}.png"
+            avatar_hash = f"default{default_index}"
 
-        async with self._http.get(avatar_url) as resp:
+        key = (user.id, avatar_hash)
+        data = await self.avatars.get(key)
+        if data is None:
+            resp = await self.bot.http_pool.request("GET", avatar_url)
             if resp.status != 200:
                 raise ValueError(f"Failed to fetch avatar from CDN ({resp.status})")
-
-            data = await resp.read()
-            b64 = base64.b64encode(data).decode()
-            # return raw base64 (server expects base64 string, not data URI)
-            return b64
+            data = resp.body
+            await self.avatars.put(key, data)
+
+        # return raw base64 (server expects base64 string, not data URI)
+        return base64.b64encode(data).decode()
+
+    async def get_attachment_base64(self, att: discord.Attachment) -> str:
+        resp = await self.bot.http_pool.request("GET", att.url)
+        if resp.status != 200:
+            raise ValueError(f"Falha ao baixar anexo {att.url}: {resp.status}")
+        data = resp.body
+        return base64.b64encode(data).decode()
         
     def get_avatar_url(self, user: discord.User) -> str:
         """Return stable Discord CDN avatar URL."""
@@ -91,168 +556,141 @@ class CocieloChavesCog(commands.Cog):
     @app_commands.describe(
         users="Mencione até 5 usuários (@user) ou cole os IDs separados por espaço"
     )
-    @commands.cooldown(1, 45, commands.BucketType.guild)
+    @commands.cooldown(1, 45, commands.BucketType.user)  # the guild queue handles bursts
     @commands.guild_only()
     async def cocielochaves(self, ctx: commands.Context, *, users: str = None):
-        lock = self.get_lock(ctx.guild.id)
-
-        if lock.locked():
-            await ctx.send(f"Já tem um vídeo sendo gerado aqui {EMOJI_CRY}")
-            return
-
-        async with lock:
-            # Parse users: mentions first, then split IDs from the string
-            members = []
-            if ctx.message.mentions:
-                mentions = [m for m in ctx.message.mentions if not m.bot]
-                if len(mentions) > 5:
-                    members = mentions[:5]
-                    await ctx.send("Limitei aos primeiros 5 usuários mencionados. Use no máximo 5 usuários.")
-                else:
-                    members = mentions[:5]
-
-            if not members and users:
-                # Try parsing as space-separated IDs (limit to first 5 tokens)
-                parts = users.split()
-                if len(parts) > 5:
-                    parts = parts[:5]
-                    await ctx.send("Limitei aos primeiros 5 IDs fornecidos. Use no máximo 5 usuários.")
-
-                for part in parts:
-                    try:
-                        uid = int(part.strip())
-                        user = await self.bot.fetch_user(uid)
-                        members.append(user)
-                    except (ValueError, discord.NotFound):
-                        continue
-                members = members[:5]
-
-            usage = (
-                "Mencione os usuários ou cole os IDs!\n\n"
-                "**Exemplo:**\n"
-                "`cocielochaves @Denilson @Amigo1 @Amigo2`\n"
-                "ou\n"
-                "`cocielochaves 297153970613387264 159985870458322944`\n\n"
-                "Usa os avatares para fazer a edição Chaves Cocielo! 🚀"
-            )
-
-            # Kotlin behavior: expects 5 images. If none provided, show usage.
-            if not members:
-                await ctx.send(usage)
-                return
-            # If there is at least one member, proceed — we'll fill missing slots
-            # with Discord default avatars so the API always receives up to 5 images.
-            await ctx.defer()
-
-            images_payload = []
-
-            # First, include any image attachments from the message (as base64)
-            attachments = getattr(ctx.message, "attachments", []) or []
-            if attachments and len(attachments) > 5:
-                await ctx.send("Limitei aos primeiros 5 anexos. Use no máximo 5 imagens.")
-
-            for att in attachments[:5]:
-                if len(images_payload) >= 5:
-                    break
-                try:
-                    async with self._http.get(att.url) as resp:
-                        if resp.status != 200:
-                            print(f"Falha ao baixar anexo {att.url}: {resp.status}")
-                            continue
-                        data = await resp.read()
-                        b64 = base64.b64encode(data).decode()
-                        images_payload.append({"type": "base64", "content": b64})
-                except Exception as e:
-                    print("Falha ao buscar anexo:", e)
-
-            # Then include avatars from mentioned users / IDs until we reach 5 images
-            for member in members:
-                if len(images_payload) >= 5:
-                    break
+        # Parse users: mentions first, then split IDs from the string
+        members = []
+        if ctx.message.mentions:
+            mentions = [m for m in ctx.message.mentions if not m.bot]
+            if len(mentions) > 5:
+                members = mentions[:5]
+                await ctx.send("Limitei aos primeiros 5 usuários mencionados. Use no máximo 5 usuários.")
+            else:
+                members = mentions[:5]
+
+        if not members and users:
+            # Try parsing as space-separated IDs (limit to first 5 tokens)
+            parts = users.split()
+            if len(parts) > 5:
+                parts = parts[:5]
+                await ctx.send("Limitei aos primeiros 5 IDs fornecidos. Use no máximo 5 usuários.")
+
+            for part in parts:
                 try:
-                    b64 = await self.get_avatar_base64(member)
-                    if b64:
-                        images_payload.append({"type": "base64", "content": b64})
-                except Exception as e:
-                    print("Falha avatar:", e)
-
-            # If none of the provided members yielded avatars, fail.
-            if not images_payload:
-                await ctx.send(f"Não consegui achar imagens válidas {EMOJI_CRY}")
-                return
+                    uid = int(part.strip())
+                    user = await self.bot.fetch_user(uid)
+                    members.append(user)
+                except (ValueError, discord.NotFound):
+                    continue
+            members = members[:5]
+
+        usage = (
+            "Mencione os usuários ou cole os IDs!\n\n"
+            "**Exemplo:**\n"
+            "`cocielochaves @Denilson @Amigo1 @Amigo2`\n"
+            "ou\n"
+            "`cocielochaves 297153970613387264 159985870458322944`\n\n"
+            "Usa os avatares para fazer a edição Chaves Cocielo! 🚀"
+        )
+
+        # Kotlin behavior: expects 5 images. If none provided, show usage.
+        if not members:
+            await ctx.send(usage)
+            return
+        # If there is at least one member, proceed — we'll fill missing slots
+        # with Discord default avatars so the API always receives up to 5 images.
+        await ctx.defer()
+
+        try:
+            ahead, done = self.jobs.submit(ctx.guild.id, lambda: self.render_and_send(ctx, members))
+        except QueueFull:
+            await ctx.send(f"A fila daqui tá cheia, espera um pouco {EMOJI_CRY}")
+            return
 
-            # Fill remaining slots (up to 5) with Discord default embed avatars as URLs
-            i = 0
-            while len(images_payload) < 5:
-                default_index = i % 6
-                url = f"https://cdn.discordapp.com/embed/avatars/{default_index}.png"
-                images_payload.append({"type": "url", "content": url})
-                i += 1
+        if ahead:
+            await ctx.send(f"📋 Já tem vídeo sendo gerado aqui, você é o **#{ahead + 1}** da fila!")
+        await done
+
+    async def render_and_send(self, ctx: commands.Context, members: list):
+        """Runs from the guild queue: fetch images, call the API, upload the video."""
+        images_payload = []
+
+        # First, include any image attachments from the message (as base64)
+        attachments = getattr(ctx.message, "attachments", []) or []
+        if attachments and len(attachments) > 5:
+            await ctx.send("Limitei aos primeiros 5 anexos. Use no máximo 5 imagens.")
+
+        # All fetches at once; attachments keep priority over avatars (same order as before)
+        results = await asyncio.gather(
+            *(self.get_attachment_base64(att) for att in attachments[:5]),
+            *(self.get_avatar_base64(member) for member in members),
+            return_exceptions=True,
+        )
+        for b64 in results:
+            if len(images_payload) >= 5:
+                break
+            if isinstance(b64, Exception):
+                print("Falha ao buscar imagem:", b64)
+            elif b64:
+                images_payload.append({"type": "base64", "content": b64})
+
+        # If none of the provided members yielded avatars, fail.
+        if not images_payload:
+            await ctx.send(f"Não consegui achar imagens válidas {EMOJI_CRY}")
+            return
 
-            payload = {"images": images_payload}
-            print("Enviando payload:", payload)
+        # Fill remaining slots (up to 5) with Discord default embed avatars as URLs
+        i = 0
+        while len(images_payload) < 5:
+            default_index = i % 6
+            url = f"https://cdn.discordapp.com/embed/avatars/{default_index}.png"
+            images_payload.append({"type": "url", "content": url})
+            i += 1
+
+        payload = {"images": images_payload}
+        print("Enviando payload:", [img["type"] for img in images_payload])
+
+        # Same five images in the same order -> same video, skip the API
+        key = payload_key(images_payload)
+        cached = self.videos.get(key)
+        if cached:
+            print("Vídeo do cache:", key[:12])
+            with cached:
+                await ctx.send(
+                    f"Pronto! Sua gangue da quebrada: {' '.join(m.mention for m in members)}",
+                    file=discord.File(cached, "cocielo_chaves.mp4")
+                )
+            return
 
-            try:
-                print("===== DEBUG INICIO =====")
-                print("Enviando payload:", payload)
+        try:
+            if COCIELO_BACKEND == "java":
+                video = await render_with_java(payload)
+            else:
+                video = await self.api.render(payload)
+            print("Vídeo recebido com sucesso")
+            await self.videos.put(key, video)
+
+        except CocieloAPIError as e:
+            print("Cocielo API error:", e)
+            if e.client_error:
+                await ctx.send(f"Erro cliente ao gerar vídeo {EMOJI_CRY}")
+            else:
+                await ctx.send(f"Erro ao gerar vídeo {EMOJI_RAGE} {EMOJI_CRY}")
+            return
 
-                # write payload to a temporary JSON file and call Java CLI
-                tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w", encoding="utf-8")
-                try:
-                    json.dump(payload, tmp)
-                    tmp_path = tmp.name
-                finally:
-                    tmp.close()
-
-                # compile Java CLI if needed
-                java_src = os.path.join(os.getcwd(), "tools", "CocieloChaves.java")
-                class_file = os.path.join(os.getcwd(), "tools", "CocieloChaves.class")
-                if not os.path.exists(class_file):
-                    print("Compilando Java CLI...")
-                    p = await asyncio.create_subprocess_exec("javac", java_src, cwd=os.getcwd(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                    out, err = await p.communicate()
-                    if p.returncode != 0:
-                        print("javac failed:", err.decode(errors="ignore"))
-                        await ctx.send("Erro ao compilar a ferramenta Java. Certifique-se de que o JDK está instalado.")
-                        try:
-                            os.unlink(tmp_path)
-                        except Exception:
-                            pass
-                        return
-                # run Java CLI and capture stdout (binary video)
-                proc = await asyncio.create_subprocess_exec("java", "-cp", os.path.join(os.getcwd(), "tools"), "CocieloChaves", tmp_path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                try:
-                    stdout, stderr = await proc.communicate()
-                finally:
-                    try:
-                        os.unlink(tmp_path)
-                    except Exception:
-                        pass
-
-                if proc.returncode == 2:
-                    print("Client error from API:", stderr.decode(errors="ignore"))
-                    await ctx.send(f"Erro cliente ao gerar vídeo {EMOJI_CRY}")
-                    return
-                elif proc.returncode != 0:
-                    print("Error from Java tool (code", proc.returncode, "):", stderr.decode(errors="ignore"))
-                    await ctx.send(f"Erro ao gerar vídeo {EMOJI_RAGE} {EMOJI_CRY}")
-                    return
-
-                video_data = stdout
-                print("Vídeo recebido com sucesso")
-                print("===== DEBUG FIM =====")
-
-            except asyncio.TimeoutError:
-                print("TIMEOUT ACONTECEU")
-                await ctx.send("Demorou muito... tente novamente depois 😔")
-                return
+        except asyncio.TimeoutError:
+            print("TIMEOUT ACONTECEU")
+            await ctx.send("Demorou muito... tente novamente depois 😔")
+            return
 
-            except Exception as e:
-                print("ERRO INESPERADO:", repr(e))
-                await ctx.send(f"Erro inesperado: {e}")
-                return
+        except Exception as e:
+            print("ERRO INESPERADO:", repr(e))
+            await ctx.send(f"Erro inesperado: {e}")
+            return
 
-            file = discord.File(io.BytesIO(video_data), "cocielo_chaves.mp4")
+        with video:
+            file = discord.File(video, "cocielo_chaves.mp4")
 
             await ctx.send(
                 f"Pronto! Sua gangue da quebrada: {' '.join(m.mention for m in members)}",
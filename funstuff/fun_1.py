@@ -1,10 +1,398 @@
-import discord
 from discord.ext import commands
 from PIL import Image, ImageOps, ImageEnhance, ImageFilter # Added missing imports
-import io
-import aiohttp
+from services.image_cache import as_image
+from services.encoder import encode_image
 
-MAX_SIZE = 5_000_000  # 5MB
+# ---------- renderers (run on the render farm) ----------
+
+def encode(img):
+    # shared policy: PNG for flat art, WebP for photos, always under the upload cap
+    return encode_image(img)
+
+def render_fun_1(data):
+    base = as_image(data, "RGBA")
+    top = base.resize((512, 512))
+    bl = base.resize((256, 256))
+    br = base.resize((256, 256))
+
+    canvas = Image.new("RGBA", (512, 768))
+    canvas.paste(top, (0, 0))
+    canvas.paste(bl, (0, 512))
+    canvas.paste(br, (256, 512))
+    return encode(canvas)
+
+def render_mirror(data):
+    img = as_image(data)
+    return encode(ImageOps.mirror(img))
+
+def render_invert(data):
+    img = as_image(data, "RGB")
+    return encode(ImageOps.invert(img))
+
+def render_pixel(data):
+    img = as_image(data)
+    small = img.resize((64, 64), Image.NEAREST)
+    return encode(small.resize(img.size, Image.NEAREST))
+
+def render_stack(data):
+    img = as_image(data).resize((512, 512)).convert("RGBA")
+    canvas = Image.new("RGBA", (512, 1536))
+    canvas.paste(img, (0, 0))
+    canvas.paste(img, (0, 512))
+    canvas.paste(img, (0, 1024))
+    return encode(canvas)
+
+def render_deepfry(data):
+    img = as_image(data, "RGB")
+
+    # Now these work because of the new imports:
+    img = ImageEnhance.Contrast(img).enhance(2.5)
+    img = ImageEnhance.Color(img).enhance(3.0)
+    img = img.filter(ImageFilter.SHARPEN)
+    img = ImageEnhance.Sharpness(img).enhance(2.0)
+    return encode(img)
+
+def render_zoom(data):
+    img = as_image(data)
+    w, h = img.size
+    crop = img.crop((w//4, h//4, w*3//4, h*3//4))
+    return encode(crop.resize(img.size))
+
+# ---------- fx pipeline ----------
+# !fx deepfry|pixel:64|mirror -> one decode, a fused op list, one encode.
+# Steps expand into primitive ops:
+#   ("crop", (x0, y0, x1, y1))   normalized box, so it survives resizes/mirrors
+#   ("resize", (w, h, resample))
+#   ("mirror", None) / ("flip", None)
+#   ("lut", (name, value))        per-channel point op (RGB only, alpha untouched)
+#   ("color", factor)             saturation (channel mix)
+#   ("filter", (name, value))     neighbourhood op, never reordered
+#   ("layout", name)              stack / fun_1 collage, nothing moves across it
+
+FX_WORK_MAX = 1024   # longest side of the working image
+FX_MAX_STEPS = 12
+
+# name -> (default arg, min, max); None = takes no argument
+FX_STEPS = {
+    "mirror": None, "flip": None, "invert": None, "grayscale": None,
+    "sharpen": None, "deepfry": None, "stack": None, "fun_1": None,
+    "pixel": (64, 2, 512),
+    "zoom": (2.0, 1.0, 8.0),
+    "contrast": (1.5, 0.0, 10.0),
+    "brightness": (1.5, 0.0, 10.0),
+    "color": (1.5, 0.0, 10.0),
+    "sharpness": (2.0, 0.0, 10.0),
+    "blur": (2.0, 0.0, 20.0),
+    "posterize": (3, 1, 8),
+}
+
+IMAGE_STAT_LUTS = ("contrast",)  # table depends on the whole image's mean grey
+
+def _per_pixel(op):
+    """True when each output pixel depends only on the same input pixel, so the op
+    commutes with crops and NEAREST resizes. Contrast reads the image mean and
+    filters read neighbours, so those stay exactly where the user put them."""
+    kind, arg = op
+    if kind == "lut":
+        return arg[0] not in IMAGE_STAT_LUTS
+    return kind == "color"
+
+def parse_fx(spec):
+    """'deepfry|pixel:64|mirror' -> [(name, arg), ...]. Raises ValueError with a user-facing message."""
+    steps = []
+    for part in spec.replace(" ", "").lower().split("|"):
+        if not part:
+            continue
+        name, _, raw = part.partition(":")
+        if name not in FX_STEPS:
+            raise ValueError(f"Unknown effect `{name}`. Available: {', '.join(FX_STEPS)}")
+        limits = FX_STEPS[name]
+        if limits is None:
+            if raw:
+                raise ValueError(f"`{name}` takes no value")
+            steps.append((name, None))
+            continue
+        default, lo, hi = limits
+        try:
+            value = type(default)(raw) if raw else default
+        except ValueError:
+            raise ValueError(f"`{name}` expects a number, got `{raw}`")
+        if not lo <= value <= hi:
+            raise ValueError(f"`{name}` must be between {lo} and {hi}")
+        steps.append((name, value))
+    if not steps:
+        raise ValueError("No effects given")
+    if len(steps) > FX_MAX_STEPS:
+        raise ValueError(f"Max {FX_MAX_STEPS} effects per pipeline")
+    return steps
+
+def op_size(op, size):
+    kind, arg = op
+    w, h = size
+    if kind == "crop":
+        x0, y0, x1, y1 = arg
+        return (max(1, round((x1 - x0) * w)), max(1, round((y1 - y0) * h)))
+    if kind == "resize":
+        return arg[:2]
+    if kind == "layout":
+        return (512, 1536) if arg == "stack" else (512, 768)
+    return size
+
+def expand_fx(steps, size):
+    """User steps -> primitive ops (sizes resolved against the working image)."""
+    ops = []
+    for name, arg in steps:
+        if name in ("mirror", "flip"):
+            new = [(name, None)]
+        elif name == "invert":
+            new = [("lut", ("invert", None))]
+        elif name in ("contrast", "brightness", "posterize"):
+            new = [("lut", (name, arg))]
+        elif name == "color":
+            new = [("color", arg)]
+        elif name == "grayscale":
+            new = [("color", 0.0)]
+        elif name == "sharpen":
+            new = [("filter", ("sharpen", None))]
+        elif name in ("sharpness", "blur"):
+            new = [("filter", (name, arg))]
+        elif name == "deepfry":
+            # same chain as render_deepfry
+            new = [("lut", ("contrast", 2.5)), ("color", 3.0),
+                   ("filter", ("sharpen", None)), ("filter", ("sharpness", 2.0))]
+        elif name == "pixel":
+            new = [("resize", (arg, arg, Image.NEAREST)), ("resize", (size[0], size[1], Image.NEAREST))]
+        elif name == "zoom":
+            m = (1 - 1 / arg) / 2
+            new = [("crop", (m, m, 1 - m, 1 - m)), ("resize", (size[0], size[1], Image.BICUBIC))]
+        else:  # stack / fun_1
+            new = [("layout", name)]
+        for op in new:
+            size = op_size(op, size)
+        ops += new
+    return ops
+
+def _push_crops(ops):
+    """Moves every crop as far left as it can go, so earlier ops only touch the kept pixels."""
+    ops = list(ops)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, len(ops)):
+            kind, box = ops[i]
+            if kind != "crop":
+                continue
+            prev_kind, prev_arg = ops[i - 1]
+            x0, y0, x1, y1 = box
+            if _per_pixel(ops[i - 1]):
+                ops[i - 1], ops[i] = ops[i], ops[i - 1]
+            elif prev_kind == "mirror":
+                ops[i - 1], ops[i] = ("crop", (1 - x1, y0, 1 - x0, y1)), ops[i - 1]
+            elif prev_kind == "flip":
+                ops[i - 1], ops[i] = ("crop", (x0, 1 - y1, x1, 1 - y0)), ops[i - 1]
+            elif prev_kind == "crop":
+                a0, b0, a1, b1 = prev_arg
+                aw, bh = a1 - a0, b1 - b0
+                ops[i - 1:i + 1] = [("crop", (a0 + x0 * aw, b0 + y0 * bh, a0 + x1 * aw, b0 + y1 * bh))]
+            elif prev_kind == "resize":
+                rw, rh, resample = prev_arg
+                shrunk = (max(1, round((x1 - x0) * rw)), max(1, round((y1 - y0) * rh)), resample)
+                ops[i - 1], ops[i] = ("crop", box), ("resize", shrunk)
+            else:
+                continue
+            changed = True
+            break
+    return ops
+
+def _collapse_resizes(ops, size):
+    """A run of resizes becomes at most two: down to its smallest NEAREST size (the
+    pixelation bottleneck, if any) and then to the final size. No-op runs disappear."""
+    out = []
+    i = 0
+    while i < len(ops):
+        if ops[i][0] != "resize":
+            out.append(ops[i])
+            size = op_size(ops[i], size)
+            i += 1
+            continue
+        j = i
+        while j < len(ops) and ops[j][0] == "resize":
+            j += 1
+        run = [op[1] for op in ops[i:j]]
+        final = run[-1]
+        nearest = [r for r in run if r[2] == Image.NEAREST]
+        bottleneck = False
+        if nearest:
+            # per axis: 37x91 -> 64x64 -> 37x91 still loses rows even though 64*64 > 37*91
+            bw, bh = min(r[0] for r in nearest), min(r[1] for r in nearest)
+            bottleneck = bw < min(size[0], final[0]) or bh < min(size[1], final[1])
+        if bottleneck:
+            out.append(("resize", (bw, bh, Image.NEAREST)))
+        if bottleneck or final[:2] != size:
+            out.append(("resize", final))
+        size = final[:2]
+        i = j
+    return out
+
+def _sink_pointwise(ops, size):
+    """Point ops commute with NEAREST resizes, so run them on whichever side is smaller."""
+    ops = list(ops)
+    changed = True
+    while changed:
+        changed = False
+        sizes = [size]
+        for op in ops:
+            sizes.append(op_size(op, sizes[-1]))
+        for i in range(len(ops) - 1):
+            a, b = ops[i], ops[i + 1]
+            # point op before a shrinking NEAREST resize -> after it
+            if _per_pixel(a) and b[0] == "resize" and b[1][2] == Image.NEAREST \
+                    and b[1][0] * b[1][1] < sizes[i][0] * sizes[i][1]:
+                ops[i], ops[i + 1] = b, a
+            # point op after an enlarging NEAREST resize -> before it
+            elif _per_pixel(b) and a[0] == "resize" and a[1][2] == Image.NEAREST \
+                    and a[1][0] * a[1][1] > sizes[i][0] * sizes[i][1]:
+                ops[i], ops[i + 1] = b, a
+            else:
+                continue
+            changed = True
+            break
+    return ops
+
+def _merge_pointwise(ops):
+    """Adjacent lut ops -> one ("luts", [...]) (one img.point call); adjacent colors multiply."""
+    out = []
+    for kind, arg in ops:
+        prev = out[-1] if out else (None, None)
+        if kind == "lut" and prev[0] == "luts":
+            prev[1].append(arg)
+        elif kind == "lut":
+            out.append(("luts", [arg]))
+        elif kind == "color" and prev[0] == "color":
+            out[-1] = ("color", prev[1] * arg)
+            if out[-1][1] == 1.0:
+                out.pop()
+        elif kind in ("mirror", "flip") and prev == (kind, None):
+            out.pop()  # mirror|mirror cancels out
+        else:
+            out.append((kind, arg))
+    return out
+
+def fx_work_size(size):
+    w, h = size
+    scale = FX_WORK_MAX / max(w, h)
+    if scale >= 1:
+        return size
+    return (max(1, round(w * scale)), max(1, round(h * scale)))
+
+def plan_fx(steps, size):
+    """Lazy steps -> fused primitive op list for a source image of `size`.
+
+    The shrink to the working size is just the first resize, so it collapses
+    with the others (and crops land before it, on the full-res pixels).
+    """
+    work = fx_work_size(size)
+    ops = [("resize", (work[0], work[1], Image.BICUBIC))] if work != size else []
+    ops += expand_fx(steps, work)
+    ops = _push_crops(ops)
+    ops = _collapse_resizes(ops, size)
+    ops = _sink_pointwise(ops, size)
+    return _merge_pointwise(ops)
+
+def _lut_tables(img, luts):
+    """Composes a list of point ops into one 256-entry table per RGB channel.
+
+    Contrast needs the mean grey of the image it applies to; that's read from the
+    histogram through the tables built so far, so the image is never touched.
+    """
+    hist = img.histogram()
+    total = img.width * img.height
+    tables = [list(range(256)) for _ in range(3)]
+    for name, value in luts:
+        if name == "invert":
+            fn = lambda v: 255 - v
+        elif name == "brightness":
+            fn = lambda v, f=value: v * f
+        elif name == "posterize":
+            mask = ~(2 ** (8 - value) - 1) & 0xFF
+            fn = lambda v, m=mask: v & m
+        else:  # contrast: blend towards the mean grey, like ImageEnhance.Contrast
+            means = [sum(hist[c * 256 + v] * tables[c][v] for v in range(256)) / total for c in range(3)]
+            mean = int(means[0] * 0.299 + means[1] * 0.587 + means[2] * 0.114 + 0.5)
+            fn = lambda v, m=mean, f=value: m + f * (v - m)
+        tables = [[min(255, max(0, int(fn(v)))) for v in t] for t in tables]
+    return tables
+
+def _layout(img, name):
+    if name == "stack":
+        tile = img.resize((512, 512))
+        canvas = Image.new(img.mode, (512, 1536))
+        for y in (0, 512, 1024):
+            canvas.paste(tile, (0, y))
+        return canvas
+    canvas = Image.new(img.mode, (512, 768))
+    canvas.paste(img.resize((512, 512)), (0, 0))
+    small = img.resize((256, 256))
+    canvas.paste(small, (0, 512))
+    canvas.paste(small, (256, 512))
+    return canvas
+
+def run_fx_op(img, op):
+    kind, arg = op
+    if kind == "crop":
+        w, h = img.size
+        x0, y0, x1, y1 = arg
+        box = (round(x0 * w), round(y0 * h), max(round(x0 * w) + 1, round(x1 * w)), max(round(y0 * h) + 1, round(y1 * h)))
+        return img.crop(box)
+    if kind == "resize":
+        return img.resize(arg[:2], arg[2])
+    if kind == "mirror":
+        return ImageOps.mirror(img)
+    if kind == "flip":
+        return ImageOps.flip(img)
+    if kind == "luts":
+        tables = _lut_tables(img, arg)
+        if img.mode == "RGBA":
+            tables.append(list(range(256)))
+        return img.point([v for t in tables for v in t])
+    if kind == "color":
+        return ImageEnhance.Color(img).enhance(arg)
+    if kind == "filter":
+        name, value = arg
+        if name == "sharpen":
+            return img.filter(ImageFilter.SHARPEN)
+        if name == "blur":
+            return img.filter(ImageFilter.GaussianBlur(value))
+        return ImageEnhance.Sharpness(img).enhance(value)
+    if kind == "layout":
+        return _layout(img, arg)
+    raise ValueError(f"Unknown fx op: {kind}")
+
+def describe_fx(ops):
+    names = []
+    for kind, arg in ops:
+        if kind == "resize":
+            names.append(f"resize {arg[0]}x{arg[1]}")
+        elif kind == "luts":
+            names.append("lut(" + "+".join(n for n, _ in arg) + ")")
+        elif kind == "filter":
+            names.append(arg[0])
+        elif kind == "layout":
+            names.append(arg)
+        else:
+            names.append(kind)
+    return " → ".join(names) or "nothing left to do"
+
+def render_fx(data, steps):
+    """Decode once, run the fused plan (working-size shrink included), encode once."""
+    img = as_image(data)
+    mode = "RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB"
+    if img.mode != mode:
+        img = img.convert(mode)
+    # every op returns a new image, so a shared cached image is never modified
+    for op in plan_fx(steps, img.size):
+        img = run_fx_op(img, op)
+    return encode(img)
 
 class Fun(commands.Cog):
     def __init__(self, bot):
@@ -12,126 +400,94 @@ class Fun(commands.Cog):
 
     # ---------- helpers ----------
 
-    async def load_image(self, ctx, image_url):
-        # Check attachments first
-        if ctx.message.attachments:
-            att = ctx.message.attachments[0]
-            if att.size > MAX_SIZE:
-                return None
-            return await att.read()
-
-        # Check URL
-        if image_url:
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(image_url, timeout=10) as resp:
-                        if resp.status != 200:
-                            return None
-                        if resp.content_length and resp.content_length > MAX_SIZE:
-                            return None
-                        return await resp.read()
-            except Exception:
-                return None
-
-        return None
-
-    async def send_image(self, ctx, img, name):
-        with io.BytesIO() as buf: # Using context manager for safety
-            img.save(buf, format="PNG")
-            buf.seek(0)
-            await ctx.send(file=discord.File(buf, name))
+    @commands.command(name="imagecache")
+    async def imagecache(self, ctx):
+        s = self.bot.image_cache.stats()
+        await ctx.send(f"🖼️ Image cache: {s['images']} images | {s['used'] / 1024 / 1024:.1f}/{s['max'] / 1024 / 1024:.0f} MB "
+                       f"| {s['hits']} hits / {s['misses']} misses")
+
+    @commands.command(name="encoderstats")
+    async def encoderstats(self, ctx):
+        await ctx.send(self.bot.encoder.summary())
+
+    async def send_render(self, ctx, renderer, data, name, *args, content=None):
+        """Runs a renderer on the render farm and uploads the image it encoded."""
+        result = await self.bot.render_farm.submit("image", renderer, data, *args)
+        await ctx.send(content, file=self.bot.encoder.file(result, name))
 
     # ---------- commands ----------
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def fun_1(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url, "RGBA")
         if not data:
             await ctx.send("❌ Send an image or link (max 5MB).")
             return
 
-        base = Image.open(io.BytesIO(data)).convert("RGBA")
-        top = base.resize((512, 512))
-        bl = base.resize((256, 256))
-        br = base.resize((256, 256))
-
-        canvas = Image.new("RGBA", (512, 768))
-        canvas.paste(top, (0, 0))
-        canvas.paste(bl, (0, 512))
-        canvas.paste(br, (256, 512))
-
-        await self.send_image(ctx, canvas, "fun_1.png")
+        await self.send_render(ctx, render_fun_1, data, "fun_1.png")
 
     @commands.command()
     async def mirror(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url)
         if not data: return await ctx.send("❌ No image.")
 
-        img = Image.open(io.BytesIO(data))
-        img = ImageOps.mirror(img)
-        await self.send_image(ctx, img, "mirror.png")
+        await self.send_render(ctx, render_mirror, data, "mirror.png")
 
     @commands.command()
     async def invert(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url, "RGB")
         if not data: return await ctx.send("❌ No image.")
 
-        img = Image.open(io.BytesIO(data)).convert("RGB")
-        img = ImageOps.invert(img)
-        await self.send_image(ctx, img, "invert.png")
+        await self.send_render(ctx, render_invert, data, "invert.png")
 
     @commands.command()
     async def pixel(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url)
         if not data: return await ctx.send("❌ No image.")
 
-        img = Image.open(io.BytesIO(data))
-        small = img.resize((64, 64), Image.NEAREST)
-        pixelated = small.resize(img.size, Image.NEAREST)
-        await self.send_image(ctx, pixelated, "pixel.png")
+        await self.send_render(ctx, render_pixel, data, "pixel.png")
 
     @commands.command()
     async def stack(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url)
         if not data: return await ctx.send("❌ No image.")
 
-        img = Image.open(io.BytesIO(data)).resize((512, 512)).convert("RGBA")
-        canvas = Image.new("RGBA", (512, 1536))
-        canvas.paste(img, (0, 0))
-        canvas.paste(img, (0, 512))
-        canvas.paste(img, (0, 1024))
-
-        await self.send_image(ctx, canvas, "stack.png")
+        await self.send_render(ctx, render_stack, data, "stack.png")
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def deepfry(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url, "RGB")
         if not data:
             await ctx.send("❌ Send an image or link (max 5MB).")
             return
 
-        img = Image.open(io.BytesIO(data)).convert("RGB")
-
-        # Now these work because of the new imports:
-        img = ImageEnhance.Contrast(img).enhance(2.5)
-        img = ImageEnhance.Color(img).enhance(3.0)
-        img = img.filter(ImageFilter.SHARPEN)
-        img = ImageEnhance.Sharpness(img).enhance(2.0)
-
-        await self.send_image(ctx, img, "deepfry.png")
+        await self.send_render(ctx, render_deepfry, data, "deepfry.png")
 
     @commands.command()
     async def zoom(self, ctx, image_url: str = None):
-        data = await self.load_image(ctx, image_url)
+        data = await self.bot.image_cache.load_image(ctx, image_url)
         if not data: return await ctx.send("❌ No image.")
 
-        img = Image.open(io.BytesIO(data))
-        w, h = img.size
-        crop = img.crop((w//4, h//4, w*3//4, h*3//4))
-        crop = crop.resize(img.size)
-        await self.send_image(ctx, crop, "zoom.png")
+        await self.send_render(ctx, render_zoom, data, "zoom.png")
+
+    @commands.command(name="fx")
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def fx(self, ctx, spec: str = None, image_url: str = None):
+        """Usage: !fx deepfry|pixel:64|mirror [image_url] (one decode, fused ops, one encode)"""
+        if not spec:
+            return await ctx.send(f"🧪 Usage: `!fx deepfry|pixel:64|mirror`\nEffects: {', '.join(FX_STEPS)}")
+        try:
+            steps = parse_fx(spec)
+        except ValueError as e:
+            return await ctx.send(f"❌ {e}")
+
+        data = await self.bot.image_cache.load_image(ctx, image_url)
+        if not data: return await ctx.send("❌ No image.")
+
+        plan = plan_fx(steps, data.size)
+        await self.send_render(ctx, render_fx, data, "fx.png", steps, content=f"🧪 `{describe_fx(plan)}`")
 
 async def setup(bot):
     await bot.add_cog(Fun(bot))
\ No newline at end of file
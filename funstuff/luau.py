@@ -3,14 +3,23 @@
 # Command: !luau (with .luau script attachment + optional assets)
 # ===============================
 
+import io
 import os
 import time
+import asyncio
 import hashlib
+import itertools
+import multiprocessing
+from collections import OrderedDict, namedtuple, Counter
+from contextlib import contextmanager
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+import lupa
+import numpy as np
 from lupa import LuaRuntime
 from PIL import Image
 from pygltflib import GLTF2
+from services.gif_builder import GifBuilder
 
 # ===============================
 # CONFIG
@@ -18,8 +27,20 @@ from pygltflib import GLTF2
 
 CACHE_DIR = "cache"
 CACHE_TTL = 300          # 5 minutes
+CACHE_QUOTA = 256 * 1024 * 1024   # total bytes in cache/ before LRU eviction
+CACHE_SWEEP_SECONDS = 30
 MAX_IMAGE_SIZE = 1024
 MAX_ASSET_SIZE = 8 * 1024 * 1024  # 8 MB per asset
+MAX_ASSETS_TOTAL = 24 * 1024 * 1024  # all assets of one command
+MODEL_CHECK_MEMO = 256  # validated models remembered per worker
+
+LUA_WORKERS = 2                       # pre-warmed Lua processes
+LUA_MAX_INSTRUCTIONS = 20_000_000     # per run
+LUA_MAX_MEMORY = 64 * 1024 * 1024     # per worker (Lua allocator limit)
+LUA_DEADLINE = 5.0                    # seconds of wall-clock per run
+LUA_KILL_GRACE = 2.0                  # extra seconds before the worker is killed
+LUA_HOOK_STEP = 1000                  # instructions between hook checks
+LUA_CHUNK_CACHE_BYTES = 4 * 1024 * 1024  # compiled bytecode kept per worker (LRU)
 
 # ===============================
 # ERROR CODES
@@ -30,39 +51,408 @@ OK = 1
 INVALID_RETURN_TYPE = -1
 
 # ===============================
-# SHARED LUA RUNTIME (SANDBOXED)
+# CANVAS (NumPy RGBA framebuffers for Lua)
 # ===============================
-lua = LuaRuntime(unpack_returned_tuples=True)
 
-# Aggressive sandboxing — remove almost everything dangerous
-lua_globals = lua.globals()
+LUA_MAX_CANVAS_BYTES = 64 * 1024 * 1024  # all canvases + gif frames of one run
+LUA_MAX_GIF_FRAMES = 120
+
+def _color(r, g, b, a):
+    return np.clip([r, g, b, 255 if a is None else a], 0, 255).astype(np.uint8)
+
+class CanvasStore:
+    """Per-run NumPy framebuffers. Lua only ever holds integer handles to them.
+
+    rect/line/setPixel/setPixels overwrite pixels, blit alpha-blends.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.canvases = {}  # id -> HxWx4 uint8
+        self.gifs = {}      # id -> {"size": (w, h), "frames": [...], "delays": [...]}
+        self.used = 0
+        self._ids = itertools.count(1)
+
+    def _reserve(self, nbytes):
+        if self.used + nbytes > LUA_MAX_CANVAS_BYTES:
+            raise MemoryError(f"Canvas memory limit ({LUA_MAX_CANVAS_BYTES // 1024 // 1024}MB) exceeded")
+        self.used += nbytes
+
+    def _get(self, cid):
+        try:
+            return self.canvases[cid]
+        except KeyError:
+            raise ValueError("invalid canvas") from None
+
+    def new(self, width, height):
+        _, w, h = canvas_spec(None, width, height)
+        self._reserve(w * h * 4)
+        cid = next(self._ids)
+        self.canvases[cid] = np.zeros((h, w, 4), dtype=np.uint8)
+        return cid, w, h
+
+    def fill(self, cid, r, g, b, a=None):
+        self._get(cid)[:] = _color(r, g, b, a)
+
+    def set_pixel(self, cid, x, y, r, g, b, a=None):
+        buf = self._get(cid)
+        x, y = int(x), int(y)
+        if 0 <= x < buf.shape[1] and 0 <= y < buf.shape[0]:
+            buf[y, x] = _color(r, g, b, a)
+
+    def get_pixel(self, cid, x, y):
+        buf = self._get(cid)
+        x, y = int(x), int(y)
+        if 0 <= x < buf.shape[1] and 0 <= y < buf.shape[0]:
+            return tuple(int(c) for c in buf[y, x])
+        return 0, 0, 0, 0
+
+    def rect(self, cid, x, y, w, h, r, g, b, a=None):
+        buf = self._get(cid)
+        x0, y0 = max(int(x), 0), max(int(y), 0)
+        x1, y1 = min(int(x + w), buf.shape[1]), min(int(y + h), buf.shape[0])
+        if x0 < x1 and y0 < y1:
+            buf[y0:y1, x0:x1] = _color(r, g, b, a)
+
+    def line(self, cid, x0, y0, x1, y1, r, g, b, a=None):
+        buf = self._get(cid)
+        steps = int(max(abs(x1 - x0), abs(y1 - y0))) + 1
+        steps = min(steps, 4 * MAX_IMAGE_SIZE)  # longer than any diagonal
+        xs = np.rint(np.linspace(x0, x1, steps)).astype(np.int64)
+        ys = np.rint(np.linspace(y0, y1, steps)).astype(np.int64)
+        inside = (xs >= 0) & (xs < buf.shape[1]) & (ys >= 0) & (ys < buf.shape[0])
+        buf[ys[inside], xs[inside]] = _color(r, g, b, a)
+
+    def blit(self, dst_id, src_id, x, y):
+        dst, src = self._get(dst_id), self._get(src_id)
+        x, y = int(x), int(y)
+        h, w = src.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, dst.shape[1]), min(y + h, dst.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        s = src[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.float32)
+        d = dst[y0:y1, x0:x1].astype(np.float32)
+        sa = s[..., 3:] / 255.0
+        out = np.empty_like(d)
+        out[..., :3] = s[..., :3] * sa + d[..., :3] * (1.0 - sa)
+        out[..., 3:] = s[..., 3:] + d[..., 3:] * (1.0 - sa)
+        dst[y0:y1, x0:x1] = (out + 0.5).astype(np.uint8)
+
+    def set_pixels(self, cid, x, y, w, h, csv):
+        """Bulk write from one comma-joined Lua array (one crossing for the whole block).
+
+        w*h values = packed 0xRRGGBBAA ints, w*h*4 values = r,g,b,a per pixel.
+        """
+        buf = self._get(cid)
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        if w <= 0 or h <= 0:
+            return
+        values = np.fromstring(csv, dtype=np.float64, sep=",") if csv else np.empty(0)
+        if values.size == w * h:
+            packed = values.astype(np.uint32)
+            block = np.stack([(packed >> s) & 0xFF for s in (24, 16, 8, 0)], axis=-1).astype(np.uint8)
+        elif values.size == w * h * 4:
+            block = np.clip(values, 0, 255).astype(np.uint8)
+        else:
+            raise ValueError(f"setPixels expected {w * h} or {w * h * 4} values, got {values.size}")
+        block = block.reshape(h, w, 4)
+
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, buf.shape[1]), min(y + h, buf.shape[0])
+        if x0 < x1 and y0 < y1:
+            buf[y0:y1, x0:x1] = block[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    def gif_new(self, width, height):
+        _, w, h = canvas_spec(None, width, height)
+        gid = next(self._ids)
+        self.gifs[gid] = {"size": (w, h), "frames": [], "delays": []}
+        return gid, w, h
+
+    def gif_add(self, gid, cid, delay_ms=100):
+        gif = self.gifs.get(gid)
+        if gif is None:
+            raise ValueError("invalid gif")
+        if len(gif["frames"]) >= LUA_MAX_GIF_FRAMES:
+            raise ValueError(f"GIF frame limit ({LUA_MAX_GIF_FRAMES}) reached")
+        frame = self._get(cid)
+        w, h = gif["size"]
+        if frame.shape[:2] != (h, w):
+            raise ValueError(f"frame is {frame.shape[1]}x{frame.shape[0]}, gif is {w}x{h}")
+        self._reserve(frame.nbytes)
+        gif["frames"].append(frame.copy())  # snapshot, the script keeps drawing on the canvas
+        gif["delays"].append(max(20, int(delay_ms)))
+        return len(gif["frames"])
+
+    def encode_canvas(self, cid, fmt="png"):
+        buf = io.BytesIO()
+        Image.fromarray(self._get(cid)).save(buf, format=fmt.upper())
+        return buf.getvalue()
+
+    def encode_gif(self, gid):
+        gif = self.gifs.get(gid)
+        if not gif or not gif["frames"]:
+            raise ValueError("GIF has no frames")
+        buf = io.BytesIO()
+        out = GifBuilder(buf, gif["size"], palette="adaptive")
+        for frame, delay in zip(gif["frames"], gif["delays"]):
+            out.add(frame, delay)
+        out.finish()
+        return buf.getvalue()
+
+    def bridge(self, lua):
+        """The only Python functions the Lua side can reach (wrapped again in Lua)."""
+        return lua.table_from({
+            "new": self.new, "fill": self.fill, "set_pixel": self.set_pixel,
+            "get_pixel": self.get_pixel, "rect": self.rect, "line": self.line,
+            "blit": self.blit, "set_pixels": self.set_pixels,
+            "gif_new": self.gif_new, "gif_add": self.gif_add,
+        })
+
+# ===============================
+# SANDBOX (lives inside each worker process)
+# ===============================
+
+# Aggressive sandboxing — scripts only ever see a fresh env built from this whitelist
+SAFE_GLOBALS = [
+    'assert', 'error', 'ipairs', 'next', 'pairs', 'pcall', 'select', 'tonumber',
+    'tostring', 'type', 'xpcall', 'print', 'rawequal', 'rawlen', 'setmetatable',
+    'getmetatable', '_VERSION'
+]
+SAFE_LIBS = ['string', 'table', 'math', 'utf8', 'coroutine']
+
 dangerous = [
     'io', 'os', 'package', 'debug', 'loadfile', 'dofile', 'load', 'loadstring',
-    'collectgarbage', 'newproxy', 'setfenv', 'getfenv', 'rawget', 'rawset'
+    'collectgarbage', 'newproxy', 'setfenv', 'getfenv', 'rawget', 'rawset',
+    'require', 'python'
 ]
 
-for item in dangerous:
-    if item in lua_globals:
-        del lua_globals[item]
+# Runs once per worker with the full stdlib, keeps private refs to what the
+# sandbox itself needs, and returns the per-run entry point.
+SANDBOX_PRELUDE = """
+local sethook, clock = debug.sethook, os.clock
+local load, collect, dump = load, collectgarbage, string.dump
+local create, resume = coroutine.create, coroutine.resume
+local pack, unpack, concat = table.pack, table.unpack, table.concat
+local setmetatable = setmetatable
+
+-- ("x").__index tricks must not leak between runs
+getmetatable("").__metatable = false
+
+local SAFE_GLOBALS, SAFE_LIBS, raw_bridge = ...
+
+-- A failing bridge call raises a Python exception object; scripts only ever
+-- get its text (the object itself leads to __traceback__ -> frames -> globals)
+local bridge = {}
+for name, f in pairs(raw_bridge) do
+    bridge[name] = function(...)
+        local r = pack(pcall(f, ...))
+        if not r[1] then error(tostring(r[2]), 0) end
+        return unpack(r, 2, r.n)
+    end
+end
+
+-- Image / Gif handles: plain tables holding an id, methods live on locked metatables
+local Canvas = {__metatable = "locked"}
+Canvas.__index = Canvas
+function Canvas:fill(r, g, b, a) bridge.fill(self._canvas, r, g, b, a) return self end
+function Canvas:setPixel(x, y, r, g, b, a) bridge.set_pixel(self._canvas, x, y, r, g, b, a) end
+function Canvas:getPixel(x, y) return bridge.get_pixel(self._canvas, x, y) end
+function Canvas:rect(x, y, w, h, r, g, b, a) bridge.rect(self._canvas, x, y, w, h, r, g, b, a) end
+function Canvas:line(x0, y0, x1, y1, r, g, b, a) bridge.line(self._canvas, x0, y0, x1, y1, r, g, b, a) end
+function Canvas:blit(src, x, y) bridge.blit(self._canvas, src._canvas, x, y) end
+function Canvas:setPixels(x, y, w, h, data) bridge.set_pixels(self._canvas, x, y, w, h, concat(data, ",")) end
+
+local GifBuilder = {__metatable = "locked"}
+GifBuilder.__index = GifBuilder
+function GifBuilder:addFrame(canvas, delay) return bridge.gif_add(self._gif, canvas._canvas, delay or 100) end
+
+local function new_canvas(w, h)
+    local id, width, height = bridge.new(w or 512, h or 512)
+    return setmetatable({_canvas = id, width = width, height = height}, Canvas)
+end
+
+local function new_gif(w, h)
+    local id, width, height = bridge.gif_new(w or 512, h or 512)
+    return setmetatable({_gif = id, width = width, height = height}, GifBuilder)
+end
+
+local function fresh_env()
+    local env = {}
+    for _, name in ipairs(SAFE_GLOBALS) do env[name] = _G[name] end
+    for _, lib in ipairs(SAFE_LIBS) do
+        local copy = {}
+        for k, v in pairs(_G[lib]) do copy[k] = v end
+        env[lib] = copy
+    end
+    env.string.dump = nil
+    env.Image = {new = new_canvas}
+    env.Gif = {new = new_gif}
+    env._G = env
+    return env
+end
+
+-- sha256(name, code) -> bytecode (the LRU bookkeeping lives on the Python side)
+local chunks = {}
+
+local function compile(code, key, name)
+    local fn, err = load(code, name, "t")
+    if not fn then error(err, 0) end
+    local bc = dump(fn)
+    chunks[key] = bc
+    return #bc
+end
+
+local function run(key, name, info, max_instructions, deadline, step)
+    local env = fresh_env()
+    -- undumping skips the lexer/parser; every run still gets its own closure + env
+    local fn, err = load(chunks[key], name, "b", env)
+    if not fn then error(err, 0) end
+
+    local count = 0
+    local stop_at = clock() + deadline
+    local function hook()
+        count = count + step
+        if count > max_instructions then error("instruction limit exceeded", 0) end
+        if clock() > stop_at then error("time limit exceeded", 0) end
+    end
+
+    -- coroutines don't inherit Lua-level hooks, so hook them on creation
+    env.coroutine.create = function(f)
+        local co = create(f)
+        sethook(co, hook, "", step)
+        return co
+    end
+    env.coroutine.wrap = function(f)
+        local co = env.coroutine.create(f)
+        return function(...)
+            local r = pack(resume(co, ...))
+            if not r[1] then error(r[2], 0) end
+            return unpack(r, 2, r.n)
+        end
+    end
+
+    sethook(hook, "", step)
+    local ok, result = pcall(function()
+        local r = fn()
+        if type(r) == "function" then r = r(info) end
+        return r
+    end)
+    sethook()
+    collect("collect")
+
+    if not ok then error(result, 0) end
+    return result
+end
+
+return run, compile, chunks
+"""
+
+def _deny_attributes(obj, attr_name, is_setting):
+    """attribute_filter: Lua never gets to read or write attributes of Python objects."""
+    raise AttributeError("Python objects are not accessible from Lua")
+
+class LuaSandbox:
+    """One pre-warmed LuaRuntime with instruction, memory and time limits,
+    plus an LRU of compiled chunks keyed by the SHA-256 of chunk name + script."""
+
+    def __init__(self):
+        self.lua = LuaRuntime(
+            unpack_returned_tuples=True,
+            register_eval=False,
+            register_builtins=False,
+            attribute_filter=_deny_attributes,
+            max_memory=LUA_MAX_MEMORY,
+        )
+        self.canvas = CanvasStore()
+        self.runner, self.compiler, self.chunks = self.lua.execute(
+            SANDBOX_PRELUDE, self.lua.table(*SAFE_GLOBALS), self.lua.table(*SAFE_LIBS),
+            self.canvas.bridge(self.lua),
+        )
+        self.chunk_sizes = OrderedDict()  # sha256 -> bytecode size, oldest first
+        self.chunk_bytes = 0
+        self.last_hit = None
+
+        lua_globals = self.lua.globals()
+        for item in dangerous:
+            if item in lua_globals:
+                del lua_globals[item]
+
+    def to_lua(self, attachment_info):
+        # Create a proper Lua table for the top-level info
+        lua_info = self.lua.table()
 
-# Also remove require if you don't want any module loading
-if 'require' in lua_globals:
-    del lua_globals['require']
+        lua_info["script"] = attachment_info["script"]
+        lua_info["has_image"] = attachment_info["has_image"]
+        lua_info["has_gif"] = attachment_info["has_gif"]
+        lua_info["has_bitmap"] = attachment_info["has_bitmap"]
+
+        # Convert the assets list to a real Lua table (1-based)
+        lua_assets = self.lua.table()
+        for i, asset_dict in enumerate(attachment_info["assets"], 1):
+            lua_asset = self.lua.table()
+            for key, value in asset_dict.items():
+                lua_asset[key] = value  # strings, ints, bools convert automatically
+            lua_assets[i] = lua_asset
+
+        lua_info["assets"] = lua_assets
+        return lua_info
+
+    def compile(self, code, name):
+        """Returns the cache key for `code`, compiling it only on a miss.
+
+        The chunk name is baked into the bytecode (error messages show it), so
+        it's part of the key: same code under another file name is a new chunk.
+        """
+        key = hashlib.sha256(f"{name}\0{code}".encode()).hexdigest()
+        self.last_hit = key in self.chunk_sizes
+        if self.last_hit:
+            self.chunk_sizes.move_to_end(key)
+            return key
+
+        size = self.compiler(code, key, name)  # raises on syntax errors
+        self.chunk_sizes[key] = size
+        self.chunk_bytes += size
+        while self.chunk_bytes > LUA_CHUNK_CACHE_BYTES and len(self.chunk_sizes) > 1:
+            old_key, old_size = self.chunk_sizes.popitem(last=False)
+            self.chunks[old_key] = None
+            self.chunk_bytes -= old_size
+        return key
+
+    def execute(self, code, attachment_info):
+        self.last_hit = None
+        self.canvas.reset()
+        name = "=" + attachment_info.get("script", "script")
+        key = self.compile(code, name)
+        info = self.to_lua(attachment_info)
+        result = self.runner(key, name, info, LUA_MAX_INSTRUCTIONS, LUA_DEADLINE, LUA_HOOK_STEP)
+        return lua_to_python(result)
+
+def lua_to_python(value, depth=0):
+    """Lua tables -> plain dicts (picklable, and what the output code expects)."""
+    kind = lupa.lua_type(value)
+    if kind == "table":
+        if depth > 16:
+            raise ValueError("Returned table is nested too deep")
+        return {k: lua_to_python(v, depth + 1) for k, v in value.items()}
+    if kind is not None:
+        return str(value)  # functions / coroutines / userdata
+    return value
+
+_sandbox = None
+
+def get_sandbox():
+    global _sandbox
+    if _sandbox is None:
+        _sandbox = LuaSandbox()
+    return _sandbox
 
 # ===============================
 # UTILITIES
 # ===============================
 
-def cleanup_cache():
-    now = time.time()
-    for filename in os.listdir(CACHE_DIR):
-        path = os.path.join(CACHE_DIR, filename)
-        if os.path.isfile(path) and now - os.path.getmtime(path) > CACHE_TTL:
-            try:
-                os.remove(path)
-            except:
-                pass
-
 def safe_path(path: str) -> str:
     """Prevent path traversal"""
     abs_path = os.path.abspath(path)
@@ -71,16 +461,157 @@ def safe_path(path: str) -> str:
         raise ValueError("Path traversal attempt detected")
     return path
 
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+CacheEntry = namedtuple("CacheEntry", "size expires digest")
+
+class CacheManager:
+    """In-memory index of cache/ (path -> size, expiry, hash).
+
+    The request path only touches the index; listing and deleting happen in the
+    background sweeper. Over the byte quota, least recently used files go first.
+    """
+
+    def __init__(self, root=CACHE_DIR, ttl=CACHE_TTL, quota=CACHE_QUOTA):
+        self.root = root
+        self.ttl = ttl
+        self.quota = quota
+        self.entries = OrderedDict()  # path -> CacheEntry, least recently used first
+        self.total_bytes = 0
+        self._pinned = Counter()      # paths a running command still needs
+        self.sweeper.change_interval(seconds=CACHE_SWEEP_SECONDS)
+
+    def _scan(self):
+        """One listing at startup so leftovers from the last run still expire."""
+        found = []
+        for filename in os.listdir(self.root):
+            path = os.path.join(self.root, filename)
+            if os.path.isfile(path):
+                st = os.stat(path)
+                found.append((path, CacheEntry(st.st_size, st.st_mtime + self.ttl, None)))
+        found.sort(key=lambda item: item[1].expires)
+        return found
+
+    async def start(self):
+        os.makedirs(self.root, exist_ok=True)
+        for path, entry in await asyncio.to_thread(self._scan):
+            self._insert(path, entry)
+        if not self.sweeper.is_running():
+            self.sweeper.start()
+
+    def stop(self):
+        self.sweeper.cancel()
+
+    def _insert(self, path, entry):
+        old = self.entries.pop(path, None)
+        if old:
+            self.total_bytes -= old.size
+        self.entries[path] = entry
+        self.total_bytes += entry.size
+
+    def _drop(self, path):
+        entry = self.entries.pop(path, None)
+        if entry:
+            self.total_bytes -= entry.size
+
+    def get(self, path):
+        """Index lookup that also counts as a use (LRU + fresh expiry)."""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        entry = entry._replace(expires=time.time() + self.ttl)
+        self.entries[path] = entry
+        self.entries.move_to_end(path)
+        return entry
+
+    async def add(self, path, digest=None):
+        """Indexes a file that was just written into the cache."""
+        safe_path(path)
+
+        def stat_and_hash():
+            return os.path.getsize(path), digest or file_digest(path)
+
+        size, digest = await asyncio.to_thread(stat_and_hash)
+        self._insert(path, CacheEntry(size, time.time() + self.ttl, digest))
+        with self.hold(path):  # never evict what we just added
+            await self.enforce_quota()
+        return path
+
+    async def blank(self, fmt, width, height):
+        """Same fmt/width/height -> same blank canvas file, written once."""
+        fmt, width, height = canvas_spec(fmt, width, height)
+        key = blank_key(fmt, width, height)
+        path = os.path.join(self.root, f"blank_{key}.{fmt}")
+        if self.get(path) is None:
+            await asyncio.to_thread(allocate_image, fmt, width, height)
+            await self.add(path, digest=key)
+        return path
+
+    @contextmanager
+    def hold(self, *paths):
+        """Keeps paths out of the sweeper/quota while a command still uses them."""
+        self._pinned.update(paths)
+        try:
+            yield
+        finally:
+            self._pinned.subtract(paths)
+            self._pinned += Counter()  # drop zero counts
+
+    async def enforce_quota(self):
+        victims = []
+        for path in list(self.entries):
+            if self.total_bytes <= self.quota:
+                break
+            if self._pinned[path]:
+                continue
+            victims.append(path)
+            self._drop(path)
+        if victims:
+            await asyncio.to_thread(_remove_files, victims)
+
+    @tasks.loop(seconds=CACHE_SWEEP_SECONDS)
+    async def sweeper(self):
+        try:
+            now = time.time()
+            expired = [p for p, e in self.entries.items() if e.expires <= now and not self._pinned[p]]
+            for path in expired:
+                self._drop(path)
+            if expired:
+                await asyncio.to_thread(_remove_files, expired)
+            await self.enforce_quota()
+        except Exception as e:
+            print(f"⚠️ Luau cache sweeper error: {e}")
+
 # ===============================
 # IMAGE / GIF ALLOCATOR
 # ===============================
 
+def canvas_spec(fmt="bmp", width=512, height=512):
+    """Clamped (fmt, width, height) for a blank canvas."""
+    width = max(1, min(int(width), MAX_IMAGE_SIZE))
+    height = max(1, min(int(height), MAX_IMAGE_SIZE))
+    return fmt, width, height
+
+def blank_key(fmt, width, height):
+    return hashlib.sha256(f"{fmt}:{width}x{height}".encode()).hexdigest()[:16]
+
 def allocate_image(fmt="bmp", width=512, height=512):
-    width = min(int(width), MAX_IMAGE_SIZE)
-    height = min(int(height), MAX_IMAGE_SIZE)
+    fmt, width, height = canvas_spec(fmt, width, height)
 
-    key = hashlib.sha256(f"{fmt}{width}{height}{time.time()}".encode()).hexdigest()[:16]
-    path = os.path.join(CACHE_DIR, f"{key}.{fmt}")
+    key = blank_key(fmt, width, height)
+    path = os.path.join(CACHE_DIR, f"blank_{key}.{fmt}")
 
     if os.path.exists(path):
         return path
@@ -96,6 +627,10 @@ def allocate_image(fmt="bmp", width=512, height=512):
 # 3D MODEL VALIDATOR
 # ===============================
 
+# Assets are stored under their content hash, so path -> content never changes
+# and a validation result can be reused for as long as the file exists.
+_model_checks = OrderedDict()  # path -> None (valid) or error message
+
 def load_model(model_info: dict):
     path = model_info.get("path")
     mtype = model_info.get("type", "").lower()
@@ -108,6 +643,29 @@ def load_model(model_info: dict):
     if not os.path.exists(path):
         raise ValueError("Model file not found")
 
+    memo_key = (path, mtype)
+    if memo_key in _model_checks:
+        _model_checks.move_to_end(memo_key)
+        error = _model_checks[memo_key]
+        if error:
+            raise ValueError(error)
+        return path
+
+    try:
+        validate_model(path, mtype)
+        error = None
+    except ValueError as e:
+        error = str(e)
+
+    _model_checks[memo_key] = error
+    if len(_model_checks) > MODEL_CHECK_MEMO:
+        _model_checks.popitem(last=False)
+    if error:
+        raise ValueError(error)
+    return path
+
+def validate_model(path, mtype):
+
     if mtype == "obj":
         if not path.lower().endswith(".obj"):
             raise ValueError("File does not have .obj extension")
@@ -116,14 +674,12 @@ def load_model(model_info: dict):
             content = f.read(1024)
             if "v " not in content and "f " not in content:
                 raise ValueError("Doesn't look like a valid OBJ file")
-        return path
 
     elif mtype in ("gltf", "glb"):
         if not path.lower().endswith((".gltf", ".glb")):
             raise ValueError("File does not have .gltf / .glb extension")
         try:
             GLTF2().load(path)
-            return path
         except Exception as e:
             raise ValueError(f"Invalid GLTF/GLB: {e}")
 
@@ -131,43 +687,20 @@ def load_model(model_info: dict):
         raise ValueError("Unsupported model type (only obj, gltf, glb allowed)")
 
 # ===============================
-# LUAU EXECUTION
-# ===============================
-
-# ===============================
-# LUAU EXECUTION (fixed version)
+# LUAU EXECUTION (runs inside a Lua worker)
 # ===============================
 
 def run_luau_script(code: str, attachment_info: dict):
-    cleanup_cache()
+    global _sandbox
 
     try:
-        # Create a proper Lua table for the top-level info
-        lua_info = lua.table()
+        sandbox = get_sandbox()
+        result = sandbox.execute(code, attachment_info)
 
-        lua_info["script"] = attachment_info["script"]
-        lua_info["has_image"] = attachment_info["has_image"]
-        lua_info["has_gif"] = attachment_info["has_gif"]
-        lua_info["has_bitmap"] = attachment_info["has_bitmap"]
-
-        # Convert the assets list to a real Lua table (1-based)
-        lua_assets = lua.table()
-        for i, asset_dict in enumerate(attachment_info["assets"], 1):
-            lua_asset = lua.table()
-            for key, value in asset_dict.items():
-                lua_asset[key] = value  # strings, ints, bools convert automatically
-            lua_assets[i] = lua_asset
-
-        lua_info["assets"] = lua_assets
-
-        # Now execute the script and call it with the clean Lua table
-        chunk = lua.execute(code)
-        result = chunk(lua_info) if callable(chunk) else chunk
-
-        if not isinstance(result, dict):  # Note: this is Python dict (lupa converts Lua table → dict)
+        if not isinstance(result, dict):  # Lua tables come back as Python dicts
             return INVALID_RETURN_TYPE, {"error": "Script must return a table"}
 
-        output = {}
+        output = {"files": []}  # rendered canvases: (filename, encoded bytes), never touch disk
         has_content = False
 
         if msg := result.get("message"):
@@ -176,15 +709,26 @@ def run_luau_script(code: str, attachment_info: dict):
 
         if result.get("image") or result.get("bitmap"):
             cfg = result.get("image") or result.get("bitmap") or {}
-            w = cfg.get("width", 512)
-            h = cfg.get("height", 512)
-            output["image"] = allocate_image("bmp", w, h)
+            if not isinstance(cfg, dict):
+                cfg = {}
+            if "_canvas" in cfg:
+                fmt = "png" if result.get("image") else "bmp"
+                output["files"].append((f"render.{fmt}", sandbox.canvas.encode_canvas(cfg["_canvas"], fmt)))
+            else:
+                w = cfg.get("width", 512)
+                h = cfg.get("height", 512)
+                output["image"] = canvas_spec("bmp", w, h)  # the cog allocates it via the cache index
             has_content = True
 
         if gif_cfg := result.get("gif"):
-            w = gif_cfg.get("width", 512)
-            h = gif_cfg.get("height", 512)
-            output["gif"] = allocate_image("gif", w, h)
+            if not isinstance(gif_cfg, dict):
+                gif_cfg = {}
+            if "_gif" in gif_cfg:
+                output["files"].append(("render.gif", sandbox.canvas.encode_gif(gif_cfg["_gif"])))
+            else:
+                w = gif_cfg.get("width", 512)
+                h = gif_cfg.get("height", 512)
+                output["gif"] = canvas_spec("gif", w, h)
             has_content = True
 
         if model := result.get("model3d"):
@@ -196,8 +740,114 @@ def run_luau_script(code: str, attachment_info: dict):
 
         return OK, output
 
+    except lupa.LuaMemoryError:
+        _sandbox = None  # rebuild the runtime before the next job
+        return INVALID_RETURN_TYPE, {"error": f"Script exceeded the {LUA_MAX_MEMORY // 1024 // 1024}MB memory limit"}
     except Exception as e:
         return INVALID_RETURN_TYPE, {"error": str(e)}
+    finally:
+        if _sandbox is not None:
+            _sandbox.canvas.reset()  # free the framebuffers between jobs
+
+def lua_worker_main(conn):
+    """Worker process loop: one sandbox, one job at a time, results back over the pipe."""
+    get_sandbox()  # pre-warm before the first job arrives
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        code, attachment_info = job
+        status, result = run_luau_script(code, attachment_info)
+        cache_hit = _sandbox.last_hit if _sandbox is not None else None
+        conn.send((status, result, cache_hit))
+
+# ===============================
+# WORKER POOL (bot process side)
+# ===============================
+
+class LuaWorkerPool:
+    """Pre-warmed Lua worker processes. A stuck worker is killed and replaced."""
+
+    def __init__(self, size=LUA_WORKERS):
+        self.size = size
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._workers = set()
+        # compiled-chunk cache counters, summed over all workers
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(target=lua_worker_main, args=(child_conn,), daemon=True)
+        proc.start()
+        child_conn.close()
+        worker = (proc, parent_conn)
+        self._workers.add(worker)
+        return worker
+
+    def _kill(self, worker):
+        proc, conn = worker
+        self._workers.discard(worker)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if proc.is_alive():
+            proc.kill()
+        # reaping can take a moment after the kill -> never on the event loop
+        try:
+            asyncio.get_running_loop().run_in_executor(None, proc.join, 1)
+        except RuntimeError:  # no loop running (interpreter shutdown)
+            proc.join(timeout=1)
+
+    def start(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(self._spawn())
+
+    def close(self):
+        for worker in list(self._workers):
+            self._kill(worker)
+
+    async def run(self, code, attachment_info):
+        worker = await self._idle.get()
+        try:
+            proc, conn = worker
+            if not proc.is_alive():
+                self._kill(worker)
+                worker = proc, conn = self._spawn()
+
+            conn.send((code, attachment_info))
+            ready = await asyncio.to_thread(conn.poll, LUA_DEADLINE + LUA_KILL_GRACE)
+            if not ready:
+                # Stuck in C code (huge string.rep, pattern bomb...) -> hard kill
+                self._kill(worker)
+                worker = self._spawn()
+                return INVALID_RETURN_TYPE, {"error": f"Script exceeded the {LUA_DEADLINE:g}s time limit"}
+            status, result, cache_hit = conn.recv()
+            if cache_hit is not None:
+                if cache_hit:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            return status, result
+
+        except (EOFError, OSError):
+            self._kill(worker)
+            worker = self._spawn()
+            return INVALID_RETURN_TYPE, {"error": "Lua worker crashed, try again"}
+        except asyncio.CancelledError:
+            # Result may still arrive later -> don't reuse this worker
+            self._kill(worker)
+            worker = self._spawn()
+            raise
+        finally:
+            self._idle.put_nowait(worker)
+
 # ===============================
 # COG
 # ===============================
@@ -205,7 +855,24 @@ def run_luau_script(code: str, attachment_info: dict):
 class LuauVMCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.pool = LuaWorkerPool()
+        self.cache = CacheManager()
+
+    async def cog_load(self):
+        await self.cache.start()
+        self.pool.start()
+
+    async def cog_unload(self):
+        self.cache.stop()
+        self.pool.close()
+
+    @commands.command(name="luaucache")
+    async def luaucache(self, ctx: commands.Context):
+        """Shows the compiled-chunk cache hit/miss counters."""
+        hits, misses = self.pool.cache_hits, self.pool.cache_misses
+        total = hits + misses
+        rate = (hits / total * 100) if total else 0.0
+        await ctx.send(f"🧠 Luau chunk cache: **{hits}** hits / **{misses}** misses ({rate:.1f}% hit rate)")
 
     @commands.command(name="luau")
     async def luau(self, ctx: commands.Context):
@@ -233,6 +900,10 @@ class LuauVMCog(commands.Cog):
             await ctx.send("❌ No `.luau` script found in attachments.")
             return
 
+        if sum(att.size for att in assets) > MAX_ASSETS_TOTAL:
+            await ctx.send(f"⚠️ Assets are too large together (max {MAX_ASSETS_TOTAL//1024//1024}MB per command).")
+            return
+
         # Read script
         try:
             code_bytes = await script_attachment.read()
@@ -241,22 +912,47 @@ class LuauVMCog(commands.Cog):
             await ctx.send(f"⚠️ Failed to read script: {e}")
             return
 
-        # Process assets
-        asset_list = []
-        has_image = has_gif = has_bitmap = False
-
-        for asset in assets:
-            ext = os.path.splitext(asset.filename)[1].lower()
-            filename_hash = hashlib.sha256(asset.filename.encode()).hexdigest()[:16]
-            safe_name = f"{filename_hash}{ext}"
-            save_path = os.path.join(CACHE_DIR, safe_name)
+        # Process assets: download all at once, store each distinct content once
+        try:
+            fetched = await asyncio.gather(*(self.fetch_asset(att) for att in assets))
+        except Exception as e:
+            await ctx.send(f"⚠️ Failed to download assets: {e}")
+            return
 
+        asset_paths = [path for path, _, _ in fetched]
+        with self.cache.hold(*asset_paths):
             try:
-                await asset.save(save_path)
+                unique = {path: (digest, data) for path, digest, data in fetched}
+                await asyncio.gather(*(self.store_asset(path, digest, data) for path, (digest, data) in unique.items()))
             except Exception as e:
-                await ctx.send(f"⚠️ Failed to save asset `{asset.filename}`: {e}")
+                await ctx.send(f"⚠️ Failed to save assets: {e}")
                 return
+            del unique, fetched  # don't keep the bytes alive while the script runs
+
+            att_info = self.build_att_info(script_attachment, assets, asset_paths)
+            await self.run_and_send(ctx, code, att_info)
+
+    async def fetch_asset(self, att):
+        """Downloads one attachment -> (content-addressed path, sha256, bytes)."""
+        data = await att.read()
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        ext = os.path.splitext(att.filename)[1].lower()
+        return os.path.join(CACHE_DIR, f"{digest[:32]}{ext}"), digest, data
+
+    async def store_asset(self, path, digest, data):
+        if self.cache.get(path) is not None:
+            return  # same content is already on disk
+        def write():
+            with open(path, "wb") as f:
+                f.write(data)
+        await asyncio.to_thread(write)
+        await self.cache.add(path, digest=digest)
+
+    def build_att_info(self, script_attachment, assets, asset_paths):
+        asset_list = []
+        has_image = has_gif = has_bitmap = False
 
+        for asset, save_path in zip(assets, asset_paths):
             info = {
                 "filename": asset.filename,
                 "size": asset.size,
@@ -283,7 +979,7 @@ class LuauVMCog(commands.Cog):
 
             asset_list.append(info)
 
-        att_info = {
+        return {
             "script": script_attachment.filename,
             "assets": asset_list,
             "has_image": has_image,
@@ -291,8 +987,9 @@ class LuauVMCog(commands.Cog):
             "has_bitmap": has_bitmap,
         }
 
-        # Execute
-        status, result = run_luau_script(code, att_info)
+    async def run_and_send(self, ctx, code, att_info):
+        # Execute (off the event loop, in a sandboxed worker process)
+        status, result = await self.pool.run(code, att_info)
 
         if status == NO_MESSAGE_OR_INTERACTABLES:
             await ctx.send("❌ Script didn't produce any output (message, image, gif, or model).")
@@ -308,11 +1005,18 @@ class LuauVMCog(commands.Cog):
             if message := result.get("message"):
                 await ctx.send(message)
 
-            if img_path := result.get("image"):
-                await ctx.send(file=discord.File(img_path))
+            if img_spec := result.get("image"):
+                img_path = await self.cache.blank(*img_spec)
+                with self.cache.hold(img_path):
+                    await ctx.send(file=discord.File(img_path))
+
+            if gif_spec := result.get("gif"):
+                gif_path = await self.cache.blank(*gif_spec)
+                with self.cache.hold(gif_path):
+                    await ctx.send(file=discord.File(gif_path))
 
-            if gif_path := result.get("gif"):
-                await ctx.send(file=discord.File(gif_path))
+            for filename, data in result.get("files", []):
+                await ctx.send(file=discord.File(io.BytesIO(data), filename=filename))
 
             if model_path := result.get("model3d"):
                 await ctx.send(file=discord.File(model_path), content="📦 3D Model:")
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import psutil
 import asyncio
 
 class SmartModeration(commands.Cog):
@@ -41,7 +40,7 @@ class SmartModeration(commands.Cog):
     @commands.has_permissions(manage_roles=True)
     async def mute(self, ctx, member: discord.Member, *, reason="No reason provided"):
         """Improved Mute: Applies a server-wide 'Muted' role."""
-        if psutil.virtual_memory().percent > 90.0:
+        if self.bot.resources.is_busy():
             return await ctx.send("🚨 RAM too high. Mute aborted to save resources.")
 
         if member.top_role >= ctx.author.top_role:
@@ -75,7 +74,7 @@ class SmartModeration(commands.Cog):
         if amount > 100:
             return await ctx.send("⚠️ To protect the HP-Note, I can only clear 100 messages at a time.")
         
-        if psutil.virtual_memory().percent > 90.0:
+        if self.bot.resources.is_busy():
             return await ctx.send("🚨 System memory too high for mass deletion.")
 
         deleted = await ctx.channel.purge(limit=amount + 1)
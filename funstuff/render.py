@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import http.client
 import uuid
 import os
 import asyncio
@@ -32,27 +31,25 @@ class Render(commands.Cog):
 
         headers = {
             "Content-Type": "application/octet-stream",
-            "Content-Length": str(len(image_bytes)),
             "X-Manip-Type": manip_type,
             "X-Angle": str(angle)
         }
 
-        # Send to Java renderer
-        conn = http.client.HTTPConnection(
-            JAVA_SERVER_IP,
-            JAVA_SERVER_PORT,
-            timeout=60
-        )
-
+        # Send to Java renderer (shared async pool, no blocking socket on the loop)
         try:
-            conn.request("POST", "/process", body=image_bytes, headers=headers)
-            res = conn.getresponse()
-            result_bytes = res.read()
-        finally:
-            conn.close()
+            res = await self.bot.http_pool.request(
+                "POST",
+                f"http://{JAVA_SERVER_IP}:{JAVA_SERVER_PORT}/process",
+                data=image_bytes,
+                headers=headers,
+                timeout=60,
+            )
+        except Exception as e:
+            return await ctx.reply(f"❌ Image processing failed: {e}")
 
         if res.status != 200:
             return await ctx.reply("❌ Image processing failed.")
+        result_bytes = res.body
 
         # Save temp output
         out_path = f"/tmp/render_{uuid.uuid4().hex}.png"
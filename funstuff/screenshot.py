@@ -3,7 +3,6 @@ from discord.ext import commands
 import pyautogui
 import os
 import tempfile
-import psutil
 import asyncio
 
 # --- FIXED: List of authorized IDs ---
@@ -21,9 +20,9 @@ class SystemAdmin(commands.Cog):
         if ctx.author.id not in AUTHORIZED_USERS:
             return await ctx.send("🚫 **Access Denied**: You are not on the authorized list.")
 
-        # 🛡️ RESOURCE GUARD: Respecting the 90% RAM rule
-        ram_now = psutil.virtual_memory().percent
-        if ram_now > 90.0:
+        # 🛡️ RESOURCE GUARD: Shared busy threshold (cached snapshot)
+        ram_now = self.bot.resources.ram_percent
+        if self.bot.resources.is_busy():
             return await ctx.send(f"⚠️ **Memory Guard**: RAM is at {ram_now}%. System is too busy.")
 
         await ctx.send("📸 **Capturing screen...**")
@@ -1,85 +1,179 @@
 import asyncio
+import bisect
 import functools
+import multiprocessing
 import os
 import shutil
+from collections import deque
 import numpy as np
 import discord
 from discord.ext import commands
 from discord import app_commands
 from PIL import Image
 from moviepy import VideoFileClip, ImageSequenceClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
 from concurrent.futures import ProcessPoolExecutor
 
+BAKE_WORKERS = 2
+STREAM_WINDOW = 8  # max frames in flight in stream mode (bounds RAM)
+# spawn: forked workers would inherit ffmpeg's stdin pipe and it would never see EOF
+BAKE_CONTEXT = multiprocessing.get_context("spawn")
+OVERLAY_DIR = "./images"
+OVERLAY_SHRINK = 30  # the "-30" size reduction
+
 def lerp(start, end, t):
     """Linear interpolation for smooth X/Y movement."""
     return int(start + (end - start) * t)
 
+def load_keyframes(instruction_file):
+    keyframes = []
+    with open(instruction_file, "r") as f:
+        for line in f:
+            if "|" in line:
+                f_num, img, x, y = line.strip().split("|")
+                keyframes.append({'f': int(f_num), 'img': img, 'x': int(x), 'y': int(y)})
+    keyframes.sort(key=lambda k: k['f'])
+    return keyframes
+
+# ---------- overlay cache (one per worker process) ----------
+
+_OVERLAYS = {}  # overlay id -> (rgb float32 HxWx3, alpha float32 HxWx1)
+
+def load_overlay(name):
+    """Opens ./images/<name> and applies the -30 LANCZOS resize. None if missing."""
+    img_path = os.path.join(OVERLAY_DIR, name)
+    if not os.path.exists(img_path):
+        return None
+    with Image.open(img_path) as overlay:
+        overlay = overlay.convert("RGBA")
+        new_w = max(1, overlay.width - OVERLAY_SHRINK)
+        new_h = max(1, overlay.height - OVERLAY_SHRINK)
+        return overlay.resize((new_w, new_h), Image.Resampling.LANCZOS)
+
+def init_overlay_cache(names):
+    """Worker initializer: decode + resize every overlay ONCE per worker."""
+    _OVERLAYS.clear()
+    for oid, name in enumerate(names):
+        overlay = load_overlay(name)
+        if overlay is None:
+            continue
+        arr = np.asarray(overlay, dtype=np.float32)
+        _OVERLAYS[oid] = (arr[..., :3], arr[..., 3:] / 255.0)
+
+class BakeTimeline:
+    """Keyframes compiled once: bisected segments -> per-frame (x, y, overlay id)."""
+
+    def __init__(self, keyframes, frame_size):
+        self.keyframes = keyframes
+        self.frame_numbers = [k['f'] for k in keyframes]
+        self.frame_w, self.frame_h = frame_size
+        # overlay id = index into this list (what the workers cache)
+        self.overlays = sorted({k['img'] for k in keyframes})
+        self._ids = {name: oid for oid, name in enumerate(self.overlays)}
+        self._sizes = {}
+        for name in self.overlays:
+            path = os.path.join(OVERLAY_DIR, name)
+            if os.path.exists(path):
+                with Image.open(path) as im:  # header only, no decode
+                    self._sizes[name] = (max(1, im.width - OVERLAY_SHRINK), max(1, im.height - OVERLAY_SHRINK))
+        self._cache = []
+
+    def segment(self, f_idx):
+        """Same pairing as the old linear scan, found with bisect."""
+        kf = self.keyframes
+        if f_idx > self.frame_numbers[-1]:
+            return kf[-1], kf[-1]
+        if f_idx < self.frame_numbers[0]:
+            return kf[0], kf[-1]
+        j = max(0, bisect.bisect_left(self.frame_numbers, f_idx) - 1)
+        if j + 1 >= len(kf):
+            return kf[0], kf[-1]
+        return kf[j], kf[j + 1]
+
+    def placement(self, f_idx):
+        """(x, y, overlay id) for one frame; id is -1 when nothing is drawn."""
+        if f_idx < len(self._cache):
+            return self._cache[f_idx]
+
+        start_k, end_k = self.segment(f_idx)
+        if start_k['f'] == end_k['f']:
+            t = 1.0
+        else:
+            t = max(0, min(1, (f_idx - start_k['f']) / (end_k['f'] - start_k['f'])))
+        x = lerp(start_k['x'], end_k['x'], t)
+        y = lerp(start_k['y'], end_k['y'], t)
+
+        size = self._sizes.get(start_k['img'])
+        # THE "LAZY" CLIPPER (Hide out of bounds / missing overlay)
+        if size is None or x >= self.frame_w or y >= self.frame_h or x + size[0] <= 0 or y + size[1] <= 0:
+            return (x, y, -1)
+        return (x, y, self._ids[start_k['img']])
+
+    def compile(self, frame_count):
+        self._cache = [self.placement(i) for i in range(frame_count)]
+        return self._cache
+
+def composite_frame(frame, x, y, oid):
+    """The only per-frame work: one alpha blend of the cached overlay onto the frame."""
+    if oid < 0 or oid not in _OVERLAYS:
+        return frame
+    ov_rgb, ov_a = _OVERLAYS[oid]
+    h, w = ov_a.shape[:2]
+    frame_h, frame_w = frame.shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return frame
+
+    frame = np.array(frame[..., :3], dtype=np.uint8)  # writable RGB copy
+    region = frame[y0:y1, x0:x1].astype(np.float32)
+    src = ov_rgb[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = ov_a[y0 - y:y1 - y, x0 - x:x1 - x]
+    frame[y0:y1, x0:x1] = (src * alpha + region * (1.0 - alpha) + 0.5).astype(np.uint8)
+    return frame
+
 def bake_single_frame(args):
     """CPU-heavy work: Reads one frame, edits it, saves to disk, returns PATH."""
-    frame_path, start_k, end_k, f_idx, output_dir = args
-    LIMIT_X, LIMIT_Y = 640, 360
+    frame_path, x, y, oid, f_idx, output_dir = args
     
     # Create unique baked path
     baked_path = os.path.join(output_dir, f"baked_{f_idx:04d}.png")
 
     with Image.open(frame_path) as base_img:
-        base_img = base_img.convert("RGBA")
-        
-        # 1. Lerp Logic
-        if start_k['f'] == end_k['f']:
-            t = 1.0
-        else:
-            t = max(0, min(1, (f_idx - start_k['f']) / (end_k['f'] - start_k['f'])))
-        
-        curr_x = lerp(start_k['x'], end_k['x'], t)
-        curr_y = lerp(start_k['y'], end_k['y'], t)
-        
-        # 2. Dynamic Loading (34.png, 59.png, etc.)
-        img_path = f"./images/{start_k['img']}"
-        
-        if os.path.exists(img_path):
-            with Image.open(img_path) as overlay:
-                overlay = overlay.convert("RGBA")
-                
-                # Apply the -30 size reduction
-                new_w = max(1, overlay.width - 30)
-                new_h = max(1, overlay.height - 30)
-                overlay = overlay.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                
-                # 3. THE "LAZY" CLIPPER (Hide out of bounds)
-                if not (curr_x >= LIMIT_X or curr_y >= LIMIT_Y or \
-                        curr_x + new_w <= 0 or curr_y + new_h <= 0):
-                    base_img.alpha_composite(overlay, (curr_x, curr_y))
-
-        # 4. Save to disk as Palette (RAM Safe)
-        final_frame = base_img.convert("RGB").quantize(colors=256)
-        final_frame.save(baked_path, optimize=True)
+        frame = composite_frame(np.asarray(base_img.convert("RGB")), x, y, oid)
+
+    # Save to disk as Palette (RAM Safe)
+    final_frame = Image.fromarray(frame).quantize(colors=256)
+    final_frame.save(baked_path, optimize=True)
         
     return baked_path # Returns STRING, not LIST or IMAGE
 
+def bake_stream_frame(args):
+    """Stream mode: frame array in, composited RGB array out (no disk, no re-quantize)."""
+    frame, x, y, oid = args
+    return composite_frame(frame, x, y, oid)
+
 class VideoBaker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.temp_dir = "temp_sequence"
         self.baked_dir = "baked_sequence"
 
-    def run_baker(self, input_path, instruction_file):
+    def run_baker(self, input_path, instruction_file, stream=True):
         output_video = "final_baked.mp4"
+
+        # 1. Load Keyframe Data
+        keyframes = load_keyframes(instruction_file)
+
+        if stream:
+            return self.run_baker_stream(input_path, keyframes, output_video)
         
         # Cleanup
         for d in [self.temp_dir, self.baked_dir]:
             if os.path.exists(d): shutil.rmtree(d)
             os.makedirs(d)
 
-        # 1. Load Keyframe Data
-        keyframes = []
-        with open(instruction_file, "r") as f:
-            for line in f:
-                if "|" in line:
-                    f_num, img, x, y = line.strip().split("|")
-                    keyframes.append({'f': int(f_num), 'img': img, 'x': int(x), 'y': int(y)})
-        keyframes.sort(key=lambda k: k['f'])
-
         # 2. Extract Video
         with VideoFileClip(input_path) as clip:
             audio = clip.audio
@@ -88,22 +182,14 @@ class VideoBaker(commands.Cog):
             
             extracted = sorted([os.path.join(self.temp_dir, f) for f in os.listdir(self.temp_dir) if f.endswith('.png')])
             
-            # 3. Build Arguments
-            bake_args = []
-            for i in range(len(extracted)):
-                start_k = keyframes[0]
-                end_k = keyframes[-1]
-                for j in range(len(keyframes) - 1):
-                    if keyframes[j]['f'] <= i <= keyframes[j+1]['f']:
-                        start_k, end_k = keyframes[j], keyframes[j+1]
-                        break
-                    elif i > keyframes[-1]['f']:
-                        start_k = end_k = keyframes[-1]
-
-                bake_args.append((extracted[i], start_k, end_k, i, self.baked_dir))
+            # 3. Build Arguments (timeline compiled once, bisect instead of a scan per frame)
+            timeline = BakeTimeline(keyframes, clip.size)
+            placements = timeline.compile(len(extracted))
+            bake_args = [(extracted[i], x, y, oid, i, self.baked_dir) for i, (x, y, oid) in enumerate(placements)]
 
             # 4. Multi-Core Bake (Return string paths)
-            with ProcessPoolExecutor(max_workers=2) as executor:
+            with ProcessPoolExecutor(max_workers=BAKE_WORKERS, mp_context=BAKE_CONTEXT,
+                                     initializer=init_overlay_cache, initargs=(timeline.overlays,)) as executor:
                 # result is an iterator of strings
                 result = executor.map(bake_single_frame, bake_args)
                 baked_frame_paths = list(result) 
@@ -116,17 +202,46 @@ class VideoBaker(commands.Cog):
             new_clip.write_videofile(output_video, codec="libx264", preset="ultrafast", logger=None)
             return output_video
 
+    def run_baker_stream(self, input_path, keyframes, output_video):
+        """Decoder -> bounded worker window -> ffmpeg stdin. Nothing touches disk."""
+        with VideoFileClip(input_path) as clip:
+            fps = clip.fps
+            # Audio is copied straight from the input file by ffmpeg
+            audio_src = input_path if clip.audio else None
+            audio_map = ["-map", "0:v:0", "-map", "1:a:0?"] if audio_src else None
+            timeline = BakeTimeline(keyframes, clip.size)
+
+            with ProcessPoolExecutor(max_workers=BAKE_WORKERS, mp_context=BAKE_CONTEXT,
+                                     initializer=init_overlay_cache, initargs=(timeline.overlays,)) as executor, \
+                 FFMPEG_VideoWriter(output_video, clip.size, fps, codec="libx264", preset="ultrafast",
+                                    audiofile=audio_src, ffmpeg_params=audio_map) as writer:
+                in_flight = deque()
+                for i, frame in enumerate(clip.iter_frames(fps=fps, dtype="uint8")):
+                    x, y, oid = timeline.placement(i)
+                    in_flight.append(executor.submit(bake_stream_frame, (frame, x, y, oid)))
+
+                    # Window full -> write the oldest frame before decoding more
+                    if len(in_flight) >= STREAM_WINDOW:
+                        writer.write_frame(in_flight.popleft().result())
+
+                while in_flight:
+                    writer.write_frame(in_flight.popleft().result())
+
+        return output_video
+
     @commands.hybrid_command(name="bake")
-    async def bake(self, ctx):
+    async def bake(self, ctx, mode: str = "stream"):
+        """Usage: !bake [stream|disk] (stream = no PNG round-trips)"""
         if ctx.interaction: await ctx.defer()
-        await ctx.send("⚡ **Bake Started.** Processing 990 frames...")
+        stream = mode.lower() != "disk"
+        await ctx.send(f"⚡ **Bake Started** ({'stream' if stream else 'disk'} mode). Processing 990 frames...")
         
         loop = asyncio.get_event_loop()
         try:
             if not os.path.exists("input.mp4"):
                 return await ctx.send("❌ Error: `input.mp4` not found.")
             
-            task = functools.partial(self.run_baker, "input.mp4", "cocielochaves1.txt")
+            task = functools.partial(self.run_baker, "input.mp4", "cocielochaves1.txt", stream)
             output_file = await loop.run_in_executor(None, task)
             await ctx.send(file=discord.File(output_file))
         except Exception as e:
@@ -6,12 +6,10 @@ import os
 import functools
 import shutil
 import tempfile
-import psutil
 from moviepy import ImageClip, AudioFileClip, CompositeAudioClip
 DELAY = 110
 FUNSTUFF_DIR = "./funstuff"
 FPS = 30
-MEMORY_THRESHOLD = 90.0
 
 class RealmSimonfy(commands.Cog):
     def __init__(self, bot):
@@ -77,7 +75,7 @@ class RealmSimonfy(commands.Cog):
 
     @commands.command(name="realmsimonfy")
     async def realmsimonfy(self, ctx):
-        if psutil.virtual_memory().percent > MEMORY_THRESHOLD:
+        if self.bot.resources.is_busy():
             return await ctx.send("⚠️ RAM too high. Bake paused.")
 
         if not ctx.message.attachments:
@@ -2,8 +2,8 @@ import random
 import os
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont, ImageOps
-import discord
-import io
+import asyncio
+from services.encoder import encode_image
 
 DICT_PATH = "./what/dict.txt"
 IMAGE_SIZE = (800, 500)
@@ -89,11 +89,9 @@ class RandomWords(commands.Cog):
                 placed_boxes.append(box)
                 break
 
-        buf = io.BytesIO()
-        img.save(buf, "PNG")
-        buf.seek(0)
+        result = await asyncio.to_thread(encode_image, img)
 
-        await ctx.send(file=discord.File(buf, "random_words.png"))
+        await ctx.send(file=self.bot.encoder.file(result, "random_words.png"))
 
 
 async def setup(bot):
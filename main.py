@@ -2,8 +2,11 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
-# never gonna work on pypy for me import psutil
-import psutil
+from services.resources import ResourceMonitor, PAUSE_AT, RESUME_AT
+from services.render_farm import RenderFarm
+from services.http_pool import HttpPool
+from services.image_cache import ImageCache
+from services.encoder import EncoderStats
 
 def get_token():
     try:
@@ -64,12 +67,11 @@ async def console_listener():
         except Exception as e:
             print(f"Console error: {e}")
 # --- RESOURCE GUARD LOGIC ---
-MEMORY_THRESHOLD = 95.5 # Percent
+MEMORY_THRESHOLD = PAUSE_AT # Percent (pauses here, resumes below RESUME_AT)
 
 def is_system_safe():
-    """Checks if RAM usage is below the threshold."""
-    return psutil.virtual_memory().percent < MEMORY_THRESHOLD
-    pass
+    """Checks the cached resource snapshot (no psutil call on the hot path)."""
+    return bot.resources.is_safe()
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
@@ -79,9 +81,19 @@ class MandrakeBot(commands.Bot):
         # We define the command_prefix but also prepare the app_commands tree
         super().__init__(command_prefix="!", intents=intents, help_command=None)
         self.process_queue = asyncio.Semaphore(5)
+        self.resources = ResourceMonitor(pause_at=MEMORY_THRESHOLD, resume_at=RESUME_AT)
+        self.render_farm = RenderFarm()
+        self.http_pool = HttpPool()
+        self.image_cache = ImageCache(self.http_pool)
+        self.encoder = EncoderStats()
 
     async def setup_hook(self):
         """This runs before the bot starts connecting to Discord."""
+        # 0. Start shared services
+        self.resources.start()
+        self.render_farm.start()
+        await self.http_pool.start()
+
         # 1. Load Cogs
         await load_cogs()
         
@@ -97,13 +109,19 @@ class MandrakeBot(commands.Bot):
         except Exception as e:
             print(f"❌ Slash Sync Error: {e}")
 
+    async def close(self):
+        self.resources.stop()
+        await self.render_farm.close()
+        await self.http_pool.close()
+        await super().close()
+
 bot = MandrakeBot()
 
 # --- GLOBAL COMMAND CHECK ---
 @bot.check
 async def resource_gatekeeper(ctx):
     if not is_system_safe():
-        await ctx.send(f"⚠️ **SYSTEM OVERLOAD**: RAM is at {psutil.virtual_memory().percent}%. "
+        await ctx.send(f"⚠️ **SYSTEM OVERLOAD**: RAM is at {bot.resources.ram_percent}%. "
                        "Commands are paused to prevent a crash.")
         return False
     return True
@@ -122,6 +140,8 @@ async def on_command_error(ctx, error):
 
 @bot.event
 async def on_message(message):
+    # newest image per channel, for image commands without an attachment (bots' too, so results can be chained)
+    bot.image_cache.note_message(message)
     if message.author.bot:
         return
     if not is_system_safe():
@@ -130,7 +150,7 @@ async def on_message(message):
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
-    print(f"🛡️ Resource Guard: {MEMORY_THRESHOLD}% | Queue: Active")
+    print(f"🛡️ Resource Guard: {MEMORY_THRESHOLD}% (resume {RESUME_AT}%) | Queue: Active")
 
     bot.loop.create_task(console_listener())
 # --- HYBRID HELP COMMAND ---
@@ -0,0 +1 @@
+"""Bot-wide services shared by the cogs (attached to MandrakeBot in main.py)."""
@@ -0,0 +1,162 @@
+import io
+import os
+import time
+from collections import Counter, namedtuple
+
+import discord
+import numpy as np
+from PIL import Image, features
+
+# --- ENCODER POLICY CONFIG ---
+UPLOAD_BUDGET = 9_500_000      # bytes; Discord refuses files over 10MB
+PHOTO_QUALITY = 85             # first try for lossy formats
+MIN_QUALITY = 35               # binary search floor before we start shrinking
+SHRINK_STEP = 0.75             # scale applied when even MIN_QUALITY doesn't fit
+MAX_SHRINKS = 4
+PNG_COMPRESS = 6               # zlib level; optimize=True costs seconds on big canvases
+ANALYZE_SIZE = 256             # content is judged on a thumbnail this big
+FLAT_COLOR_RATIO = 0.02        # distinct colours / pixels below this -> flat art
+FLAT_NEIGHBOUR_RATIO = 0.55    # share of pixels equal to their right neighbour -> flat art
+
+LOSSY_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+
+EXTENSIONS = {"PNG": "png", "WEBP": "webp", "JPEG": "jpg"}
+
+EncodedImage = namedtuple("EncodedImage", "buf format quality size seconds kind")
+
+
+def has_alpha(img):
+    if "A" not in img.getbands() and "transparency" not in img.info:
+        return False
+    return img.convert("RGBA").getchannel("A").getextrema()[0] < 255
+
+
+def classify(img):
+    """'flat' (UI, text, pixel art, memes with big fills) or 'photo'."""
+    thumb = img.convert("RGB")
+    thumb.thumbnail((ANALYZE_SIZE, ANALYZE_SIZE), Image.NEAREST)  # NEAREST: no new colours
+    arr = np.asarray(thumb).astype(np.uint32)
+    packed = (arr[..., 0] << 16) | (arr[..., 1] << 8) | arr[..., 2]
+    colours = len(np.unique(packed))
+    same = (packed[:, 1:] == packed[:, :-1]).mean() if packed.shape[1] > 1 else 1.0
+    if colours <= 256 or colours / packed.size < FLAT_COLOR_RATIO or same > FLAT_NEIGHBOUR_RATIO:
+        return "flat"
+    return "photo"
+
+
+def _save(img, fmt, quality=None):
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buf, format="PNG", compress_level=PNG_COMPRESS)
+    elif fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf
+
+
+def _png_image(img):
+    """Exact palette when the picture has <= 256 colours (much smaller, faster to write)."""
+    if img.mode in ("RGB", "L") and img.getcolors(256) is not None:
+        return img.convert("P", palette=Image.ADAPTIVE, colors=256)
+    return img
+
+
+def _lossy_image(img, alpha):
+    if alpha and LOSSY_FORMAT == "WEBP":
+        return img.convert("RGBA")
+    return img.convert("RGB")
+
+
+def _fit_quality(img, budget):
+    """Highest lossy quality in [MIN_QUALITY, PHOTO_QUALITY] under budget (binary search)."""
+    buf = _save(img, LOSSY_FORMAT, PHOTO_QUALITY)
+    if buf.tell() <= budget:
+        return buf, PHOTO_QUALITY
+    floor = _save(img, LOSSY_FORMAT, MIN_QUALITY)
+    if floor.tell() > budget:
+        return None, None  # no quality fits -> caller shrinks instead of searching
+    best = (floor, MIN_QUALITY)
+    lo, hi = MIN_QUALITY + 1, PHOTO_QUALITY - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        buf = _save(img, LOSSY_FORMAT, mid)
+        if buf.tell() <= budget:
+            best, lo = (buf, mid), mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+def encode_image(img, budget=UPLOAD_BUDGET):
+    """Picks a format from the content and fits the result under `budget` bytes.
+
+    flat art -> PNG (palette when it fits), photos -> WebP/JPEG at PHOTO_QUALITY.
+    Too big -> binary search on quality, then shrink the image and search again.
+    Safe to call inside render farm workers; the result pickles.
+    """
+    start = time.perf_counter()
+    alpha = has_alpha(img)
+    kind = classify(img)
+    if not alpha and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    quality = None
+    if kind == "flat":
+        fmt, buf = "PNG", _save(_png_image(img), "PNG")
+        if buf.tell() > budget:
+            buf = None  # lossless doesn't fit -> go lossy
+    else:
+        buf = None
+
+    shrinks = 0
+    while buf is None:
+        lossy = _lossy_image(img, alpha)
+        fmt = LOSSY_FORMAT
+        buf, quality = _fit_quality(lossy, budget)
+        if buf is None:
+            if shrinks >= MAX_SHRINKS:
+                raise ValueError(f"Image doesn't fit in {budget // 1024} KB even after shrinking")
+            shrinks += 1
+            img = img.resize((max(1, int(img.width * SHRINK_STEP)), max(1, int(img.height * SHRINK_STEP))),
+                             Image.LANCZOS)
+
+    size = buf.tell()
+    buf.seek(0)
+    return EncodedImage(buf, fmt, quality, size, time.perf_counter() - start, kind)
+
+
+def filename_for(result, name):
+    """'mirror.png' + a WebP result -> 'mirror.webp'."""
+    return f"{os.path.splitext(name)[0]}.{EXTENSIONS[result.format]}"
+
+
+def describe(result):
+    q = f" q{result.quality}" if result.quality else ""
+    return f"{result.format}{q} · {result.size / 1024:.0f} KB · {result.seconds * 1000:.0f} ms ({result.kind})"
+
+
+class EncoderStats:
+    """Bot-side half: turns EncodedImage results into discord.File and keeps totals."""
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.formats = Counter()
+
+    def file(self, result, name):
+        self.count += 1
+        self.bytes += result.size
+        self.seconds += result.seconds
+        self.formats[result.format] += 1
+        if result.seconds > 1.0:
+            print(f"🗜️ Slow encode for {name}: {describe(result)}")
+        return discord.File(result.buf, filename_for(result, name))
+
+    def summary(self):
+        if not self.count:
+            return "🗜️ Encoder: nothing encoded yet."
+        formats = ", ".join(f"{fmt} ×{n}" for fmt, n in self.formats.most_common())
+        return (f"🗜️ Encoder: {self.count} images | {self.bytes / self.count / 1024:.0f} KB avg "
+                f"| {self.seconds / self.count * 1000:.0f} ms avg | {formats}")
@@ -0,0 +1,238 @@
+import struct
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# --- GIF BUILDER CONFIG ---
+ALPHA_CUTOFF = 1       # GIF transparency is 1-bit: only fully clear pixels are "off" (same as Pillow)
+MAX_DELAY_CS = 65535   # GCE delay field (centiseconds)
+PALETTE_SAMPLE = 500_000  # pixels looked at when building the global palette
+ERROR_SAMPLE = 20_000     # pixels looked at when checking a photo frame against it
+GLOBAL_MAX_ERROR = 32  # |dR|+|dG|+|dB| a frame may lose to the global table (any pixel of flat
+                       # frames, on average for photos) before it gets a local table
+
+DISPOSE_KEEP = 1       # leave the frame on screen
+DISPOSE_CLEAR = 2      # restore its rectangle to the (transparent) background
+
+
+def to_rgba_array(frame):
+    """PIL image / ndarray -> HxWx4 uint8 with binary alpha (hidden pixels zeroed)."""
+    if isinstance(frame, Image.Image):
+        arr = np.array(frame.convert("RGBA"))
+    else:
+        arr = np.array(frame, dtype=np.uint8)
+        if arr.shape[-1] == 3:
+            arr = np.dstack([arr, np.full(arr.shape[:2], 255, np.uint8)])
+    visible = arr[..., 3] >= ALPHA_CUTOFF
+    arr *= visible[..., None]
+    arr[..., 3] = visible * np.uint8(255)
+    return arr
+
+
+def packed(rgba):
+    """HxWx4 uint8 -> HxW uint32 view (one compare per pixel; 0 = transparent)."""
+    return np.ascontiguousarray(rgba).view(np.uint32)[..., 0]
+
+
+def _bbox(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+
+
+class GifBuilder:
+    """Streaming GIF writer: frames go straight to `fp`, nothing is kept per frame.
+
+    - palette="global": one colour table from `seed` + the first frame, every
+      frame is mapped onto it without dithering, so still areas stay identical.
+      A frame the table can't show (new colours after frame 1) gets a local
+      table instead, see GLOBAL_MAX_ERROR; shades closer than that to a table
+      colour are still snapped to it.
+    - palette="adaptive": each frame's dirty rectangle gets its own local table.
+    - only the rectangle that changed is written; unchanged pixels inside it are
+      transparent, so the previous frame shows through.
+    - a frame identical to the one before just extends that frame's delay.
+
+    One frame is held back: its disposal (keep vs. clear) depends on whether the
+    next frame needs pixels turned transparent again.
+    """
+
+    def __init__(self, fp, size, palette="global", seed=None, loop=0):
+        if palette not in ("global", "adaptive"):
+            raise ValueError(f"Unknown palette mode: {palette}")
+        self.fp = fp
+        self.size = size
+        self.mode = palette
+        self.seed = seed
+        self.loop = loop
+        self.frames_in = 0
+        self.frames_out = 0
+        self._palette = None    # global: 256*3 bytes, index 255 = transparent
+        self._pal_img = None
+        self._pal_rgb = None    # same table as a 256x3 array (error checks)
+        self._shown = None      # what the viewer sees after the pending frame
+        self._pending = None    # (changed mask, duration ms)
+        self._first_alpha = False
+        self._started = False
+
+    # ---------- public ----------
+
+    def add(self, frame, duration):
+        rgba = to_rgba_array(frame)
+        if rgba.shape[:2] != (self.size[1], self.size[0]):
+            raise ValueError(f"Frame is {rgba.shape[1]}x{rgba.shape[0]}, GIF is {self.size[0]}x{self.size[1]}")
+        cur = packed(rgba)
+        self.frames_in += 1
+
+        if not self._started:
+            self._start(rgba)
+            self._first_alpha = bool((cur == 0).any())
+            self._shown = cur
+            self._pending = [cur != 0, duration]
+            return
+
+        if np.array_equal(cur, self._shown):
+            self._pending[1] += duration  # merged into a longer frame
+            return
+
+        base = self._flush(cur == 0)
+        self._pending = [cur != base, duration]
+        self._shown = cur
+
+    def finish(self):
+        """Writes the last frame and the trailer. Returns (frames in, frames written)."""
+        if not self._started:
+            raise ValueError("GIF has no frames")
+        # loop restart: clear everything the first frame doesn't cover
+        self._flush(np.ones(self._shown.shape[:2], bool) if self._first_alpha else None)
+        self.fp.write(b";")
+        return self.frames_in, self.frames_out
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+
+    # ---------- header ----------
+
+    def _start(self, first):
+        w, h = self.size
+        if self.mode == "global":
+            sources = [Image.fromarray(first)]
+            if self.seed is not None:
+                sources.append(self.seed)
+            self._palette = self._build_palette(sources)
+            self._pal_img = Image.new("P", (1, 1))
+            self._pal_img.putpalette(self._palette)
+            self._pal_rgb = np.frombuffer(self._palette, np.uint8).reshape(256, 3)
+            flags = 0x80 | 0x70 | 7  # global table, 8-bit colour, 256 entries
+        else:
+            flags = 0x70             # local tables only
+        self.fp.write(b"GIF89a" + struct.pack("<HHBBB", w, h, flags, 255 if self.mode == "global" else 0, 0))
+        if self._palette:
+            self.fp.write(self._palette)
+        # NETSCAPE2.0 loop extension
+        self.fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+        self._started = True
+
+    @staticmethod
+    def _build_palette(sources):
+        """<= 255 colours from the opaque pixels of `sources`; slot 255 is the transparent index."""
+        sources = [im.convert("RGBA") for im in sources]
+        sheet = Image.new("RGBA", (max(im.width for im in sources), sum(im.height for im in sources)))
+        y = 0
+        for im in sources:
+            sheet.paste(im, (0, y))
+            y += im.height
+        arr = np.asarray(sheet)
+        opaque = arr[arr[..., 3] >= ALPHA_CUTOFF][:, :3]
+        if not len(opaque):
+            opaque = np.zeros((1, 3), np.uint8)
+        opaque = opaque[::max(1, len(opaque) // PALETTE_SAMPLE)]
+        strip = Image.fromarray(np.ascontiguousarray(opaque.reshape(1, -1, 3)))
+        pal = strip.quantize(255).getpalette()[:255 * 3]
+        pal += pal[:3] * (256 - len(pal) // 3)  # pad with colour 0 (remapped below)
+        return bytes(pal)
+
+    # ---------- frames ----------
+
+    def _flush(self, need_clear):
+        """Writes the pending frame; returns the canvas the next frame is drawn on."""
+        changed, duration = self._pending
+        mask = changed
+        disposal = DISPOSE_KEEP
+        if need_clear is not None:
+            clear = need_clear & (self._shown != 0)
+            if clear.any():
+                # pixels must become transparent -> clear this frame's rectangle
+                # afterwards, grown to cover them (they're redrawn by the next frame if needed)
+                disposal = DISPOSE_CLEAR
+                mask = changed | clear
+
+        box = _bbox(mask) or (0, 0, 1, 1)
+        self._write_frame(box, changed, duration, disposal)
+
+        base = self._shown
+        if disposal == DISPOSE_CLEAR:
+            base = base.copy()
+            x0, y0, x1, y1 = box
+            base[y0:y1, x0:x1] = 0
+        return base
+
+    def _write_frame(self, box, changed, duration, disposal):
+        x0, y0, x1, y1 = box
+        rect = self._shown[y0:y1, x0:x1]
+        skip = ~changed[y0:y1, x0:x1] | (rect == 0)
+        rgb = Image.fromarray(np.ascontiguousarray(rect).view(np.uint8).reshape(rect.shape + (4,))).convert("RGB")
+
+        local = None
+        if self.mode == "global":
+            idx = np.array(rgb.quantize(palette=self._pal_img, dither=Image.Dither.NONE))
+            idx[idx == 255] = 0  # padding slots repeat colour 0
+            transparent = 255
+            if self._off_palette(rgb, idx):
+                idx, transparent, local = self._local_table(rgb)
+        else:
+            idx, transparent, local = self._local_table(rgb)
+
+        idx[skip] = transparent
+        # fromarray would make a 2D uint8 array "L", and its mode argument is going away
+        im = Image.frombytes("P", idx.shape[::-1], np.ascontiguousarray(idx).tobytes())
+        params = {"duration": min(duration, MAX_DELAY_CS * 10), "disposal": disposal, "transparency": transparent}
+        if local is not None:
+            im.putpalette(local)
+            params["include_color_table"] = True
+        for chunk in GifImagePlugin.getdata(im, (int(x0), int(y0)), **params):
+            self.fp.write(chunk)
+        self.frames_out += 1
+
+    @staticmethod
+    def _local_table(rgb):
+        """Own <= 255 colour table for this rect (exact when it has that few colours)."""
+        if rgb.getcolors(255) is not None:
+            q = rgb.quantize(255)
+        else:  # photo-like: octree is several times faster than median cut here
+            q = rgb.quantize(255, method=Image.Quantize.FASTOCTREE)
+        idx = np.array(q)
+        transparent = int(idx.max()) + 1
+        return idx, transparent, q.getpalette()[:transparent * 3] + [0, 0, 0]
+
+    def _error(self, colours, idx):
+        return np.abs(self._pal_rgb[idx].astype(np.int16) - colours).sum(axis=-1)
+
+    def _off_palette(self, rgb, idx):
+        """True when the global table would visibly change this frame's colours."""
+        colours = rgb.getcolors(255)
+        if colours is not None:
+            # flat frame (a local table would be exact): check each distinct colour once
+            strip = np.array([c for _, c in colours], np.uint8).reshape(1, -1, 3)
+            mapped = np.array(Image.fromarray(strip).quantize(palette=self._pal_img, dither=Image.Dither.NONE))
+            mapped[mapped == 255] = 0
+            return self._error(strip, mapped).max() > GLOBAL_MAX_ERROR
+        step = max(1, idx.size // ERROR_SAMPLE)
+        pixels = np.asarray(rgb).reshape(-1, 3)[::step]
+        return self._error(pixels, idx.reshape(-1)[::step]).mean() > GLOBAL_MAX_ERROR
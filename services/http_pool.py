@@ -0,0 +1,101 @@
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+
+# --- HTTP POOL CONFIG ---
+POOL_LIMIT = 100          # open connections in total
+PER_HOST_LIMIT = 10       # open connections to one host
+DNS_CACHE_SECONDS = 300
+DEFAULT_TIMEOUT = 30      # seconds for a whole request
+MAX_DOWNLOAD = 25 * 1024 * 1024
+RETRIES = 2               # extra attempts for GET/HEAD (never for POST)
+BACKOFF_BASE = 0.5        # seconds, doubled after each failed attempt
+CHUNK_SIZE = 64 * 1024
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+HttpResponse = namedtuple("HttpResponse", "status headers body")
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+class HttpPool:
+    """One aiohttp session for the whole bot: pooled keep-alive connections,
+    per-host limits and a DNS cache, so cogs don't pay a TLS handshake per command.
+    """
+
+    def __init__(self, limit=POOL_LIMIT, per_host=PER_HOST_LIMIT, dns_ttl=DNS_CACHE_SECONDS):
+        self.limit = limit
+        self.per_host = per_host
+        self.dns_ttl = dns_ttl
+        self._session = None
+
+    async def start(self):
+        if self._session is not None:
+            return
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.per_host,
+                                         ttl_dns_cache=self.dns_ttl)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT))
+        print(f"🌐 HTTP pool: {self.limit} connections | {self.per_host} per host")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        """The shared ClientSession (for streaming cases fetch/request don't cover)."""
+        return self._session
+
+    async def request(self, method, url, *, max_size=MAX_DOWNLOAD, retries=None, timeout=None, **kwargs):
+        """Sends a request and reads the body (streamed, aborted past max_size).
+
+        GET/HEAD are retried on connection errors, timeouts and 429/5xx;
+        other methods only when `retries` is given explicitly.
+        """
+        if retries is None:
+            retries = RETRIES if method.upper() in ("GET", "HEAD") else 0
+        if timeout is not None:
+            # only pass it when set: an explicit timeout=None means "no timeout at all"
+            # to aiohttp, not "use the session's DEFAULT_TIMEOUT"
+            if not isinstance(timeout, aiohttp.ClientTimeout):
+                timeout = aiohttp.ClientTimeout(total=timeout)
+            kwargs["timeout"] = timeout
+
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+            try:
+                async with self._session.request(method, url, **kwargs) as resp:
+                    if resp.status in RETRY_STATUSES and attempt < retries:
+                        continue
+                    body = await read_capped(resp, max_size)
+                    return HttpResponse(resp.status, resp.headers, body)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= retries:
+                    raise
+
+    async def fetch(self, url, *, max_size=MAX_DOWNLOAD, **kwargs):
+        """GET -> body bytes. Raises for non-200 responses and oversized bodies."""
+        resp = await self.request("GET", url, max_size=max_size, **kwargs)
+        if resp.status != 200:
+            raise aiohttp.ClientResponseError(None, (), status=resp.status, message=f"GET {url} -> {resp.status}")
+        return resp.body
+
+
+async def read_capped(resp, max_size):
+    """Reads a response body in chunks, giving up as soon as it passes max_size
+    (Content-Length is checked first but never trusted)."""
+    if max_size is not None and resp.content_length and resp.content_length > max_size:
+        raise DownloadTooLarge(f"{resp.content_length} bytes > {max_size}")
+    buf = bytearray()
+    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+        buf += chunk
+        if max_size is not None and len(buf) > max_size:
+            raise DownloadTooLarge(f"more than {max_size} bytes")
+    return bytes(buf)
@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import io
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+
+# --- IMAGE CACHE CONFIG ---
+IMAGE_CACHE_BYTES = 192 * 1024 * 1024   # decoded pixels kept in RAM (all modes together)
+SOURCE_INDEX_SIZE = 4096                 # url / attachment id -> content hash entries
+CHANNEL_MEMORY = 1024                    # channels whose last image we remember
+MAX_IMAGE_BYTES = 5_000_000              # biggest attachment / download load_image takes (5MB)
+WORKER_DECODE_BYTES = 128 * 1024 * 1024  # decoded pixels a render farm worker keeps between jobs
+
+ChannelImage = namedtuple("ChannelImage", "key url size")
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def decode_image(data):
+    """bytes -> fully loaded PIL image (first frame, native mode)."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+_decoded = OrderedDict()  # (digest, mode) -> image; only filled in render farm workers
+_decoded_bytes = 0
+
+
+def _worker_decode(digest, data, mode):
+    """Unpickled handle -> image. Each worker decodes a picture once and keeps it (LRU)."""
+    global _decoded_bytes
+    key = (digest, mode)
+    img = _decoded.get(key)
+    if img is not None:
+        _decoded.move_to_end(key)
+        return img
+    img = decode_image(data)
+    if mode and img.mode != mode:
+        img = img.convert(mode)
+    _decoded[key] = img
+    _decoded_bytes += image_nbytes(img)
+    while _decoded_bytes > WORKER_DECODE_BYTES and len(_decoded) > 1:
+        _decoded_bytes -= image_nbytes(_decoded.popitem(last=False)[1])
+    return img
+
+
+class ImageHandle:
+    """Copy-on-write view of a cached image.
+
+    `image` is shared with the cache and every other handle: read it, never draw on it.
+    `writable()` makes a private copy the first time it's called and returns that from then on.
+    Handles pickle as the compressed source bytes + digest (a 4000x3000 RGBA decode is
+    48MB, the upload at most 5MB), so they can be sent to the render farm instead of bytes.
+    """
+
+    __slots__ = ("digest", "data", "variant", "_image", "_own")
+
+    def __init__(self, digest, image, data, variant=None):
+        self.digest = digest
+        self.data = data          # the downloaded file
+        self.variant = variant    # mode it was converted to (None = native)
+        self._image = image
+        self._own = None
+
+    @property
+    def image(self):
+        return self._own if self._own is not None else self._image
+
+    @property
+    def size(self):
+        return self._image.size
+
+    @property
+    def mode(self):
+        return self._image.mode
+
+    def writable(self):
+        if self._own is None:
+            self._own = self._image.copy()
+        return self._own
+
+    def __getstate__(self):
+        if self._own is not None:
+            return (self.digest, None, None, self._own)  # already drawn on -> those pixels
+        return (self.digest, self.data, self.variant, None)
+
+    def __setstate__(self, state):
+        self.digest, self.data, self.variant, image = state
+        if image is None:
+            image = _worker_decode(self.digest, self.data, self.variant)
+        self._image = image
+        self._own = None
+
+
+def as_image(src, mode=None, writable=False):
+    """Renderer helper: bytes or ImageHandle -> PIL image in `mode`.
+
+    Bytes are decoded fresh (always safe to modify). Handles give the shared
+    image unless a conversion or `writable` forces a private copy.
+    """
+    if isinstance(src, ImageHandle):
+        img = src.image
+        if mode and img.mode != mode:
+            return img.convert(mode)
+        return src.writable() if writable else img
+    img = Image.open(io.BytesIO(src))
+    return img.convert(mode) if mode else img
+
+
+class _Entry:
+    __slots__ = ("data", "variants", "nbytes")
+
+    def __init__(self, image, data):
+        self.data = data               # source bytes, what handles pickle as
+        self.variants = {None: image}  # None = native mode, then one image per converted mode
+        self.nbytes = image_nbytes(image) + len(data)
+
+
+class ImageCache:
+    """Process-wide decoded-image LRU keyed by content hash.
+
+    Sources (attachment ids / URLs) map to a hash, so a chain like !deepfry -> !pixel
+    on the same picture downloads and decodes it once. Converted modes are kept per
+    entry and count towards the same byte budget.
+    """
+
+    def __init__(self, http_pool=None, max_bytes=IMAGE_CACHE_BYTES):
+        self.http_pool = http_pool
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # digest -> _Entry (LRU order)
+        self._sources = OrderedDict()   # source key -> digest
+        self._channels = OrderedDict()  # channel id -> ChannelImage
+        self._inflight = {}             # source key -> Future (same picture requested twice at once)
+
+    # ---------- channel memory ----------
+
+    def note_channel_image(self, channel_id, key, url, size=0):
+        """Remembers the newest image in a channel (no download until someone uses it)."""
+        self._channels[channel_id] = ChannelImage(key, url, size)
+        self._channels.move_to_end(channel_id)
+        while len(self._channels) > CHANNEL_MEMORY:
+            self._channels.popitem(last=False)
+
+    def note_message(self, message):
+        """on_message hook: only remembers where the newest image is, nothing is downloaded."""
+        for att in message.attachments:
+            if att.content_type and att.content_type.startswith("image/"):
+                self.note_channel_image(message.channel.id, f"att:{att.id}", att.url, att.size)
+                break
+
+    def last_in_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    async def load_image(self, ctx, image_url=None, mode=None):
+        """Attachment -> URL -> last image in the channel, as a cached ImageHandle (or None).
+
+        Chained commands on the same picture skip both the download and the decode.
+        """
+        # Check attachments first
+        if ctx.message.attachments:
+            att = ctx.message.attachments[0]
+            if att.size > MAX_IMAGE_BYTES:
+                return None
+            source = (f"att:{att.id}", att.url, att.size)
+        elif image_url:
+            source = (image_url, image_url, 0)
+        else:
+            source = self.last_in_channel(ctx.channel.id)
+            if source is None or source.size > MAX_IMAGE_BYTES:
+                return None
+
+        key, url, _ = source
+        try:
+            # shared pool: streamed, aborted as soon as it passes MAX_IMAGE_BYTES
+            handle = await self.load(key, lambda: self.http_pool.fetch(url, max_size=MAX_IMAGE_BYTES, timeout=10), mode)
+        except Exception:
+            return None
+        self.note_channel_image(ctx.channel.id, *source)
+        return handle
+
+    # ---------- lookup ----------
+
+    async def load(self, key, fetch, mode=None):
+        """Handle for the image behind `key`; `fetch()` is only awaited on a miss.
+
+        Raises whatever fetch/decoding raises (callers treat that as "no image").
+        """
+        digest = self._lookup(key)
+        if digest is not None:
+            self.hits += 1
+            return await self._variant(digest, self._entries[digest], mode)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            await asyncio.shield(pending)
+            return await self.load(key, fetch, mode)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            data = await fetch()
+            digest = hashlib.sha256(data).hexdigest()
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                image = await asyncio.to_thread(decode_image, data)
+                entry = self._insert(digest, image, data)
+            else:
+                self.hits += 1  # new URL, same pixels
+            self._remember_source(key, digest)
+            return await self._variant(digest, entry, mode)
+        finally:
+            del self._inflight[key]
+            if not fut.done():
+                fut.set_result(None)
+
+    def _lookup(self, key):
+        digest = self._sources.get(key)
+        if digest is None:
+            return None
+        entry = self._entries.get(digest)
+        if entry is None:
+            del self._sources[key]  # pixels were evicted
+            return None
+        self._sources.move_to_end(key)
+        self._entries.move_to_end(digest)
+        return digest
+
+    async def _variant(self, digest, entry, mode):
+        image = entry.variants.get(mode)
+        if image is None:
+            native = entry.variants[None]
+            if native.mode == mode:
+                image = native
+            else:
+                image = await asyncio.to_thread(native.convert, mode)
+            if digest in self._entries:
+                entry.variants[mode] = image
+                if image is not native:
+                    entry.nbytes += image_nbytes(image)
+                    self.used += image_nbytes(image)
+                    self._evict(keep=digest)
+        return ImageHandle(digest, image, entry.data, mode)
+
+    # ---------- storage ----------
+
+    def _insert(self, digest, image, data):
+        entry = _Entry(image, data)
+        if entry.nbytes > self.max_bytes:
+            return entry  # too big to keep: handed out once, never cached
+        self._entries[digest] = entry
+        self.used += entry.nbytes
+        self._evict(keep=digest)
+        return entry
+
+    def _remember_source(self, key, digest):
+        if digest not in self._entries:
+            return
+        self._sources[key] = digest
+        self._sources.move_to_end(key)
+        while len(self._sources) > SOURCE_INDEX_SIZE:
+            self._sources.popitem(last=False)
+
+    def _evict(self, keep=None):
+        """Drops least recently used pictures until the budget fits (never `keep`)."""
+        for digest in list(self._entries):
+            if self.used <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            self.used -= self._entries.pop(digest).nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._sources.clear()
+        self.used = 0
+
+    def stats(self):
+        return {
+            "images": len(self._entries),
+            "used": self.used,
+            "max": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+
+# --- RENDER FARM CONFIG ---
+# job class -> share of the worker pool it may hold at once
+# (so a flood of !squish can't starve !midi or !loadglb)
+JOB_CLASSES = {
+    "image": 1.0,
+    "audio": 0.5,
+    "geometry": 0.5,
+    "cpu": 0.5,
+}
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+DEFAULT_TIMEOUT = 120  # seconds
+
+
+def farm_worker_main(conn):
+    """Worker process loop: one job at a time, results back over the pipe."""
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        except Exception as e:  # job couldn't be unpickled here (fn not importable...)
+            conn.send((False, e))
+            continue
+        if job is None:
+            break
+        fn, args, kwargs = job
+        try:
+            reply = (True, fn(*args, **kwargs))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # result or exception doesn't pickle
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class RenderFarm:
+    """Bot-wide pool of worker processes with per-class priority queues, timeouts and cancellation.
+
+    Jobs must be module-level functions with picklable arguments (they run in a
+    separate process, so Pillow/NumPy work never touches the GIL of the bot).
+    A job that runs past its timeout gets its own worker killed and replaced,
+    the other workers keep going.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        # spawn = same behaviour on Windows and Linux, and no forking of the gateway loop
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._workers = set()
+        self._queues = {}
+        self._dispatchers = []
+        self._seq = itertools.count()  # FIFO tie-break inside the same priority
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(target=farm_worker_main, args=(child_conn,), daemon=True)
+        proc.start()
+        child_conn.close()
+        worker = (proc, parent_conn)
+        self._workers.add(worker)
+        return worker
+
+    def _kill(self, worker):
+        proc, conn = worker
+        self._workers.discard(worker)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if proc.is_alive():
+            proc.kill()
+        # reaping can take a moment after the kill -> never on the event loop
+        try:
+            asyncio.get_running_loop().run_in_executor(None, proc.join, 1)
+        except RuntimeError:  # no loop running (interpreter shutdown)
+            proc.join(timeout=1)
+
+    def start(self):
+        if self._idle is not None:
+            return
+        # Idle workers are the farm-wide cap on running jobs, the class shares
+        # only decide who gets the next free one
+        self._idle = asyncio.Queue()
+        for _ in range(self.max_workers):
+            self._idle.put_nowait(self._spawn())
+        for job_class, share in JOB_CLASSES.items():
+            queue = asyncio.PriorityQueue()
+            self._queues[job_class] = queue
+            slots = max(1, round(self.max_workers * share))
+            for _ in range(slots):
+                self._dispatchers.append(asyncio.create_task(self._dispatch(job_class, queue)))
+        print(f"🏭 Render farm: {self.max_workers} workers | classes: {', '.join(JOB_CLASSES)}")
+
+    async def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers.clear()
+        for worker in list(self._workers):
+            self._kill(worker)
+        self._idle = None
+
+    def queue_size(self, job_class):
+        queue = self._queues.get(job_class)
+        return queue.qsize() if queue else 0
+
+    async def submit(self, job_class, fn, *args, priority=PRIORITY_NORMAL, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Queues fn(*args, **kwargs) on the farm and waits for the result.
+
+        Raises asyncio.TimeoutError if the job runs longer than `timeout`
+        (counted from when a worker picks it up, not from when it was queued).
+        Cancelling the awaiting task drops the job if it hasn't started yet.
+        """
+        if job_class not in JOB_CLASSES:
+            raise ValueError(f"Unknown job class: {job_class}")
+        if self._idle is None:
+            self.start()
+
+        waiter = asyncio.get_running_loop().create_future()
+        job = (fn, args, kwargs, timeout, waiter)
+        self._queues[job_class].put_nowait((priority, next(self._seq), job))
+        return await waiter
+
+    async def _dispatch(self, job_class, queue):
+        while True:
+            _, _, (fn, args, kwargs, timeout, waiter) = await queue.get()
+            try:
+                if waiter.done():
+                    continue  # cancelled while still in the queue
+                await self._run(fn, args, kwargs, timeout, waiter)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Render farm ({job_class}) dispatcher error: {e}")
+            finally:
+                queue.task_done()
+
+    async def _run(self, fn, args, kwargs, timeout, waiter):
+        name = getattr(fn, "__name__", "job")
+        worker = await self._idle.get()
+        try:
+            if waiter.done():
+                return  # caller gave up while every worker was busy
+            proc, conn = worker
+            if not proc.is_alive():
+                self._kill(worker)
+                worker = proc, conn = self._spawn()
+
+            # pickling a big upload shouldn't stall the gateway -> send/recv off the loop
+            await asyncio.to_thread(conn.send, (fn, args, kwargs))
+            ready = await asyncio.to_thread(conn.poll, timeout)
+            if not ready:
+                # Still busy with it -> kill that worker only, the others keep their jobs
+                print(f"⚠️ Render farm: {name} timed out, replacing its worker.")
+                self._kill(worker)
+                worker = self._spawn()
+                if not waiter.done():
+                    waiter.set_exception(asyncio.TimeoutError(f"{name} took longer than {timeout}s"))
+                return
+            ok, result = await asyncio.to_thread(conn.recv)
+
+        except (EOFError, OSError):
+            # Worker died under the job (OOM / segfault)
+            self._kill(worker)
+            worker = self._spawn()
+            if not waiter.done():
+                waiter.set_exception(RuntimeError(f"{name}: render worker crashed"))
+            return
+        except asyncio.CancelledError:
+            # Farm is shutting down and the result may still arrive -> don't reuse this worker
+            self._kill(worker)
+            worker = None
+            raise
+        except Exception as e:  # arguments or result that don't pickle
+            if not waiter.done():
+                waiter.set_exception(e)
+            return
+        finally:
+            if worker is not None:
+                self._idle.put_nowait(worker)
+
+        if waiter.done():
+            return  # caller stopped waiting while it ran
+        if ok:
+            waiter.set_result(result)
+        else:
+            waiter.set_exception(result)
@@ -0,0 +1,95 @@
+import os
+import time
+from collections import namedtuple
+
+import psutil
+from discord.ext import tasks
+
+# --- RESOURCE GUARD CONFIG ---
+PAUSE_AT = 95.5      # RAM % where ALL commands pause
+RESUME_AT = 92.0     # RAM % where commands come back
+BUSY_AT = 90.0       # RAM % where heavy cogs refuse work
+BUSY_RESUME = 85.0   # RAM % where heavy cogs accept work again
+SAMPLE_SECONDS = 2.0
+
+ResourceSnapshot = namedtuple(
+    "ResourceSnapshot",
+    "ram_percent ram_used ram_total cpu_percent cpu_count disk_percent disk_free bot_rss taken_at",
+)
+
+
+class ResourceMonitor:
+    """Samples RAM/CPU/disk in the background so the hot path only reads a cached snapshot."""
+
+    def __init__(self, pause_at=PAUSE_AT, resume_at=RESUME_AT,
+                 busy_at=BUSY_AT, busy_resume=BUSY_RESUME, interval=SAMPLE_SECONDS):
+        self.pause_at = pause_at
+        self.resume_at = resume_at
+        self.busy_at = busy_at
+        self.busy_resume = busy_resume
+        self.disk_path = os.path.abspath(os.sep)  # "/" or "C:\\"
+        self._process = psutil.Process(os.getpid())
+        self.paused = False
+        self.busy = False
+        self.snapshot = None
+
+        self.sampler.change_interval(seconds=interval)
+        self.sample()  # first snapshot (also primes cpu_percent)
+
+    def sample(self):
+        """Reads /proc once and publishes a new snapshot."""
+        ram = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        self.snapshot = ResourceSnapshot(
+            ram_percent=ram.percent,
+            ram_used=ram.used,
+            ram_total=ram.total,
+            cpu_percent=psutil.cpu_percent(interval=None),
+            cpu_count=psutil.cpu_count(),
+            disk_percent=disk.percent,
+            disk_free=disk.free,
+            bot_rss=self._process.memory_info().rss,
+            taken_at=time.time(),
+        )
+
+        # Hysteresis: flip ON at the high mark, flip OFF only below the low mark
+        ram_now = ram.percent
+        if self.paused:
+            self.paused = ram_now > self.resume_at
+        else:
+            self.paused = ram_now >= self.pause_at
+
+        if self.busy:
+            self.busy = ram_now > self.busy_resume
+        else:
+            self.busy = ram_now >= self.busy_at
+
+        return self.snapshot
+
+    @tasks.loop(seconds=SAMPLE_SECONDS)
+    async def sampler(self):
+        try:
+            self.sample()
+        except Exception as e:
+            print(f"⚠️ Resource sampler error: {e}")
+
+    def start(self):
+        if not self.sampler.is_running():
+            self.sampler.start()
+
+    def stop(self):
+        self.sampler.cancel()
+
+    # ---------- query API for cogs ----------
+
+    def is_safe(self):
+        """Global gate: False while RAM is above the pause mark (until it drops below resume)."""
+        return not self.paused
+
+    def is_busy(self):
+        """Heavy-work gate for cogs (the old per-cog 90% checks)."""
+        return self.busy
+
+    @property
+    def ram_percent(self):
+        return self.snapshot.ram_percent
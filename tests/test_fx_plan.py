@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+fun_1 = pytest.importorskip("funstuff.fun_1")
+
+
+def spotlight(size=(240, 180)):
+    """Bright centre on a dark, noisy surround: the centre's mean is nothing like the whole image's."""
+    w, h = size
+    rng = np.random.default_rng(7)
+    arr = rng.integers(0, 60, (h, w, 3), dtype=np.uint8)
+    centre = arr[h // 3:h * 2 // 3, w // 3:w * 2 // 3]
+    centre[:] = rng.integers(180, 255, centre.shape)
+    return Image.fromarray(arr)
+
+
+def run_sequential(img, steps):
+    """Every expanded op in the order the user wrote it, no planning."""
+    for kind, arg in fun_1.expand_fx(steps, fun_1.fx_work_size(img.size)):
+        op = ("luts", [arg]) if kind == "lut" else (kind, arg)
+        img = fun_1.run_fx_op(img, op)
+    return np.asarray(img)
+
+
+def run_planned(img, steps):
+    for op in fun_1.plan_fx(steps, img.size):
+        img = fun_1.run_fx_op(img, op)
+    return np.asarray(img)
+
+
+@pytest.mark.parametrize("spec", [
+    "contrast:2|zoom:3",
+    "deepfry|zoom:2",
+    "blur:3|zoom:2",
+    "invert|mirror|zoom:2",
+    "brightness:1.2|grayscale|zoom:4",
+])
+def test_plan_matches_sequential(spec):
+    img = spotlight()
+    steps = fun_1.parse_fx(spec)
+    assert np.array_equal(run_planned(img, steps), run_sequential(img, steps))
+
+
+def test_crop_still_moves_past_per_pixel_luts():
+    ops = fun_1.plan_fx(fun_1.parse_fx("invert|zoom:2"), (240, 180))
+    assert ops[0][0] == "crop"
+
+
+def test_contrast_is_a_crop_barrier():
+    ops = fun_1.plan_fx(fun_1.parse_fx("contrast:2|zoom:3"), (240, 180))
+    assert [kind for kind, _ in ops][:2] == ["luts", "crop"]
+
+
+def test_pixel_bottleneck_is_per_axis():
+    # 64x64 has more pixels than 37x91 but still squashes the height
+    img = spotlight((37, 91))
+    steps = fun_1.parse_fx("pixel")
+    ops = fun_1.plan_fx(steps, img.size)
+    assert ops[0] == ("resize", (37, 64, Image.NEAREST))  # smallest size per axis
+    assert np.array_equal(run_planned(img, steps), run_sequential(img, steps))
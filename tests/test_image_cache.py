@@ -0,0 +1,39 @@
+import asyncio
+import io
+import pickle
+
+import numpy as np
+from PIL import Image
+
+from services.image_cache import ImageCache
+
+
+def png_bytes(size=(400, 300)):
+    rng = np.random.default_rng(3)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+async def fetch_handle(cache, data, mode):
+    async def fetch():
+        return data
+    return await cache.load("att:1", fetch, mode)
+
+
+def test_handles_pickle_as_source_bytes():
+    data = png_bytes()
+    handle = asyncio.run(fetch_handle(ImageCache(), data, "RGBA"))
+    blob = pickle.dumps(handle)
+    # compressed upload, not 400x300x4 decoded pixels
+    assert len(blob) < len(data) + 1024
+    clone = pickle.loads(blob)
+    assert clone.image.mode == "RGBA"
+    assert np.array_equal(np.asarray(clone.image), np.asarray(handle.image))
+
+
+def test_drawn_on_handles_keep_their_pixels():
+    handle = asyncio.run(fetch_handle(ImageCache(), png_bytes(), None))
+    handle.writable().putpixel((0, 0), (1, 2, 3))
+    clone = pickle.loads(pickle.dumps(handle))
+    assert clone.image.getpixel((0, 0)) == (1, 2, 3)
@@ -0,0 +1,39 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("discord")
+
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "funstuff", "MORE FUN STUFF", "IMAGEEES.py")
+spec = importlib.util.spec_from_file_location("imageees", ENGINE_PATH)
+engine = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(engine)
+
+
+def impulse(value=100, size=5):
+    """Black opaque image with one grey pixel in the middle."""
+    img = np.zeros((size, size, 4), dtype=np.uint8)
+    img[..., 3] = 255
+    img[size // 2, size // 2, :3] = value
+    return img
+
+
+def test_emboss_matches_java_convolve_op():
+    # ConvolveOp is a true convolution: an impulse comes back as the kernel itself,
+    # so emboss puts the highlight bottom-right and the shadow top-left
+    out = engine.convolve(impulse(), engine.KERNELS["emboss"])
+    expected = np.clip(engine.KERNELS["emboss"] * 100, 0, 255)
+    assert np.array_equal(out[1:4, 1:4, 0], expected)
+    assert out[3, 3, 0] == 200 and out[1, 1, 0] == 0
+
+
+def test_convolve_keeps_border_and_alpha():
+    img = impulse()
+    img[0, :, :3] = 77
+    img[..., 3] = 128
+    out = engine.convolve(img, engine.KERNELS["edge"])
+    assert np.array_equal(out[0], img[0])
+    assert np.array_equal(out[..., 3], img[..., 3])
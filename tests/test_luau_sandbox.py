@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+luau = pytest.importorskip("funstuff.luau")
+
+INFO = {"script": "escape.luau", "has_image": False, "has_gif": False, "has_bitmap": False, "assets": []}
+
+# A failing bridge call used to hand the script the live Python exception,
+# and its traceback frames lead straight to the luau module globals.
+ESCAPE = """
+local ok, e = pcall(function() local i = Image.new(4,4); i:fill({}, 1, 2) end)
+local tb = e.__traceback__
+while tb do
+    local g = tb.tb_frame.f_globals
+    if tostring(g["__name__"]) == "funstuff.luau" then
+        return {message = "escaped: " .. tostring(g["os"].getcwd())}
+    end
+    tb = tb.tb_next
+end
+return {message = "error was a " .. type(e)}
+"""
+
+
+def test_bridge_errors_reach_lua_as_strings():
+    status, result = luau.run_luau_script(ESCAPE, INFO)
+    text = str(result)
+    assert os.getcwd() not in text
+    assert "escaped" not in text
+    assert status == luau.OK and result["message"] == "error was a string"
+
+
+def test_bridge_error_message_is_kept():
+    status, result = luau.run_luau_script("local i = Image.new(4,4); i:blit({}, 0, 0)", INFO)
+    assert status == luau.INVALID_RETURN_TYPE
+    assert result["error"] == "invalid canvas"
+
+
+def test_python_attributes_are_filtered():
+    sandbox = luau.LuaSandbox()
+    get_class = sandbox.lua.execute("return function(o) return o.__class__ end")
+    with pytest.raises(AttributeError):
+        get_class(ValueError("x"))